@@ -0,0 +1,117 @@
+"""
+Benchmark the mip-pyramid prefilter of ssaa.wgsl against the direct kernel, in
+cost and quality, for the scale factors 4 and 8.
+
+With a prefilter, the hi-res image is first downsampled by 2 (with a box or tent
+filter) into a chain of mip levels, and the Mitchell kernel is applied to the
+last level, with a scale factor of 2. The direct kernel is the default mode of
+the SsaaRenderer: the pre-calculated taps for x4, and two separable passes for
+x8. For x8, the single pass (which truncates the kernel) is included too.
+
+The quality is the PSNR compared to the exact (not truncated) kernel, computed
+by the NumpySsaaRenderer, and, where available, compared to the ideal reference
+({image}_ref.png, drawn with exact area coverage). The cost is the GPU time of
+the render passes (the median of BENCHMARK_ITERATIONS runs), for (a crop of)
+the images of images_src. E.g.:
+
+    python benchmark_mipmap.py
+"""
+
+import os
+
+from PIL import Image
+import numpy as np
+import wgpu
+
+from renderer_wgsl import SsaaRenderer
+from renderer_numpy import NumpySsaaRenderer
+
+
+src_images_dir = os.path.abspath(os.path.join(__file__, "..", "..", "images_src"))
+
+IMAGE_NAMES = ["lines", "circles", "plot", "animated"]
+
+SCALE_FACTORS = [4, 8]
+
+# The images are cropped to this size (in pixels of the original image), so that
+# the x8 image fits in a single texture, and can be benchmarked.
+CROP_SIZE = 480
+
+# The (name, template vars) of the modes to compare
+MODES = [
+    ("direct", {}),
+    ("single", {"separable": False}),
+    ("box", {"prefilter": "box"}),
+    ("tent", {"prefilter": "tent"}),
+]
+
+
+def load_image(filename, scale_factor=1):
+    # The first frame (for animated images), cropped, and opaque
+    im = np.asarray(Image.open(os.path.join(src_images_dir, filename)).convert("RGBA"))
+    size = CROP_SIZE * scale_factor
+    im = im[:size, :size].copy()
+    im[:, :, 3] = 255
+    return im
+
+
+def psnr(im1, im2):
+    diff = im1[:, :, :3].astype(np.float32) / 255 - im2[:, :, :3] / 255
+    mse = float((diff**2).mean())
+    return float(10 * np.log10(1 / mse)) if mse > 0 else float("inf")
+
+
+def iter_results(adapter):
+    """Render each image with each mode. Yields a dict for each (image, scale
+    factor, mode), with the PSNRs and the pass time in us.
+    """
+    for name in IMAGE_NAMES:
+        ref_filename = os.path.join(src_images_dir, f"{name}_ref.png")
+        ideal = load_image(ref_filename) if os.path.isfile(ref_filename) else None
+        for scale_factor in SCALE_FACTORS:
+            im = load_image(f"{name}x{scale_factor}.png", scale_factor)
+            exact = NumpySsaaRenderer(scaleFactor=scale_factor).render(im)
+            direct = SsaaRenderer(adapter, scaleFactor=scale_factor)
+            for mode, template_vars in MODES:
+                if mode == "single" and not direct.is_separable():
+                    continue  # same as direct
+                renderer = SsaaRenderer(
+                    adapter, scaleFactor=scale_factor, **template_vars
+                )
+                result = renderer.render(im, benchmark=True)
+                yield {
+                    "image": name,
+                    "scale": scale_factor,
+                    "mode": mode,
+                    "passes": len(renderer._get_prepass_chain()) + 1,
+                    "psnr": psnr(result, exact),
+                    "psnr_ref": None if ideal is None else psnr(result, ideal),
+                    "us": renderer.last_stats["pass"]["median"],
+                }
+
+
+if __name__ == "__main__":
+    adapter = wgpu.gpu.request_adapter_sync(power_preference="high-performance")
+    print("Running on", adapter.summary)
+    print()
+
+    print(
+        "image".ljust(10)
+        + "scale".rjust(6)
+        + "mode".rjust(8)
+        + "passes".rjust(8)
+        + "psnr".rjust(8)
+        + "psnr ref".rjust(10)
+        + "us".rjust(10)
+    )
+    for row in iter_results(adapter):
+        psnr_ref = "-" if row["psnr_ref"] is None else f"{row['psnr_ref']:0.1f}"
+        print(
+            row["image"].ljust(10)
+            + f"x{row['scale']}".rjust(6)
+            + row["mode"].rjust(8)
+            + f"{row['passes']}".rjust(8)
+            + f"{row['psnr']:0.1f}".rjust(8)
+            + psnr_ref.rjust(10)
+            + f"{row['us']:0.0f}".rjust(10)
+        )
@@ -0,0 +1,164 @@
+"""
+Benchmark the CPU (NumPy) renderers, in megapixels per second, and check that
+their results conform to the GPU renderers.
+
+The conformance check needs a wgpu adapter, and is skipped if there is none.
+Because the GPU interpolates with limited precision, and rounds differently,
+the results are not identical. Moreover, where the algorithm compares two
+values that are (near) equal, e.g. the horizontal and vertical edge measure on
+a diagonal, the GPU and CPU can make a different choice. So we require that
+nearly all pixels are within 1 of the GPU result.
+
+Note that the edge search of fxaa3d.wgsl steps backwards after its first sample
+in the positive direction (``uv2 - offset``). The CPU engine reproduces this, so
+that it conforms to the shader as it is.
+
+Finally, each engine renders a 4K frame on all cores, using the
+ParallelNumpyRenderer, which must give the same result as a single process.
+"""
+
+import os
+import time
+
+from PIL import Image
+import numpy as np
+import wgpu
+
+from renderer_wgsl import WgslFullscreenRenderer
+from renderer_numpy import (
+    NumpyDdaa2Renderer,
+    NumpyFxaa3cRenderer,
+    NumpyFxaa3dRenderer,
+    NumpySsaaRenderer,
+    ParallelNumpyRenderer,
+)
+
+
+images_dir = os.path.abspath(os.path.join(__file__, "..", "..", "images_all"))
+
+image_names = ["lines.png", "circles.png", "plot.png", "sponza.png", "synthetic.png"]
+
+# The min fraction of pixels for which the result must be within 1 of the GPU
+MIN_FRACTION_WITHIN_ONE = 0.98
+
+cpu_renderers = [
+    NumpyDdaa2Renderer(),
+    NumpyDdaa2Renderer(LUMA_PREPASS=True),
+    NumpyDdaa2Renderer(EDGE_STEP_LIST=[]),
+    NumpyFxaa3cRenderer(),
+    NumpyFxaa3cRenderer(LUMA_PREPASS=True),
+    NumpyFxaa3dRenderer(),
+    NumpyFxaa3dRenderer(LUMA_PREPASS=True),
+    NumpySsaaRenderer(scaleFactor=2),
+    NumpySsaaRenderer(scaleFactor=4),
+    NumpySsaaRenderer(scaleFactor=2, filter="tent"),
+    NumpySsaaRenderer(scaleFactor=3, filter="tent"),
+    NumpySsaaRenderer(scaleFactor=0.5, filter="catmull"),
+]
+
+
+def get_gpu_renderer(adapter, cpu_renderer):
+    class Renderer(WgslFullscreenRenderer):
+        SHADER = cpu_renderer.SHADER
+        TEMPLATE_VARS = cpu_renderer._get_template_vars()
+
+    return Renderer(adapter)
+
+
+def measure(func, repeats=3):
+    best = float("inf")
+    for _ in range(repeats):
+        t0 = time.perf_counter()
+        result = func()
+        best = min(best, time.perf_counter() - t0)
+    return best, result
+
+
+adapter = wgpu.gpu.request_adapter_sync(power_preference="high-performance")
+if adapter is None:
+    print("No wgpu adapter, skipping the conformance check")
+else:
+    print("Comparing with", adapter.summary)
+print()
+
+images = {}
+for name in image_names:
+    images[name] = np.asarray(
+        Image.open(os.path.join(images_dir, name)).convert("RGBA")
+    )
+
+# A crop with a size that is not a multiple of the ssaa scale factors, for which
+# ssaa.wgsl cannot use its pre-calculated taps (a regression check).
+images["synthetic-crop"] = np.ascontiguousarray(images["synthetic.png"][:784, :1151])
+
+print(
+    "renderer".ljust(52)
+    + "image".ljust(16)
+    + "MP/s".rjust(8)
+    + "max diff".rjust(10)
+    + "diff > 1".rjust(10)
+)
+
+all_conform = True
+summary = []
+for cpu_renderer in cpu_renderers:
+    template_vars = cpu_renderer._template_vars
+    label = cpu_renderer.SHADER + (f" {template_vars}" if template_vars else "")
+    gpu_renderer = None if adapter is None else get_gpu_renderer(adapter, cpu_renderer)
+    total_pixels = total_time = total_off = max_diff = 0
+    for name, image in images.items():
+        t, result = measure(lambda r=cpu_renderer, im=image: r.render(im))
+        npixels = image.shape[0] * image.shape[1]
+        total_pixels += npixels
+        total_time += t
+        line = label.ljust(52) + name.ljust(16) + f"{npixels / t / 1e6:0.1f}".rjust(8)
+        if gpu_renderer is not None:
+            reference = gpu_renderer.render(image)
+            diff = np.abs(result.astype(np.int16) - reference).max(axis=2)
+            fraction = (diff > 1).mean()
+            all_conform &= bool(fraction <= 1 - MIN_FRACTION_WITHIN_ONE)
+            total_off += int((diff > 1).sum())
+            max_diff = max(max_diff, int(diff.max()))
+            line += f"{diff.max()}".rjust(10) + f"{fraction:0.2%}".rjust(10)
+        print(line)
+    summary.append((label, total_pixels, total_time, max_diff, total_off))
+
+# Per engine, over all images
+print()
+for label, total_pixels, total_time, max_diff, total_off in summary:
+    line = label.ljust(52) + "all".ljust(16)
+    line += f"{total_pixels / total_time / 1e6:0.1f}".rjust(8)
+    if adapter is not None:
+        line += f"{max_diff}".rjust(10) + f"{total_off / total_pixels:0.2%}".rjust(10)
+    print(line)
+
+print()
+if adapter is not None:
+    print("Conformance check", "passed" if all_conform else "FAILED")
+
+
+# Multi-core, for a 4K frame
+
+frame_4k = np.tile(images["sponza.png"], (4, 4, 1))[:2160, :3840]
+workers = os.cpu_count()
+
+print()
+print(f"4K frame, 1 process vs {workers} processes")
+print("renderer".ljust(52) + "MP/s".rjust(8) + "MP/s".rjust(8) + "speedup".rjust(10))
+
+for cpu_renderer in cpu_renderers:
+    template_vars = cpu_renderer._template_vars
+    label = cpu_renderer.SHADER + (f" {template_vars}" if template_vars else "")
+    parallel_renderer = ParallelNumpyRenderer(cpu_renderer, workers)
+    t1, result1 = measure(lambda r=cpu_renderer: r.render(frame_4k), 1)
+    t2, result2 = measure(lambda r=parallel_renderer: r.render(frame_4k), 2)
+    parallel_renderer.close()
+    assert np.all(result1 == result2), f"Parallel result differs for {label}"
+    mps1 = 3840 * 2160 / t1 / 1e6
+    mps2 = 3840 * 2160 / t2 / 1e6
+    print(
+        label.ljust(52)
+        + f"{mps1:0.1f}".rjust(8)
+        + f"{mps2:0.1f}".rjust(8)
+        + f"{t1 / t2:0.1f}x".rjust(10)
+    )
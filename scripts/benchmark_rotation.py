@@ -0,0 +1,254 @@
+"""
+Benchmark the rotational invariance of the AA filters: how the error of each
+filter depends on the angle of a line.
+
+Images of a single straight line through the center are generated for a fine
+sweep of angles, and for several line widths and subpixel offsets. The input
+images are drawn without anti-aliasing (sampling at the pixel centers, at the
+higher resolution for SSAA), and the reference is the exact area coverage of
+each pixel, computed analytically. No images are written to disk: the images
+are generated in batches, each batch is rendered by each renderer as a single
+stack (one upload, one command encoder, one readback), and scored right away.
+
+The error is the RMS difference with the reference, in a disc around the center,
+so that the length of the line that is scored does not depend on the angle, and
+the edges of the image are not included. Prints the mean error, the spread of
+the error over the angles, and the time per image, for each renderer, and writes
+the error for each image to a CSV file, from which the error-vs-angle curves can
+be plotted. E.g.:
+
+    python benchmark_rotation.py --step 0.25 --output rotation.csv --plot
+"""
+
+import csv
+import time
+import argparse
+
+import numpy as np
+import wgpu
+
+from renderers import (
+    Renderer_null,
+    Renderer_blur,
+    Renderer_ssaax2,
+    Renderer_ssaax4,
+    Renderer_dlaa,
+    Renderer_fxaa2,
+    Renderer_fxaa3c,
+    Renderer_fxaa3d,
+    Renderer_ddaa1,
+    Renderer_ddaa2,
+)
+
+
+# The resolution of the sweep, in degrees
+ANGLE_STEP = 0.5
+
+# The line widths, and offsets perpendicular to the line, in pixels
+LINE_WIDTHS = [0.5, 1, 2, 3]
+LINE_OFFSETS = [0, 0.25, 0.5, 0.75]
+
+# The number of angles that are processed at a time, so that the memory does
+# not depend on the number of angles.
+ANGLES_PER_BATCH = 8
+
+IMAGE_SIZE = 80
+
+# The radius of the disc in which the error is measured. The edge search of
+# ddaa2 reaches 17 pixels, so it does not see the edge of the image.
+SCORE_RADIUS = 20
+
+
+renderers = {
+    "noaa": Renderer_null,
+    "blur": Renderer_blur,
+    "ssaax2": Renderer_ssaax2,
+    "ssaax4": Renderer_ssaax4,
+    "dlaa": Renderer_dlaa,
+    "fxaa2": Renderer_fxaa2,
+    "fxaa3c": Renderer_fxaa3c,
+    "fxaa3d": Renderer_fxaa3d,
+    "ddaa1": Renderer_ddaa1,
+    "ddaa2": Renderer_ddaa2,
+}
+
+
+def get_line_params(degs, widths=LINE_WIDTHS, offsets=LINE_OFFSETS):
+    """Get all combinations of (angle, width, offset), as three flat arrays."""
+    grid = np.meshgrid(degs, widths, offsets, indexing="ij")
+    return tuple(np.ravel(x).astype(float) for x in grid)
+
+
+def _get_distances(degs, offsets, scale):
+    # The signed distance (in pixels of the original image) from the center of
+    # each pixel to the center line, for an image upscaled by scale. Shape (n, h, w).
+    angle = np.reshape(degs, (-1, 1, 1)) * np.pi / 180
+    t = (np.arange(IMAGE_SIZE * scale) + 0.5) / scale - IMAGE_SIZE / 2
+    x, y = t.reshape(1, 1, -1), t.reshape(1, -1, 1)
+    return -np.sin(angle) * x + np.cos(angle) * y - np.reshape(offsets, (-1, 1, 1))
+
+
+def create_line_images(degs, widths, offsets, scale=1):
+    """Create rgba images of a black line on white, without anti-aliasing.
+
+    Each pixel is black if its center is on the line. For SSAA, the image is
+    upscaled by ``scale``. Returns a uint8 array with shape (n, h, w, 4).
+    """
+    d = _get_distances(degs, offsets, scale)
+    on_line = np.abs(d) < np.reshape(widths, (-1, 1, 1)) / 2
+    ims = np.full((*d.shape, 4), 255, np.uint8)
+    ims[on_line, :3] = 0
+    return ims
+
+
+def get_line_coverage(degs, widths, offsets):
+    """Get the exact area coverage of the pixels by the lines, with shape (n, h, w).
+
+    The coverage is the difference of the area of the pixel below each of the two
+    sides of the line. As a function of the distance from the pixel center, that
+    area is the cumulative distribution of a sum of two uniform distributions
+    (with widths |cos| and |sin| of the angle), which is piecewise quadratic.
+    """
+    angle = np.reshape(degs, (-1, 1, 1)) * np.pi / 180
+    a = np.abs(np.cos(angle))
+    b = np.abs(np.sin(angle))
+    a, b = np.maximum(a, b), np.minimum(a, b)
+    d = _get_distances(degs, offsets, 1)
+    half_width = np.reshape(widths, (-1, 1, 1)) / 2
+
+    def area_below(t):
+        # The area of the pixel where the (signed) distance to its center is < t
+        def g(s):
+            return np.maximum(s, 0) ** 2
+
+        area = (
+            g(t + (a + b) / 2)
+            - g(t + (a - b) / 2)
+            - g(t - (a - b) / 2)
+            + g(t - (a + b) / 2)
+        ) / np.maximum(2 * a * b, 1e-12)
+        # For (near) axis-aligned lines, the area is linear in t
+        linear = np.clip(t / a + 0.5, 0, 1)
+        return np.where(b < 1e-6, linear, np.clip(area, 0, 1))
+
+    return area_below(half_width - d) - area_below(-half_width - d)
+
+
+def get_score_mask():
+    t = np.arange(IMAGE_SIZE) + 0.5 - IMAGE_SIZE / 2
+    return t.reshape(-1, 1) ** 2 + t.reshape(1, -1) ** 2 < SCORE_RADIUS**2
+
+
+def sweep_angles(adapter, names, step=ANGLE_STEP):
+    """Render the line images with each renderer, for angles from 0 to 180 in
+    the given step. Returns a tuple (params, errors, times), where params is
+    (degs, widths, offsets), errors maps each renderer name to an array with the
+    RMS error of each image, and times maps each name to the total render time.
+    """
+    degs = np.arange(round(180 / step)) * step
+    mask = get_score_mask()
+    params = get_line_params(degs)
+    errors = {name: [] for name in names}
+    times = dict.fromkeys(names, 0.0)
+
+    instances = {name: renderers[name](adapter) for name in names}
+    n_per_angle = len(LINE_WIDTHS) * len(LINE_OFFSETS)
+    n_per_batch = ANGLES_PER_BATCH * n_per_angle
+    for i in range(0, len(params[0]), n_per_batch):
+        batch = [p[i : i + n_per_batch] for p in params]
+        reference = 1 - get_line_coverage(*batch)[:, mask]
+        images = {}
+        for name, renderer in instances.items():
+            scale = round(renderer._get_template_vars()["scaleFactor"])
+            if scale not in images:
+                images[scale] = create_line_images(*batch, scale)
+            if i == 0:
+                renderer.render(images[scale][0])  # warmup, compiles the shader
+            t0 = time.perf_counter()
+            result = renderer.render_stack(images[scale])
+            times[name] += time.perf_counter() - t0
+            diff = result[:, :, :, :3].mean(axis=3)[:, mask] / 255 - reference
+            errors[name].append(np.sqrt((diff**2).mean(axis=1)))
+
+    errors = {name: np.concatenate(e) for name, e in errors.items()}
+    return params, errors, times
+
+
+def get_angle_curve(degs, errors):
+    """Get the mean error per angle (over the widths and offsets)."""
+    unique_degs, index = np.unique(degs, return_inverse=True)
+    curve = np.bincount(index, errors) / np.bincount(index)
+    return unique_degs, curve
+
+
+def write_results(filename, params, errors):
+    with open(filename, "w", newline="") as f:
+        writer = csv.writer(f)
+        writer.writerow(["angle", "width", "offset", *errors])
+        writer.writerows(zip(*params, *errors.values(), strict=True))
+
+
+def plot_curves(params, errors):
+    import matplotlib.pyplot as plt
+
+    plt.figure(1)
+    plt.clf()
+    for name, e in errors.items():
+        plt.plot(*get_angle_curve(params[0], e), label=name)
+    plt.xlabel("line angle (deg)")
+    plt.ylabel("RMS error")
+    plt.xlim(0, 180)
+    plt.grid()
+    plt.legend()
+    plt.tight_layout()
+    plt.show()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark rotational invariance.")
+    parser.add_argument("--step", type=float, default=ANGLE_STEP)
+    parser.add_argument("--renderers", nargs="+", default=list(renderers))
+    parser.add_argument("--output", default=None)
+    parser.add_argument("--plot", action="store_true")
+    args = parser.parse_args()
+
+    adapter = wgpu.gpu.request_adapter_sync(power_preference="high-performance")
+    print("Running on", adapter.summary)
+
+    t0 = time.perf_counter()
+    params, errors, times = sweep_angles(adapter, args.renderers, args.step)
+    n = len(params[0])
+    print(
+        f"{n} images of {IMAGE_SIZE}x{IMAGE_SIZE} in {time.perf_counter() - t0:0.1f} s"
+    )
+    print()
+
+    # The spread is the range of the error-vs-angle curve, relative to its mean
+    print(
+        "renderer".ljust(10)
+        + "mean".rjust(8)
+        + "min".rjust(8)
+        + "max".rjust(8)
+        + "spread".rjust(8)
+        + "us/image".rjust(10)
+        + "MP/s".rjust(8)
+    )
+    for name, e in errors.items():
+        _, curve = get_angle_curve(params[0], e)
+        t = times[name]
+        mps = n * IMAGE_SIZE**2 / t / 1e6
+        print(
+            name.ljust(10)
+            + f"{curve.mean():0.4f}".rjust(8)
+            + f"{curve.min():0.4f}".rjust(8)
+            + f"{curve.max():0.4f}".rjust(8)
+            + f"{(curve.max() - curve.min()) / curve.mean():0.0%}".rjust(8)
+            + f"{t / n * 1e6:0.0f}".rjust(10)
+            + f"{mps:0.1f}".rjust(8)
+        )
+
+    if args.output:
+        write_results(args.output, params, errors)
+        print("Written to", args.output)
+    if args.plot:
+        plot_curves(params, errors)
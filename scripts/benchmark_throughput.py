@@ -0,0 +1,99 @@
+"""
+Benchmark the throughput (frames per second) of the renderer, including upload
+and readback, for different batch sizes, and for streaming with different numbers
+of frames in flight. Also measures the latency for a single 4K frame.
+
+Uses the frames of the animated image. Each batch size is rendered a few times,
+and the best time is reported.
+"""
+
+import os
+import time
+
+from PIL import Image
+import numpy as np
+import wgpu
+
+from renderers import Renderer_ddaa2
+
+
+all_images_dir = os.path.abspath(os.path.join(__file__, "..", "..", "images_all"))
+
+
+adapter = wgpu.gpu.request_adapter_sync(power_preference="high-performance")
+print("Running on", adapter.summary)
+print()
+
+renderer = Renderer_ddaa2(adapter)
+
+img = Image.open(os.path.join(all_images_dir, "animated.png"))
+frames = []
+for frame_index in range(img.n_frames):
+    img.seek(frame_index)
+    frames.append(np.asarray(img.convert("RGBA")))
+frames = np.stack(frames)
+nframes, h, w = frames.shape[:3]
+
+# Warmup, and get the reference result
+reference = np.stack([renderer.render(frame) for frame in frames])
+
+
+def measure(func, repeats=3):
+    best = float("inf")
+    for _ in range(repeats):
+        t0 = time.perf_counter()
+        result = func()
+        best = min(best, time.perf_counter() - t0)
+    return best, result
+
+
+print(f"{nframes} frames of {w}x{h}")
+print("mode".rjust(12) + "fps".rjust(10))
+
+t, result = measure(lambda: np.stack([renderer.render(frame) for frame in frames]))
+assert np.all(result == reference)
+print("per image".rjust(12) + f"{nframes / t:0.1f}".rjust(10))
+
+for batch_size in [1, 2, 4, 8, 16, 32]:
+
+    def render_in_batches(batch_size=batch_size):
+        return np.concatenate(
+            [
+                renderer.render_stack(frames[i : i + batch_size])
+                for i in range(0, nframes, batch_size)
+            ]
+        )
+
+    t, result = measure(render_in_batches)
+    assert np.all(result == reference)
+    print(str(batch_size).rjust(12) + f"{nframes / t:0.1f}".rjust(10))
+
+for frames_in_flight in [1, 2, 3, 4]:
+
+    def render_as_stream(frames_in_flight=frames_in_flight):
+        return np.stack(list(renderer.render_stream(frames, frames_in_flight)))
+
+    t, result = measure(render_as_stream)
+    assert np.all(result == reference)
+    print(f"stream {frames_in_flight}".rjust(12) + f"{nframes / t:0.1f}".rjust(10))
+
+
+# Latency for a single 4K frame. The input is a crop of a larger image (i.e. not
+# contiguous), which is uploaded without a host copy. With out, the result is
+# written straight from the staging buffer into a pre-allocated array.
+
+big_frame = np.tile(frames[0], (8, 8, 1))
+frame_4k = big_frame[:2160, :3840]
+out = np.empty((2160, 3840, 4), np.uint8)
+
+t1, result1 = measure(lambda: renderer.render(np.ascontiguousarray(frame_4k)))
+t2, result2 = measure(lambda: renderer.render(frame_4k, out=out))
+assert np.all(result1 == result2)
+
+print()
+print("latency for a 4K frame:")
+print(f"    copy input, allocate output: {t1 * 1000:0.1f} ms")
+print(f"    strided input, out=:         {t2 * 1000:0.1f} ms")
+
+print()
+print(renderer.pool)
@@ -11,11 +11,19 @@ import math
 import webbrowser  # noqa
 
 from PIL import Image  # , ImageDraw
-import aggdraw
 
 
 SCALE_FACTOR = 1
 
+# Draw with exact area coverage (rasterizer.py) instead of without aa, to create
+# the ideal anti-aliased image, to use as a reference at this scale.
+REFERENCE = False
+
+if REFERENCE:
+    import rasterizer as aggdraw  # it has the same API
+else:
+    import aggdraw
+
 # Image parameters
 width, height = 600, 600
 background_color = (255, 255, 255)
@@ -152,6 +160,8 @@ if SCALE_FACTOR == 1:
     fname = "lines.png"
 else:
     fname = f"linesx{SCALE_FACTOR}.png"
+if REFERENCE:
+    fname = fname.replace(".png", "_ref.png")
 
 # Save
 draw.flush()
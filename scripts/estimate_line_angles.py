@@ -2,25 +2,56 @@
 Experiment that estimates the angle of a line using different kernels.
 This shows that the method used by FXAA and other techniques is often pretty off,
 and that the Scharr kernel does much better.
+
+The angle is estimated for all pixels of a batch of line images at once, by
+correlating the images with the two kernels of an estimator (using
+scipy.ndimage). This makes it possible to sweep the angles in steps of 0.1
+degrees, in a few seconds. The batches of angles are divided over multiple
+processes. To try other kernels, e.g. a Gaussian with a larger sigma, add them
+to ``estimators``.
 """
 
+import time
+import itertools
+from concurrent.futures import ProcessPoolExecutor
+
 import numpy as np
+from scipy import ndimage
 import matplotlib.pyplot as plt
 
 # plt.ion()
 
 
-def create_angle_im(deg):
-    angle = deg * np.pi / 180
-    im = np.zeros((110, 110), np.uint8)
+# The resolution of the sweep, in degrees
+ANGLE_STEP = 0.1
+
+# The number of angles (i.e. images) that are processed at a time
+ANGLES_PER_BATCH = 100
+
+IMAGE_SIZE = 110
+
+# Pixels near the edge of the image are not included
+MARGIN = 5
 
-    for t in np.linspace(-100, 100, 2000):
-        x = 55 + int(np.round(np.cos(angle) * t))
-        y = 55 + int(np.round(np.sin(angle) * t))
-        if x < 0 or y < 0 or x > 109 or y > 109:
-            continue
-        im[y, x] = 255
-    return im
+# Correlation values below this are zero, but for roundoff errors, which would
+# give a random angle where the gradient is zero.
+EPS = 1e-9
+
+
+def create_angle_images(degs):
+    """Create an image with a line through the center for each angle (in degrees).
+    Returns an array of shape (n, 110, 110).
+    """
+    angle = np.asarray(degs, float).reshape(-1, 1) * np.pi / 180
+    t = np.linspace(-100, 100, 2000)
+    x = 55 + np.round(np.cos(angle) * t).astype(np.intp)
+    y = 55 + np.round(np.sin(angle) * t).astype(np.intp)
+    index = np.broadcast_to(np.arange(len(angle)).reshape(-1, 1), x.shape)
+    valid = (x >= 0) & (y >= 0) & (x < IMAGE_SIZE) & (y < IMAGE_SIZE)
+
+    ims = np.zeros((len(angle), IMAGE_SIZE, IMAGE_SIZE), np.uint8)
+    ims[index[valid], y[valid], x[valid]] = 255
+    return ims
 
 
 def gaussiankernel(sigma, order, n):
@@ -76,10 +107,6 @@ def get_gaussian_kernels(sigma, n):
     return gdx, gdy
 
 
-gdx9, gdy9 = get_gaussian_kernels(0.5, 3)
-gdx25, gdy25 = get_gaussian_kernels(0.5, 5)
-
-
 def get_scharr_kernels():
     k1 = 162.0 / 256.0
     k2 = 47.0 / 256.0
@@ -95,120 +122,127 @@ def get_scharr_kernels():
     return scharr_x, scharr_y
 
 
-scharrx, scharry = get_scharr_kernels()
-
-
-def get_diff_angle(angle, ref_angle):
-    angle = angle - ref_angle
-    while angle < -90:
-        angle += 180
-    while angle > +90:
-        angle -= 180
-    return angle
-
-
-def angle_from_sobel(im, x, y):
-    n = float(im[y + 1, x])
-    e = float(im[y, x + 1])
-    s = float(im[y - 1, x])
-    w = float(im[y, x - 1])
-
-    dirx = -(n - s)
-    diry = w - e
-
-    return np.atan2(diry, dirx) * 180 / np.pi
-
-
-def angle_from_fxaa(im, x, y):
-    nw = float(im[y + 1, x - 1])
-    ne = float(im[y + 1, x + 1])
-    sw = float(im[y - 1, x - 1])
-    se = float(im[y - 1, x + 1])
-
-    dirx = (sw - ne) + (se - nw)
-    diry = (sw - ne) - (se - nw)
-
-    return np.atan2(diry, dirx) * 180 / np.pi
-
-
-def angle_from_gaussian9(im, x, y):
-    patch = im[y - 1 : y + 2, x - 1 : x + 2]  # 3x3
-    dirx = -(patch * gdx9).sum()
-    diry = (patch * gdy9).sum()
-
-    return np.atan2(dirx, diry) * 180 / np.pi
-
-
-def angle_from_gaussian25(im, x, y):
-    patch = im[y - 2 : y + 3, x - 2 : x + 3]  # 5x5
-    dirx = -(patch * gdx25).sum()
-    diry = (patch * gdy25).sum()
-
-    return np.atan2(dirx, diry) * 180 / np.pi
-
-
-def angle_from_scharr(im, x, y):
-    patch = im[y - 1 : y + 2, x - 1 : x + 2]  # 3x3
-    dirx = -(patch * scharrx).sum()
-    diry = (patch * scharry).sum()
+def from_gradient_kernels(kx, ky):
+    """Get an estimator from two kernels that measure the gradient in x and y,
+    like the Gaussian and Scharr kernels.
+    """
+    return -kx, ky
 
-    return np.atan2(dirx, diry) * 180 / np.pi
 
+# An estimator is a pair of kernels (ka, kb), and the estimated angle is
+# atan2(a, b), where a and b are the correlations of the image with ka and kb.
+# The kernels are indexed as [y, x], with the first row at y - 1.
 
-angles_ref = []
-angles_sobel = []
-angles_fxaa = []
-angles_gauss = []
-angles_scharr = []
+# Sobel: a = w - e, b = s - n
+sobel = (
+    np.array([[0, 0, 0], [1, 0, -1], [0, 0, 0]], float),
+    np.array([[0, 1, 0], [0, 0, 0], [0, -1, 0]], float),
+)
 
-for i in range(36):
-    angle_ref = i * 5
-    im = create_angle_im(angle_ref)
+# FXAA: a = (sw - ne) - (se - nw), b = (sw - ne) + (se - nw)
+fxaa = (
+    np.array([[1, 0, -1], [0, 0, 0], [1, 0, -1]], float),
+    np.array([[1, 0, 1], [0, 0, 0], [-1, 0, -1]], float),
+)
 
-    for y in range(5, 105):
-        for x in range(5, 105):
-            patch = im[y - 1 : y + 2, x - 1 : x + 2]
-            if 1 <= (patch > 0).sum() <= 8:
-                angle_sobel = angle_from_sobel(im, x, y)
-                angle_fxaa = angle_from_fxaa(im, x, y)
-                angle_gauss = angle_from_gaussian9(im, x, y)
-                angle_scharr = angle_from_scharr(im, x, y)
+estimators = {
+    "Sobel": sobel,
+    "FXAA": fxaa,
+    "Gaussian": from_gradient_kernels(*get_gaussian_kernels(0.5, 3)),
+    "Scharr": from_gradient_kernels(*get_scharr_kernels()),
+    "Gaussian (sigma 1)": from_gradient_kernels(*get_gaussian_kernels(1.0, 7)),
+}
 
-                angles_ref.append(angle_ref)
-                angles_sobel.append(get_diff_angle(angle_sobel, angle_ref))
-                angles_fxaa.append(get_diff_angle(angle_fxaa, angle_ref))
-                angles_gauss.append(get_diff_angle(angle_gauss, angle_ref))
-                angles_scharr.append(get_diff_angle(angle_scharr, angle_ref))
 
+def get_diff_angle(angle, ref_angle):
+    angle = angle - ref_angle
+    # The angle is in (-360, 180], bring it to [-90, 90]
+    angle = np.where(angle < -90, angle + 180, angle)
+    angle = np.where(angle < -90, angle + 180, angle)
+    angle = np.where(angle > 90, angle - 180, angle)
+    return angle
 
-alpha = 0.002
 
-fig = plt.figure(2)
-plt.clf()
+def estimate_angle_errors(degs, estimators):
+    """Estimate the angle of the line at the line pixels, for each angle in degs.
 
-i = 0
-for name, angles, color in [
-    ("Sobel", angles_sobel, "#5AF"),
-    ("FXAA", angles_fxaa, "#5AF"),
-    ("Gaussian", angles_gauss, "#5AF"),
-    ("Scharr", angles_scharr, "#5AF"),
-]:
-    i += 1
-    mean_error = np.abs(angles).mean()
-    plt.subplot(2, 2, i)
-    plt.title(f"{name}")
-    plt.xlabel("real angle (deg)")
-    plt.ylabel("angle error (deg)")
-    plt.plot(
-        angles_ref, angles, color=color, ls="", ms=10, marker=".", mew=0, alpha=alpha
-    )
-    plt.plot([0, 180], [mean_error, mean_error], color=color)
-    plt.plot([0, 180], [-mean_error, -mean_error], color=color)
-    plt.grid()
-    plt.ylim(-90, 90)
-    plt.text(-5, 60, f"mean: {mean_error:0.0f}")
-    print(f"mean_error {name}: {mean_error}")
-
-plt.tight_layout()
-# fig.savefig("/Users/almar/dev/ddaa_paper/images/edge_angles.png", dpi=300)
-plt.show()
+    The pixels that are evaluated are those with 1 to 8 line pixels in their 3x3
+    neighbourhood. Returns a tuple (ref_angles, errors), where errors is a dict
+    that maps the name of the estimator to the errors in degrees.
+    """
+    ims = create_angle_images(degs).astype(float)
+    inner = (slice(None), slice(MARGIN, -MARGIN), slice(MARGIN, -MARGIN))
+
+    count = ndimage.correlate((ims > 0).astype(np.uint8), np.ones((1, 3, 3)))
+    mask = (count[inner] >= 1) & (count[inner] <= 8)
+    ref_angles = np.broadcast_to(np.reshape(degs, (-1, 1, 1)), mask.shape)[mask]
+
+    errors = {}
+    for name, (ka, kb) in estimators.items():
+        a = ndimage.correlate(ims, ka[np.newaxis], mode="constant")[inner][mask]
+        b = ndimage.correlate(ims, kb[np.newaxis], mode="constant")[inner][mask]
+        a[np.abs(a) < EPS] = 0
+        b[np.abs(b) < EPS] = 0
+        angles = np.atan2(a, b) * 180 / np.pi
+        errors[name] = get_diff_angle(angles, ref_angles)
+    return ref_angles, errors
+
+
+def sweep_angles(estimators, step=ANGLE_STEP, workers=None):
+    """Estimate the angle errors for lines from 0 to 180 degrees, in the given
+    step. Returns a tuple (ref_angles, errors), like estimate_angle_errors().
+    """
+    degs = np.arange(round(180 / step)) * step
+    batches = [
+        degs[i : i + ANGLES_PER_BATCH] for i in range(0, len(degs), ANGLES_PER_BATCH)
+    ]
+    with ProcessPoolExecutor(workers) as pool:
+        results = list(
+            pool.map(estimate_angle_errors, batches, itertools.repeat(estimators))
+        )
+    ref_angles = np.concatenate([r for r, _ in results])
+    errors = {
+        name: np.concatenate([e[name] for _, e in results]) for name in estimators
+    }
+    return ref_angles, errors
+
+
+if __name__ == "__main__":
+    # The original experiment, in steps of 5 degrees
+    _, errors = sweep_angles(estimators, 5)
+    for name, angles in errors.items():
+        print(f"mean_error {name} (5 deg steps): {np.abs(angles).mean()}")
+
+    t0 = time.perf_counter()
+    angles_ref, errors = sweep_angles(estimators, ANGLE_STEP)
+    print(f"Swept {len(angles_ref)} pixels in {time.perf_counter() - t0:0.1f} s")
+
+    fig = plt.figure(2)
+    plt.clf()
+
+    ncols = -(-len(errors) // 2)
+    for i, (name, angles) in enumerate(errors.items(), 1):
+        mean_error = np.abs(angles).mean()
+        plt.subplot(2, ncols, i)
+        plt.title(f"{name}")
+        plt.xlabel("real angle (deg)")
+        plt.ylabel("angle error (deg)")
+        # A histogram rather than a scatter plot, because there are many points
+        plt.hist2d(
+            angles_ref,
+            angles,
+            bins=(180, 180),
+            range=[[0, 180], [-90, 90]],
+            cmap="Blues",
+            cmin=1,
+        )
+        plt.plot([0, 180], [mean_error, mean_error], color="#5AF")
+        plt.plot([0, 180], [-mean_error, -mean_error], color="#5AF")
+        plt.grid()
+        plt.ylim(-90, 90)
+        plt.text(-5, 60, f"mean: {mean_error:0.0f}")
+        print(f"mean_error {name}: {mean_error}")
+
+    plt.tight_layout()
+    # fig.savefig("/Users/almar/dev/ddaa_paper/images/edge_angles.png", dpi=300)
+    plt.show()
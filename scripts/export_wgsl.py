@@ -0,0 +1,47 @@
+"""
+Export shaders with templating applied, so they can be inspected, or used
+elsewhere. Rendering does not write any files; use this script instead.
+
+Without arguments, this regenerates the (tracked) ddaa1_default.wgsl and
+ddaa2_default.wgsl. With arguments, the given shader (and template vars) is
+written to last.wgsl (not tracked by git), e.g.:
+
+    python export_wgsl.py ddaa2.wgsl EDGE_STEP_LIST=[3,3,3] LUMA_PREPASS=True
+"""
+
+import os
+import ast
+import sys
+
+from renderer_wgsl import shader_dir, WgslFullscreenRenderer
+from renderers import Renderer_ddaa1, Renderer_ddaa2
+
+
+def export_defaults():
+    # Templating does not need a device, so no adapter is needed
+    for Renderer in [Renderer_ddaa1, Renderer_ddaa2]:
+        renderer = Renderer(None)
+        filename = os.path.join(shader_dir, Renderer.SHADER.replace(".", "_default."))
+        renderer.export_wgsl(filename, full=False)
+        print("Exported", os.path.basename(filename))
+
+
+def export_last(shader, *args):
+    template_vars = {}
+    for arg in args:
+        name, _, value = arg.partition("=")
+        template_vars[name] = ast.literal_eval(value)
+
+    class Renderer(WgslFullscreenRenderer):
+        SHADER = shader
+
+    filename = os.path.join(shader_dir, "last.wgsl")
+    Renderer(None, **template_vars).export_wgsl(filename)
+    print("Exported", shader, "to", os.path.basename(filename))
+
+
+if __name__ == "__main__":
+    if len(sys.argv) > 1:
+        export_last(*sys.argv[1:])
+    else:
+        export_defaults()
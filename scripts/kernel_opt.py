@@ -1,177 +1,278 @@
 """
-Produce WGSL code to sample a kernel with fixed weights using a trick
-that uses bilinear interpolation to drastically reduce the number of texture lookups.
-
-This is used in e.g. ssaa.wgsl to produce a *much* more efficient kernel for a scale factor of 2.
+Compile the kernels of ssaa.wgsl into bilinear taps, which use the bilinear
+interpolation of the texture sampler to combine up to 2x2 pixels in one lookup.
+This drastically reduces the number of texture lookups, e.g. from 64 to 16 for
+Mitchell with a scale factor of 2, and from 256 to 64 with a scale factor of 4.
+
+The taps are only fixed when the phase (the position of the sample point
+relative to the pixel grid) is the same for each fragment, which is the case
+for integer scale factors, if the image size is a multiple of the scale factor
+(ssaa.wgsl checks this, and falls back to its loop otherwise). The filters are
+separable, so the taps are computed per axis, in closed form: two neighbouring
+pixels with weights of the same sign are merged into one tap, with the summed
+weight, at the position in between them that gives each pixel its weight. The 2D taps are the products of the 1D
+taps, and are exact. With ``optCorners``, the smallest taps are dropped, as long
+as the max error of the effective kernel stays within TOLERANCE.
+
+Run this script to (re)generate wgsl/ssaa_taps.wgsl, which ssaa.wgsl includes.
+It also prints the number of texture lookups per configuration, and the max
+error of the kernel, exact and with the 8-bit interpolation weights of
+typical GPU hardware.
 """
 
-# %%%%% Functions
+import os
 
 import numpy as np
-import scipy
-
-
-f32 = float
 
+from renderer_numpy import FILTER_RADIUS, filter_weights
 
-class vec2f:
-    def __init__(self, x, y):
-        self.x = x
-        self.y = y
 
+shader_dir = os.path.abspath(os.path.join(__file__, "..", "..", "wgsl"))
 
-def cubicWeights(t1: f32, B: f32, C: f32) -> f32:
-    t = abs(t1)
-    w = 0.0
-    t2 = t * t
-    t3 = t * t * t
-    if t < 1.0:
-        w = (
-            (12.0 - 9.0 * B - 6.0 * C) * t3
-            + (-18.0 + 12.0 * B + 6.0 * C) * t2
-            + (6.0 - 2.0 * B)
-        )
-    elif t <= 2.0:
-        w = (
-            (-B - 6.0 * C) * t3
-            + (6.0 * B + 30.0 * C) * t2
-            + (-12.0 * B - 48.0 * C) * t
-            + (8.0 * B + 24.0 * C)
-        )
-    return w / 6.0
+# The configurations for which taps are generated. The disk filter is not separable.
+FILTERS = ["box", "tent", "bspline", "mitchell", "catmull"]
+SCALE_FACTORS = [2, 3, 4, 8]
 
+# As in ssaa.wgsl, the kernel is truncated at 8 pixels from the sample point
+MAX_RADIUS = 8
 
-def filterweightBspline(t: vec2f) -> f32:
-    return cubicWeights(t.x, 1.0, 0.0) * cubicWeights(t.y, 1.0, 0.0)
+# Weights smaller than this (relative to the largest) are zero, but for roundoff
+EPS = 1e-6
 
+# The max error of the kernel weights, when dropping taps
+TOLERANCE = 0.001
 
-def filterweightMitchell(t: vec2f) -> f32:
-    b = 1 / 3.0
-    return cubicWeights(t.x, b, b) * cubicWeights(t.y, b, b)
+# The precision of the interpolation weights of the texture sampler. Direct3D
+# requires (at least) 8 bits, which is what most hardware has.
+SAMPLER_PRECISION = 1 / 256
 
 
-def filterweightCatmull(t: vec2f) -> f32:
-    return cubicWeights(t.x, 0, 0.5) * cubicWeights(t.y, 0, 0.5)
+def get_kernel(filter, scale_factor, phase=None):
+    """Get the 1D kernel of ssaa.wgsl, for a sample point at the given phase.
 
-
-def filterweightLinear(t: vec2f) -> f32:
-    return cubicWeights(t.x, 0, 0) * cubicWeights(t.y, 0, 0)
-
-
-def maximize_4tap(f):
+    The phase is the fractional part of the sample position, in source pixels.
+    By default it is that of an integer scale factor. Returns (offsets, weights),
+    with the offsets of the pixel centers relative to the sample point, and the
+    normalized weights.
+    """
+    if phase is None:
+        assert scale_factor % 1 == 0, "The phase is not fixed for this scale factor"
+        phase = scale_factor / 2 % 1
+    sigma = max(scale_factor, 1)
+    radius = min(FILTER_RADIUS[filter] * sigma, MAX_RADIUS)
+    first = int(np.floor(phase - radius)) - 1
+    offsets = np.arange(first, int(np.ceil(phase + radius)) + 1) + 0.5 - phase
+    offsets = offsets[np.abs(offsets) <= MAX_RADIUS]
+    weights = filter_weights(filter, offsets / sigma).astype(np.float64)
+    # Snap the roundoff at the edge of the kernel to zero
+    weights[np.abs(weights) < EPS * np.abs(weights).max()] = 0
+    nonzero = np.flatnonzero(weights)
+    offsets = offsets[nonzero[0] : nonzero[-1] + 1]
+    weights = weights[nonzero[0] : nonzero[-1] + 1]
+    return offsets, weights / weights.sum()
+
+
+def merge_taps(offsets, weights):
+    """Merge neighbouring pixels with weights of the same sign into bilinear taps.
+
+    The pixels of each run of weights with the same sign are merged in pairs.
+    If the run has an odd length, the pixel that is not merged is the one
+    nearest to the sample point, so that a symmetric kernel gives symmetric
+    taps. Returns (positions, weights) of the taps.
     """
-    Given a 2x2 kernel patch (Fortran order), returns (dx, dy, w), which can be used to
-    construct something like:
+    runs = []
+    for i, w in enumerate(weights):
+        if w == 0:
+            continue
+        if runs and runs[-1][-1] == i - 1 and (w > 0) == (weights[i - 1] > 0):
+            runs[-1].append(i)
+        else:
+            runs.append([i])
+
+    def get_pairs(indices):
+        return [indices[j : j + 2] for j in range(0, len(indices), 2)]
+
+    taps = []
+    for run in runs:
+        groups = get_pairs(run)
+        if len(run) % 2:
+            j = min(range(0, len(run), 2), key=lambda j: abs(offsets[run[j]]))
+            groups = [*get_pairs(run[:j]), [run[j]], *get_pairs(run[j + 1 :])]
+        for group in groups:
+            w = weights[group].sum()
+            pos = offsets[group[0]]
+            if len(group) == 2:
+                pos += weights[group[1]] / w
+            taps.append((pos, w))
+    positions, tap_weights = np.array(taps).T
+    return positions, tap_weights
+
+
+def get_taps(filter, scale_factor, phase=None):
+    """Get the 2D bilinear taps for the kernel of ssaa.wgsl.
+
+    Returns (taps, offsets, kernel), where taps is an array with rows
+    (weight, dx, dy), and offsets and kernel are the 1D kernel.
+    """
+    offsets, kernel = get_kernel(filter, scale_factor, phase)
+    positions, weights = merge_taps(offsets, kernel)
+    dy, dx = np.meshgrid(positions, positions, indexing="ij")
+    w = weights[:, np.newaxis] * weights[np.newaxis, :]
+    taps = np.stack([w.ravel(), dx.ravel(), dy.ravel()], axis=1)
+    return taps, offsets, kernel
 
-        w * textureSample(..., uv + vec2f(dx, dy))
 
-    The dx and dy are between 0 and 1, with 0.5 meaning right in between the elements.
+def get_effective_kernel(taps, offsets, precision=None):
+    """Get the 2D kernel that the taps sample, on the pixels at the given offsets.
 
+    If ``precision`` is given, the interpolation weights are rounded to it, as
+    the texture sampler does.
     """
-
-    # From https://bartwronski.com/2022/03/07/fast-gpu-friendly-antialiasing-downsampling-filter/
-    def effective_c(x):
-        dx, dy, w = np.clip(x[0], 0, 1), np.clip(x[1], 0, 1), x[2]
-        return w * np.array(
-            [[(1 - dx) * (1 - dy), (1 - dx) * dy], [dx * (1 - dy), dx * dy]]
-        )
-
-    def loss(x):
-        return np.sum(np.square(effective_c(x) - f))
-
-    res = scipy.optimize.minimize(loss, [0.5, 0.5, np.sum(f)])
-    # print(f, effective_c(res['x']))
-    tap_error = np.abs(f - effective_c(res["x"])).max()
-    if tap_error > 0.001:
-        print(f"tap error: {tap_error}")
-    dx, dy, w = res["x"]
-    dx, dy = np.clip(dx, 0, 1), np.clip(dy, 0, 1)
-    return float(dx), float(dy), w
-
-
-tap_rows_16_16 = [
-    [(0, 0), (0, 2), (0, 4), (0, 6)],
-    [(2, 0), (2, 2), (2, 4), (2, 6)],
-    [(4, 0), (4, 2), (4, 4), (4, 6)],
-    [(6, 0), (6, 2), (6, 4), (6, 6)],
-]
-
-tap_rows_16_12 = [
-    [(0, 2), (0, 4)],
-    [(2, 0), (2, 2), (2, 4), (2, 6)],
-    [(4, 0), (4, 2), (4, 4), (4, 6)],
-    [(6, 2), (6, 4)],
-]
-
-tap_rows_16_8 = [
-    [(2, 2), (2, 4)],
-    [(4, 2), (4, 4)],
-    [(0, 3), (3, 0), (6, 3), (3, 6)],
-]
-
-tap_rows_16_4 = [
-    [(2, 2), (2, 4)],
-    [(4, 2), (4, 4)],
-]
-
-
-# %%%%% Define filter props
-
-# Select the filter function
-filterFunc = filterweightBspline
-
-# Select tap rows
-tap_rows = tap_rows_16_16
-
-
-# %%%%% Do the work!
-
-# Flatten taps
-taps = []
-for tap_row in tap_rows:
-    taps.extend(tap_row)
-
-# Create kernel
-kernel = np.zeros((8, 8), float)
-for iy, dy in enumerate([-3.5, -2.5, -1.5, -0.5, -0.5, 1.5, 2.5, 3.5]):
-    for ix, dx in enumerate([-3.5, -2.5, -1.5, -0.5, -0.5, 1.5, 2.5, 3.5]):
-        kernel[iy, ix] = filterFunc(vec2f(dx / 2, dy / 2))
-
-# Mask unused elements
-mask = np.zeros_like(kernel, dtype=bool)
-for tap in taps:
-    ix, iy = tap
-    mask[iy : iy + 2, ix : ix + 2] = 1
-kernel[~mask] = 0
-
-# Normalize kernel
-kernel *= 1.0 / kernel.sum()
-
-# Show kernel
-for iy in range(kernel.shape[0]):
-    for ix in range(kernel.shape[1]):
-        w = kernel[iy, ix]
-        print(f"{w: 0.04f}", end=" ")
-        if ix % 2 == 1 and ix < 7:
-            print("|", end=" ")
+    kernel = np.zeros((len(offsets), len(offsets)))
+    for w, dx, dy in taps:
+        ix, fx = _get_index_and_fraction(dx, offsets, precision)
+        iy, fy = _get_index_and_fraction(dy, offsets, precision)
+        kernel[iy, ix] += w * (1 - fy) * (1 - fx)
+        kernel[iy, ix + 1] += w * (1 - fy) * fx
+        kernel[iy + 1, ix] += w * fy * (1 - fx)
+        kernel[iy + 1, ix + 1] += w * fy * fx
+    return kernel[:-1, :-1]
+
+
+def _get_index_and_fraction(pos, offsets, precision):
+    # The pixel to the left of pos, and the interpolation weight of the next pixel.
+    # The offsets are padded (by get_effective_kernel) with one pixel at the end.
+    index = min(int(np.floor(pos - offsets[0] + 1e-9)), len(offsets) - 1)
+    fraction = max(0.0, pos - offsets[index])
+    if precision:
+        fraction = round(fraction / precision) * precision
+    return index, fraction
+
+
+def prune_taps(taps, offsets, kernel, tolerance=TOLERANCE):
+    """Drop the smallest taps, while the error of the kernel stays within tolerance.
+
+    Taps with the same weight (e.g. the four corners) are dropped together, so
+    that the kernel stays symmetric. The remaining taps are renormalized.
+    Returns the new taps.
+    """
+    reference = np.outer(kernel, kernel)
+    padded = np.append(offsets, offsets[-1] + 1)
+    order = np.argsort(np.abs(taps[:, 0]), kind="stable")
+    keep = np.ones(len(taps), bool)
+    i = 0
+    while i < len(order):
+        group = [order[i]]
+        while i + len(group) < len(order) and np.isclose(
+            abs(taps[order[i + len(group)], 0]), abs(taps[order[i], 0]), atol=1e-9
+        ):
+            group.append(order[i + len(group)])
+        keep_new = keep.copy()
+        keep_new[group] = False
+        new_taps = _normalize(taps[keep_new])
+        error = np.abs(get_effective_kernel(new_taps, padded) - reference).max()
+        if error > tolerance:
+            break
+        keep = keep_new
+        i += len(group)
+    return _normalize(taps[keep])
+
+
+def _normalize(taps):
+    taps = taps.copy()
+    taps[:, 0] /= taps[:, 0].sum()
+    return taps
+
+
+def round_taps(taps):
+    """Round the taps to the precision with which they're written to the shader."""
+    return np.round(taps, 6)
+
+
+def compile_taps(filters=FILTERS, scale_factors=SCALE_FACTORS, tolerance=TOLERANCE):
+    """Compile the taps for all configurations.
+
+    Returns a list of dicts with the filter, scale factor, taps, pruned taps,
+    the number of pixels in the kernel, and the max errors.
+    """
+    results = []
+    for scale_factor in scale_factors:
+        for filter in filters:
+            taps, offsets, kernel = get_taps(filter, scale_factor)
+            pruned = prune_taps(taps, offsets, kernel, tolerance)
+            taps, pruned = round_taps(taps), round_taps(pruned)
+            reference = np.outer(kernel, kernel)
+            padded = np.append(offsets, offsets[-1] + 1)
+            result = {
+                "filter": filter,
+                "scale_factor": scale_factor,
+                "taps": taps,
+                "pruned": pruned,
+                "pixels": len(offsets) ** 2,
+            }
+            for key, t in [("error", taps), ("pruned_error", pruned)]:
+                kernel2 = get_effective_kernel(t, padded)
+                kernel3 = get_effective_kernel(t, padded, SAMPLER_PRECISION)
+                result[key] = np.abs(kernel2 - reference).max()
+                result[key + "_8bit"] = np.abs(kernel3 - reference).max()
+            assert result["pruned_error"] <= tolerance + 1e-5
+            results.append(result)
+    return results
+
+
+def write_include(filename, results):
+    """Write the taps as a template include for ssaa.wgsl.
+
+    Each entry is a list of (weight, weight with optCorners, dx, dy), where a
+    weight of zero means that the tap is dropped.
+    """
+    lines = [
+        "{# Generated by scripts/kernel_opt.py, do not edit. #}",
+        "{# The bilinear taps for ssaa.wgsl, per (filter, scale factor), as a list of #}",
+        "{# (weight, weight with optCorners, dx, dy), with dx and dy in source pixels. #}",
+        "{$ set ssaa_taps = {",
+    ]
+    for result in results:
+        key = f"{result['filter']}-{float(result['scale_factor'])}"
+        lines.append(f'    "{key}": [')
+        pruned = {(dx, dy): w for w, dx, dy in result["pruned"]}
+        for w, dx, dy in result["taps"]:
+            w2 = pruned.get((dx, dy), 0.0)
+            lines.append(f"        ({w:0.6f}, {w2:0.6f}, {dx:0.6f}, {dy:0.6f}),")
+        lines.append("    ],")
+    lines.append("} $}")
+    with open(filename, "wb") as f:
+        f.write(("\n".join(lines) + "\n").encode())
+
+
+if __name__ == "__main__":
+    results = compile_taps()
+    filename = os.path.join(shader_dir, "ssaa_taps.wgsl")
+    write_include(filename, results)
+    print(f"Written {len(results)} configurations to {filename}")
     print()
-    if iy % 2 == 1 and iy < 7:
-        print(*["-" * i for i in (16, 17, 17, 16)], sep="+")
-print()
-
-# Produce texture sampling lines in wgsl
-lines = []
-for tap in taps:
-    ix, iy = tap
-    y0 = iy - 8 / 2 + 0.5
-    x0 = ix - 8 / 2 + 0.5
-    patch = kernel[iy : iy + 2, ix : ix + 2]
-    dx, dy, w = maximize_4tap(patch.T)
-    if w != 0:
-        lines.append(
-            f"color += {w: 0.6f} * textureSampleLevel(colorTex, texSampler, texCoordOrig + vec2f({x0 + dx: 0.6f}, {y0 + dy: 0.6f}) * invPixelSize, 0.0);"
-        )
 
-print(f"This filter (for {filterFunc.__name__}) has {len(lines)} texture lookups:\n")
-for line in lines:
-    print(line)
+    # The lookups of the templated loop, which skips the corners of large kernels
+    print(
+        "filter".ljust(10)
+        + "scale".rjust(6)
+        + "pixels".rjust(8)
+        + "taps".rjust(6)
+        + "error".rjust(10)
+        + "8-bit".rjust(10)
+        + "pruned".rjust(8)
+        + "error".rjust(10)
+        + "8-bit".rjust(10)
+    )
+    for result in results:
+        print(
+            result["filter"].ljust(10)
+            + f"{result['scale_factor']}".rjust(6)
+            + f"{result['pixels']}".rjust(8)
+            + f"{len(result['taps'])}".rjust(6)
+            + f"{result['error']:0.6f}".rjust(10)
+            + f"{result['error_8bit']:0.6f}".rjust(10)
+            + f"{len(result['pruned'])}".rjust(8)
+            + f"{result['pruned_error']:0.6f}".rjust(10)
+            + f"{result['pruned_error_8bit']:0.6f}".rjust(10)
+        )
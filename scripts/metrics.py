@@ -0,0 +1,225 @@
+"""
+Image quality metrics: SSIM, MS-SSIM, a per-pixel SSIM map, and the temporal
+stability of a sequence of frames.
+
+The local statistics are computed with separable filters over the whole image
+(a box filter by default, or a Gaussian), in float32. The image is processed in
+blocks of ROW_BLOCK_SIZE rows (plus the rows that the filter reaches), so the
+memory does not depend on the size of the image.
+
+The images are float arrays with shape (H, W) or (H, W, C). The SSIM is
+computed per channel, and averaged. The frames of a sequence are consumed from
+an iterable, and processed as stacks of frames, so the memory does not depend on
+the length of the sequence either.
+"""
+
+import itertools
+
+import numpy as np
+from scipy import ndimage
+
+
+# The number of rows that are processed at a time.
+ROW_BLOCK_SIZE = 256
+
+SSIM_K1 = 0.01
+SSIM_K2 = 0.03
+
+# The weights of the scales, from Wang et al. (2003)
+MS_SSIM_WEIGHTS = (0.0448, 0.2856, 0.3001, 0.2363, 0.1333)
+
+# The number of pixels (frames x height x width) that are processed at a time.
+FRAME_BLOCK_PIXELS = 2**22
+
+# Where the Gaussian window is truncated, in sigmas
+GAUSSIAN_TRUNCATE = 3.5
+
+
+def ssim(im1, im2, size=8, sigma=None, dyn_range=1.0, return_map=False):
+    """Calculate the mean structural similarity of two images.
+
+    The local statistics are taken over a box window of ``size`` pixels, or,
+    if ``sigma`` is given, over a Gaussian window. With ``return_map``, returns
+    a tuple (mean, map), where the map has shape (H, W), averaged over the
+    channels.
+    """
+    im1, im2 = _check_images(im1, im2)
+    h, w = im1.shape[:2]
+    ssim_map = np.empty((h, w), np.float32) if return_map else None
+    total = 0.0
+    for y1, y2, s, _ in _iter_ssim_blocks(im1, im2, size, sigma, dyn_range):
+        total += float(s.sum(dtype=np.float64))
+        if ssim_map is not None:
+            ssim_map[y1:y2] = s.mean(axis=2)
+    mean = total / im1.size
+    return (mean, ssim_map) if return_map else mean
+
+
+def ms_ssim(im1, im2, size=8, sigma=None, dyn_range=1.0, weights=MS_SSIM_WEIGHTS):
+    """Calculate the multi-scale structural similarity of two images.
+
+    The images are downsampled by 2 for each next scale. The scales that are
+    smaller than the window are dropped (and the weights renormalized).
+    Negative contrast-structure terms are clipped to zero.
+    """
+    im1, im2 = _check_images(im1, im2)
+    reach = _get_radius(size, sigma) * 2 + 1
+    nscales = 1
+    while nscales < len(weights) and min(im1.shape[:2]) >> nscales >= reach:
+        nscales += 1
+    weights = np.array(weights[:nscales], np.float64)
+    weights /= weights.sum()
+
+    result = 1.0
+    for scale in range(nscales):
+        if scale > 0:
+            im1, im2 = _downsample(im1), _downsample(im2)
+        total_ssim = total_cs = 0.0
+        for _, _, s, cs in _iter_ssim_blocks(im1, im2, size, sigma, dyn_range):
+            total_ssim += float(s.sum(dtype=np.float64))
+            total_cs += float(cs.sum(dtype=np.float64))
+        # Only the last scale includes the luminance term
+        value = total_ssim if scale == nscales - 1 else total_cs
+        result *= max(0.0, value / im1.size) ** weights[scale]
+    return result
+
+
+def temporal_stability(frames, ref_frames):
+    """Calculate the temporal stability of a sequence of frames.
+
+    The temporal difference of each frame (its change since the previous frame)
+    is compared to that of the reference frames. Returns a tuple of two arrays
+    with a value for each frame except the first: the temporal MSE (the mean
+    squared difference of the temporal differences), and the flicker (the mean
+    amount by which the temporal change exceeds that of the reference).
+    """
+    pairs = zip(frames, ref_frames, strict=True)
+    tmse, flicker = [], []
+    prev1 = prev2 = None
+    block_size = 1
+    while True:
+        block = [_check_images(*pair) for pair in itertools.islice(pairs, block_size)]
+        if not block:
+            break
+        stack1 = np.stack([im1 for im1, _ in block])
+        stack2 = np.stack([im2 for _, im2 in block])
+        if prev1 is not None:
+            stack1 = np.concatenate([prev1, stack1])
+            stack2 = np.concatenate([prev2, stack2])
+        prev1, prev2 = stack1[-1:], stack2[-1:]
+        # The first block has just one frame, now that we know the frame size,
+        # set the size of the next blocks.
+        block_size = max(1, FRAME_BLOCK_PIXELS // (stack1.shape[1] * stack1.shape[2]))
+        if len(stack1) < 2:
+            continue
+        d1 = np.diff(stack1, axis=0)
+        d2 = np.diff(stack2, axis=0)
+        err = d1 - d2
+        err *= err
+        tmse.extend(err.mean(axis=(1, 2, 3), dtype=np.float64))
+        excess = np.abs(d1, out=d1)
+        excess -= np.abs(d2, out=d2)
+        np.maximum(excess, 0, out=excess)
+        flicker.extend(excess.mean(axis=(1, 2, 3), dtype=np.float64))
+    return np.array(tmse), np.array(flicker)
+
+
+def _check_images(im1, im2):
+    im1 = np.asarray(im1, np.float32)
+    im2 = np.asarray(im2, np.float32)
+    assert im1.shape == im2.shape, "Images must have the same shape"
+    if im1.ndim == 2:
+        im1, im2 = im1[:, :, np.newaxis], im2[:, :, np.newaxis]
+    assert im1.ndim == 3, "Images must have shape (H, W) or (H, W, C)"
+    return im1, im2
+
+
+def _get_radius(size, sigma):
+    if sigma is None:
+        return size // 2
+    return int(GAUSSIAN_TRUNCATE * sigma + 0.5)
+
+
+def _get_window(size, sigma):
+    # The 1D window, as (weights, offset of the first weight), like scipy.ndimage
+    if sigma is None:
+        return np.full(size, 1 / size, np.float32), -(size // 2)
+    radius = _get_radius(size, sigma)
+    t = np.arange(-radius, radius + 1, dtype=np.float64)
+    weights = np.exp(-0.5 * t**2 / sigma**2)
+    return (weights / weights.sum()).astype(np.float32), -radius
+
+
+def _local_mean(x, size, sigma, n):
+    # The local mean over the first two axes, with a separable filter. The x
+    # has the rows that the window reaches, and n rows are returned.
+    weights, _ = _get_window(size, sigma)
+    if sigma is None:
+        # Vertical box filter with a running sum, which is much faster than a
+        # filter along the (strided) first axis.
+        result = np.empty((n, *x.shape[1:]), np.float32)
+        acc = x[:size].sum(axis=0, dtype=np.float64)
+        result[0] = acc
+        for i in range(1, n):
+            acc += x[i + size - 1]
+            acc -= x[i - 1]
+            result[i] = acc
+        result *= weights[0]
+        return ndimage.uniform_filter1d(result, size, axis=1, mode="reflect")
+    else:
+        result = weights[0] * x[:n]
+        for i in range(1, len(weights)):
+            result += weights[i] * x[i : i + n]
+        return ndimage.correlate1d(result, weights, axis=1, mode="reflect")
+
+
+def _iter_ssim_blocks(im1, im2, size, sigma, dyn_range):
+    # Yield (y1, y2, ssim, cs) for each block of rows, where ssim is the SSIM
+    # map, and cs the contrast-structure term, both with shape (y2 - y1, W, C).
+    h = im1.shape[0]
+    c1 = (SSIM_K1 * dyn_range) ** 2
+    c2 = (SSIM_K2 * dyn_range) ** 2
+    weights, offset = _get_window(size, sigma)
+    for y1 in range(0, h, ROW_BLOCK_SIZE):
+        y2 = min(h, y1 + ROW_BLOCK_SIZE)
+        # Get the rows that the window reaches, reflected at the edges of the
+        # image, as with mode "reflect" in scipy.ndimage.
+        rows = np.arange(y1 + offset, y2 + offset + len(weights) - 1)
+        rows = np.abs(rows + 0.5) - 0.5
+        rows = ((h - 0.5) - np.abs(rows - (h - 0.5))).astype(np.intp)
+        x, y = im1[rows], im2[rows]
+        n = y2 - y1
+        u1 = _local_mean(x, size, sigma, n)
+        u2 = _local_mean(y, size, sigma, n)
+        s12 = _local_mean(x * y, size, sigma, n)
+        x *= x
+        y *= y
+        x += y
+        ss = _local_mean(x, size, sigma, n)
+        # The math is done in-place, to limit the number of temporary arrays
+        u1u2 = u1 * u2
+        u1u1u2u2 = np.square(u1, out=u1)
+        u1u1u2u2 += np.square(u2, out=u2)
+        s12 -= u1u2  # covariance
+        ss -= u1u1u2u2  # sum of the variances
+        # cs = (2 * s12 + c2) / (ss + c2)
+        cs = s12
+        cs *= 2
+        cs += c2
+        ss += c2
+        cs /= ss
+        # ssim = (2 * u1u2 + c1) / (u1u1u2u2 + c1) * cs
+        ssim_block = u1u2
+        ssim_block *= 2
+        ssim_block += c1
+        u1u1u2u2 += c1
+        ssim_block /= u1u1u2u2
+        ssim_block *= cs
+        yield y1, y2, ssim_block, cs
+
+
+def _downsample(im):
+    # Downsample by 2, by averaging 2x2 pixels
+    h, w = im.shape[0] // 2 * 2, im.shape[1] // 2 * 2
+    im = im[:h, :w]
+    return 0.25 * (im[0::2, 0::2] + im[1::2, 0::2] + im[0::2, 1::2] + im[1::2, 1::2])
@@ -1,28 +1,30 @@
 import os
 
-import wgpu
 from PIL import Image
 import numpy as np
 
-from renderer_wgsl import WgslFullscreenRenderer
+from renderer_numpy import NumpySsaaRenderer
+from metrics import ssim, ms_ssim
+from run_metrics import get_downsampled_reference
 
 
 upscale = 8
 
+# How the results are compared to the x8 reference:
+# * "upscale": the original and results are upscaled by 8 and compared to the x8
+#   reference. This is the original comparison, so it's the default.
+# * "native": at the original resolution, with the reference downsampled (once,
+#   the result is cached) with a Mitchell filter. Fast, and 64x fewer pixels.
+mode = "upscale"
 
-class UpscaleRenderer(WgslFullscreenRenderer):
-    SHADER = "ssaa.wgsl"
-    TEMPLATE_VARS = {
-        "scaleFactor": 1 / upscale,
-        "filter": "mitchell",
-        "extraKernelSupport": None,
-        "optScale2": True,
-        "optCorners": True,
-    }
+# The SSIM window, 8 pixels in the original image
+ssim_size = 8 * upscale if mode == "upscale" else 8
 
+# Whether to write the per-pixel SSIM maps to images_err
+save_ssim_maps = False
 
-adapter = wgpu.gpu.request_adapter_sync(power_preference="high-performance")
-renderer = UpscaleRenderer(adapter)
+# Upscale on the CPU; the result is the same as with ssaa.wgsl
+renderer = NumpySsaaRenderer(scaleFactor=1 / upscale, filter="mitchell")
 
 
 all_images_dir = os.path.abspath(os.path.join(__file__, "..", "..", "images_all"))
@@ -41,35 +43,11 @@ def load_image(fname, upscale=True):
     return im.astype("f4")[:, :, :3] / 255
 
 
-def ssim_on_patch(patch1, patch2, dyn_range=1):
-    u1 = patch1.mean()
-    u2 = patch2.mean()
-    s1 = patch1.std()
-    s2 = patch2.std()
-    # s12 = np.cov(patch1.ravel(), patch2.ravel(), ddof=1)[0, 1]
-    s12 = ((patch1 - u1) * (patch2 - u2)).mean()
-
-    k1, k2 = 0.01, 0.03
-    c1, c2 = (k1 * dyn_range) ** 2, (k2 * dyn_range) ** 2
-
-    nom = (2 * u1 * u2 + c1) * (2 * s12 + c2)
-    denom = (u1**2 + u2**2 + c1) * (s1**2 + s2**2 + c2)
-    return nom / denom
-
-
-def calculate_ssim(im1, im2):
-    m = 8 * upscale
-    vv = []
-    for y in range(im1.shape[0] // m):
-        for x in range(im1.shape[1] // m):
-            v = 0.0
-            for c in (0, 1, 2):
-                v += ssim_on_patch(
-                    im1[y * m : (y + 1) * m, x * m : (x + 1) * m, c],
-                    im2[y * m : (y + 1) * m, x * m : (x + 1) * m, c],
-                )
-            vv.append(v / 3)
-    return np.mean(vv)
+def load_reference(fname):
+    if mode == "upscale":
+        return load_image(fname, upscale=False)
+    # Downsampled (once, the result is cached) with the CPU ssaa, full kernel
+    return load_image(get_downsampled_reference(fname), upscale=False)
 
 
 def gradient(im):
@@ -95,8 +73,8 @@ method_names = [
 for img_name in ["lines", "circles", "plot", "sponza"]:
     data[img_name] = {}
     img_name_t = img_name + "_X.png"
-    ori_im = load_image(img_name_t.replace("_X", ""))
-    ref_im = load_image(img_name_t.replace("_X", ref_alg), upscale=False)
+    ori_im = load_image(img_name_t.replace("_X", ""), upscale=mode == "upscale")
+    ref_im = load_reference(img_name_t.replace("_X", ref_alg))
 
     assert ori_im.shape == ref_im.shape
 
@@ -106,7 +84,7 @@ for img_name in ["lines", "circles", "plot", "sponza"]:
     print(img_name)
 
     for alg in method_names:
-        im = load_image(img_name_t.replace("X", alg))
+        im = load_image(img_name_t.replace("X", alg), upscale=mode == "upscale")
 
         assert im.shape == (im.shape[0], im.shape[1], 3)
         assert im.shape == ref_im.shape
@@ -119,17 +97,27 @@ for img_name in ["lines", "circles", "plot", "sponza"]:
         mse = (dist_from_ref**2).sum() / im.size
         # mse = (dist_from_ref[pixels_of_interest]**2).sum() / npixels
         psnr = 10 * np.log10(1 / mse)
-        ssim = 0  # calculate_ssim(im, ref_im)
+        ssim_mean, ssim_map = ssim(im, ref_im, ssim_size, return_map=True)
+        msssim = ms_ssim(im, ref_im, ssim_size)
+
+        if save_ssim_maps:
+            os.makedirs(err_images_dir, exist_ok=True)
+            ssim_im = (np.clip(ssim_map, 0, 1) * 255 + 0.5).astype(np.uint8)
+            filename = os.path.join(err_images_dir, f"{img_name}_{alg}_ssim.png")
+            Image.fromarray(ssim_im).save(filename)
 
-        print(f"{alg.rjust(10)}:  mse {mse:0.3f}  psnr {psnr:0.1f}  ssim {ssim:0.2f}")
-        data[img_name][alg] = psnr, ssim
+        print(
+            f"{alg.rjust(10)}:  mse {mse:0.3f}  psnr {psnr:0.1f}  "
+            f"ssim {ssim_mean:0.3f}  ms-ssim {msssim:0.3f}"
+        )
+        data[img_name][alg] = psnr, ssim_mean, msssim
 
 
 ##
 
 data.pop("total", None)
 
-total = {alg: np.array([0.0, 0.0]) for alg in method_names}
+total = {alg: np.array([0.0, 0.0, 0.0]) for alg in method_names}
 for image_name in data.keys():
     for alg, values in data[image_name].items():
         total[alg] += data[image_name][alg]
@@ -155,7 +143,7 @@ latex_table += [r"\hline"]
 # Main rows
 for image_name, methods in data.items():
     numbers = [methods[x] for x in method_names]
-    # numbers = [f"{x[0]:0.1f} {x[1]:0.3f}" for x in numbers]
+    # numbers = [f"{x[0]:0.1f} {x[1]:0.3f} {x[2]:0.3f}" for x in numbers]
     numbers = [f"{x[0]:0.1f}" for x in numbers]
     table.append(image_name.rjust(14) + "".join([str(x).rjust(rjust) for x in numbers]))
     latex_table.append(
@@ -0,0 +1,399 @@
+"""
+A rasterizer that computes the exact area coverage of each pixel, to produce an
+ideal anti-aliased image at the native resolution, e.g. as a reference for the
+quality metrics.
+
+The API mimics the subset of aggdraw that the create_*_img.py scripts use, so
+it can be used as a drop-in replacement:
+
+    draw = Draw(img)
+    draw.line((x1, y1, x2, y2), Pen(color, width))
+    draw.ellipse((x1, y1, x2, y2), pen, brush)
+    draw.rectangle((x1, y1, x2, y2), pen, brush)
+    draw.flush()
+
+A shape is a set of closed polygons. For each polygon edge, the signed area that
+it covers in each pixel is accumulated, and a cumulative sum along the rows
+then gives the coverage (as in e.g. font-rs). This is done for all edges at
+once: the edges are split where they cross the pixel grid, so that each piece
+lies within a single pixel. Lines have butt caps, and ellipses are polygons with
+enough vertices to be within ELLIPSE_TOLERANCE of the true curve.
+
+Consecutive primitives with the same color are drawn as one shape, so that where
+they overlap (e.g. crossing lines), the coverage is exactly that of their union:
+the edges are split where they intersect, and the pieces that are inside another
+primitive are dropped. Primitives with different colors are composited with
+alpha blending, in sRGB space (like aggdraw).
+"""
+
+import numpy as np
+from PIL import Image
+
+
+# The max distance between the polygon that represents an ellipse, and the
+# true ellipse, in pixels.
+ELLIPSE_TOLERANCE = 1e-3
+
+
+class Pen:
+    """A pen to stroke a shape with, like aggdraw.Pen."""
+
+    def __init__(self, color, width=1, opacity=255):
+        self.color = color
+        self.width = width
+        self.opacity = opacity
+
+
+class Brush:
+    """A brush to fill a shape with, like aggdraw.Brush."""
+
+    def __init__(self, color, opacity=255):
+        self.color = color
+        self.opacity = opacity
+
+
+class Draw:
+    """Draw on a PIL image with exact area coverage, like aggdraw.Draw.
+
+    The drawing is written to the image on ``flush()``.
+    """
+
+    def __init__(self, image):
+        self._image = image
+        self._canvas = np.array(image.convert("RGB"), np.float64)
+        self._pending = []
+        self._pending_color = None
+
+    def setantialias(self, flag):
+        pass  # the coverage is always exact
+
+    def flush(self):
+        """Write the drawing to the image."""
+        self._draw_pending()
+        im = np.round(self._canvas).astype(np.uint8)
+        self._image.paste(Image.fromarray(im).convert(self._image.mode))
+
+    def line(self, xy, pen):
+        """Draw a line from (x1, y1) to (x2, y2), with butt caps."""
+        x1, y1, x2, y2 = xy
+        length = np.hypot(x2 - x1, y2 - y1)
+        if length == 0:
+            return
+        # The normal, with the length of half the pen width
+        nx = (y1 - y2) / length * pen.width / 2
+        ny = (x2 - x1) / length * pen.width / 2
+        polygon = [
+            (x1 + nx, y1 + ny),
+            (x2 + nx, y2 + ny),
+            (x2 - nx, y2 - ny),
+            (x1 - nx, y1 - ny),
+        ]
+        self._fill([polygon], pen.color, pen.opacity)
+
+    def ellipse(self, xy, pen=None, brush=None):
+        """Draw an ellipse that fits in the box (x1, y1, x2, y2).
+
+        The stroke is the area between the ellipses that are half the pen width
+        larger and smaller, which is exact for circles.
+        """
+        x1, y1, x2, y2 = xy
+        if x1 == x2 and y1 == y2:
+            return  # nothing to draw, like aggdraw
+        cx, cy = (x1 + x2) / 2, (y1 + y2) / 2
+        rx, ry = abs(x2 - x1) / 2, abs(y2 - y1) / 2
+        self._draw_shape(
+            lambda d: _get_ellipse_polygon(cx, cy, rx + d, ry + d), pen, brush
+        )
+
+    def rectangle(self, xy, pen=None, brush=None):
+        """Draw a rectangle (x1, y1, x2, y2), with mitered corners."""
+        x1, y1, x2, y2 = xy
+        if x1 == x2 and y1 == y2:
+            return  # nothing to draw, like aggdraw
+        x1, x2 = min(x1, x2), max(x1, x2)
+        y1, y2 = min(y1, y2), max(y1, y2)
+
+        def get_polygon(d):
+            if min(x2 - x1, y2 - y1) + 2 * d <= 0:
+                return None
+            return [
+                (x1 - d, y1 - d),
+                (x2 + d, y1 - d),
+                (x2 + d, y2 + d),
+                (x1 - d, y2 + d),
+            ]
+
+        self._draw_shape(get_polygon, pen, brush)
+
+    def _draw_shape(self, get_polygon, pen, brush):
+        # Fill and stroke a shape, where get_polygon(d) returns the outline of
+        # the shape, grown by d, or None if it is empty.
+        half_width = 0 if pen is None else pen.width / 2
+        if brush is not None:
+            if pen is not None and (brush.color, brush.opacity) == (
+                pen.color,
+                pen.opacity,
+            ):
+                # Fill and stroke are the same, so draw them as one shape, to
+                # avoid blending at their common edge.
+                pen = None
+            polygon = get_polygon(0 if pen else half_width)
+            if polygon is not None:
+                self._fill([polygon], brush.color, brush.opacity)
+        if pen is not None and half_width > 0:
+            # The inner polygon is reversed, so that it's a hole
+            outer = get_polygon(half_width)
+            inner = get_polygon(-half_width)
+            polygons = [outer] if inner is None else [outer, inner[::-1]]
+            self._fill(polygons, pen.color, pen.opacity)
+
+    def _fill(self, polygons, color, opacity=255):
+        # Fill a shape, given as polygons (with the nonzero winding rule). The
+        # shapes are collected while they have the same color, so that where
+        # they overlap, the coverage is that of their union.
+        if (color, opacity) != self._pending_color:
+            self._draw_pending()
+            self._pending_color = color, opacity
+        polygons = [np.asarray(polygon, np.float64) for polygon in polygons]
+        self._pending.append(polygons)
+
+    def _draw_pending(self):
+        if not self._pending:
+            return
+        shapes, self._pending = self._pending, []
+        color, opacity = self._pending_color
+        color = np.array(color[:3], np.float64)
+        h, w = self._canvas.shape[:2]
+
+        # The bbox of each shape, in pixels
+        bboxes = []
+        for polygons in shapes:
+            points = np.concatenate(polygons)
+            x1, y1 = np.maximum(np.floor(points.min(axis=0)).astype(int), 0)
+            x2, y2 = np.minimum(np.ceil(points.max(axis=0)).astype(int), (w, h))
+            bboxes.append((x1, y1, x2, y2))
+
+        # Group the shapes that share pixels, and draw each group at once
+        for group in _group_overlapping(bboxes):
+            x1 = min(bboxes[i][0] for i in group)
+            y1 = min(bboxes[i][1] for i in group)
+            x2 = max(bboxes[i][2] for i in group)
+            y2 = max(bboxes[i][3] for i in group)
+            if x2 <= x1 or y2 <= y1:
+                continue
+            offset = np.array([x1, y1], np.float64)
+            group_shapes = [[p - offset for p in shapes[i]] for i in group]
+            alpha = get_coverage(group_shapes, x2 - x1, y2 - y1)
+            alpha *= opacity / 255
+            region = self._canvas[y1:y2, x1:x2]
+            region += alpha[:, :, np.newaxis] * (color - region)
+
+
+def get_coverage(shapes, width, height):
+    """Compute the exact area coverage of a set of shapes, for each pixel.
+
+    Each shape is a list of closed polygons (arrays of shape (n, 2)), with the
+    nonzero winding rule, so a hole must have the opposite orientation. The
+    polygons of one shape must not intersect each other, but the shapes may
+    overlap, and the coverage is that of their union. Pixel (x, y) covers the
+    square from (x, y) to (x + 1, y + 1). Returns an array of shape
+    (height, width), with values between 0 and 1.
+    """
+    # All edges of all polygons
+    p1, p2, shape_ids = [], [], []
+    for shape_id, polygons in enumerate(shapes):
+        polygons = [np.asarray(polygon, np.float64) for polygon in polygons]
+        # Orient the shapes the same way, so that their windings add up
+        if sum(_get_signed_area(polygon) for polygon in polygons) < 0:
+            polygons = [polygon[::-1] for polygon in polygons]
+        for polygon in polygons:
+            p1.append(polygon)
+            p2.append(np.roll(polygon, -1, 0))
+            shape_ids.append(np.full(len(polygon), shape_id))
+    p1, p2 = np.concatenate(p1), np.concatenate(p2)
+    shape_ids = np.concatenate(shape_ids)
+    keep = (p1 != p2).any(axis=1)
+    p1, p2, shape_ids = p1[keep], p2[keep], shape_ids[keep]
+    weights = np.ones(len(p1))
+    if len(shapes) > 1:
+        p1, p2, weights = _get_union_edges(p1, p2, shape_ids)
+
+    # Split the edges where they cross a pixel boundary, as parameters t along
+    # the edge, at the crossings in x and y.
+    d = p2 - p1
+    index, t = [], []
+    for dim in range(2):
+        lo = np.minimum(p1[:, dim], p2[:, dim])
+        hi = np.maximum(p1[:, dim], p2[:, dim])
+        first = np.floor(lo).astype(np.intp) + 1
+        edge, k = _expand_ranges(first, np.ceil(hi).astype(np.intp))
+        index.append(edge)
+        t.append((k - p1[edge, dim]) / d[edge, dim])
+    edge, ta, tb = _get_pieces(len(p1), np.concatenate(index), np.concatenate(t))
+
+    xm = p1[edge, 0] + 0.5 * (ta + tb) * d[edge, 0]
+    ym = p1[edge, 1] + 0.5 * (ta + tb) * d[edge, 1]
+    dy = (tb - ta) * d[edge, 1] * weights[edge]
+    x = np.floor(xm)
+    y = np.floor(ym).astype(np.intp)
+    keep = (y >= 0) & (y < height) & (x < width) & (dy != 0)
+    x, y, xm, dy = x[keep], y[keep], xm[keep], dy[keep]
+
+    # A piece covers the area to its right in its own pixel, and the full
+    # height of the piece in the pixels further right. Pieces left of the image
+    # only do the latter. The accumulator has an extra column on both sides.
+    left = x < 0
+    x[left] = -1
+    area = dy * (x + 1 - xm)
+    area[left] = 0
+    cols = x.astype(np.intp) + 1
+    size = height * (width + 2)
+    acc = np.bincount(y * (width + 2) + cols, area, size)
+    acc += np.bincount(y * (width + 2) + cols + 1, dy - area, size)
+    coverage = np.cumsum(acc.reshape(height, width + 2), axis=1)[:, 1 : width + 1]
+    return np.minimum(np.abs(coverage), 1)
+
+
+def _get_pieces(n, index, t):
+    # Split n edges at the given parameters t along the edges. Returns arrays
+    # (edge, ta, tb) with the pieces.
+    index = np.concatenate([np.arange(n), np.arange(n), index])
+    t = np.concatenate([np.zeros(n), np.ones(n), t])
+    order = np.lexsort((t, index))
+    index, t = index[order], t[order]
+    piece = index[:-1] == index[1:]
+    return index[:-1][piece], t[:-1][piece], t[1:][piece]
+
+
+def _get_union_edges(p1, p2, shape_ids):
+    # Get the edges of the union of the shapes. The shapes are oriented the
+    # same way, so inside a shape the winding number of the other shapes is
+    # positive. The edges are split where they intersect an edge of another
+    # shape, and the pieces that are inside another shape are dropped. Returns
+    # (p1, p2, weights) of the pieces.
+    d = p2 - p1
+    lo, hi = np.minimum(p1, p2), np.maximum(p1, p2)
+
+    # The pairs of edges of different shapes with overlapping bboxes. With the
+    # edges sorted by their top, each pair is found once: as an edge and the
+    # next edges that start within its y range.
+    order = np.argsort(lo[:, 1])
+    sorted_lo = lo[order, 1]
+    position = np.empty_like(order)
+    position[order] = np.arange(len(order))
+    ia, k = _expand_ranges(position + 1, np.searchsorted(sorted_lo, hi[:, 1], "right"))
+    ib = order[k]
+    candidates = shape_ids[ia] != shape_ids[ib]
+    candidates &= (lo[ia, 0] <= hi[ib, 0]) & (lo[ib, 0] <= hi[ia, 0])
+    ia, ib = ia[candidates], ib[candidates]
+
+    # Solve p1[ia] + ta * d[ia] = p1[ib] + tb * d[ib]. An edge is also split
+    # where the end of the other edge touches it.
+    denom = _cross(d[ia], d[ib])
+    diff = p1[ib] - p1[ia]
+    with np.errstate(divide="ignore", invalid="ignore"):
+        ta = _cross(diff, d[ib]) / denom
+        tb = _cross(diff, d[ia]) / denom
+    on_a, on_b = (ta >= 0) & (ta <= 1), (tb >= 0) & (tb <= 1)
+    index = [ia[on_a & on_b], ib[on_a & on_b]]
+    t = [ta[on_a & on_b], tb[on_a & on_b]]
+    # Where the edges are on the same line, they're split at each other's ends
+    collinear = (denom == 0) & (_cross(diff, d[ia]) == 0)
+    ia, ib = ia[collinear], ib[collinear]
+    for e1, e2 in [(ia, ib), (ib, ia)]:
+        for p in (p1, p2):
+            index.append(e1)
+            t.append(((p[e2] - p1[e1]) * d[e1]).sum(1) / (d[e1] ** 2).sum(1))
+    index, t = np.concatenate(index), np.concatenate(t)
+    inner = (t > 0) & (t < 1)
+    edge, ta, tb = _get_pieces(len(p1), index[inner], t[inner])
+    q1 = p1[edge] + ta[:, np.newaxis] * d[edge]
+    q2 = p1[edge] + tb[:, np.newaxis] * d[edge]
+    # The winding number of the other shapes just left and right of the middle
+    # of each piece. The shape of the piece itself is on the left.
+    normal = np.stack([-d[edge, 1], d[edge, 0]], 1)
+    normal *= 1e-7 / np.linalg.norm(normal, axis=1, keepdims=True)
+    middle = 0.5 * (q1 + q2)
+    w_left = _get_winding(middle + normal, shape_ids[edge], p1, p2, shape_ids)
+    w_right = _get_winding(middle - normal, shape_ids[edge], p1, p2, shape_ids)
+    # The weight is the change of the union's coverage across the piece,
+    # relative to the change of the total winding number. This is 1 or 0 for
+    # most pieces, 0 where shapes touch, and 1/n where n edges coincide.
+    dw = 1 + w_left - w_right
+    du = (w_right == 0).astype(float)
+    weights = np.where(dw != 0, du / np.where(dw != 0, dw, 1), 0)
+    keep = weights != 0
+    return q1[keep], q2[keep], weights[keep]
+
+
+def _get_winding(points, point_shape_ids, p1, p2, shape_ids):
+    # The winding number of each point, for the edges of the other shapes. An
+    # edge counts for the points in its y range (with the points sorted by y),
+    # that are on its left.
+    order = np.argsort(points[:, 1])
+    sorted_y = points[order, 1]
+    lo = np.minimum(p1[:, 1], p2[:, 1])
+    hi = np.maximum(p1[:, 1], p2[:, 1])
+    edge, k = _expand_ranges(
+        np.searchsorted(sorted_y, lo, "left"), np.searchsorted(sorted_y, hi, "left")
+    )
+    point = order[k]
+    other = point_shape_ids[point] != shape_ids[edge]
+    edge, point = edge[other], point[other]
+    side = _cross(p2[edge] - p1[edge], points[point] - p1[edge])
+    up = p2[edge, 1] > p1[edge, 1]
+    step = np.where(up, side > 0, 0) - np.where(~up, side < 0, 0)
+    return np.bincount(point, step, len(points)).astype(np.intp)
+
+
+def _expand_ranges(start, stop):
+    # Get the integers from start to stop, for each range. Returns arrays
+    # (range index, integer).
+    counts = np.maximum(stop - start, 0)
+    index = np.repeat(np.arange(len(counts)), counts)
+    offsets = np.arange(counts.sum()) - np.repeat(counts.cumsum() - counts, counts)
+    return index, start[index] + offsets
+
+
+def _get_signed_area(polygon):
+    return 0.5 * _cross(polygon, np.roll(polygon, -1, 0)).sum()
+
+
+def _cross(a, b):
+    return a[..., 0] * b[..., 1] - a[..., 1] * b[..., 0]
+
+
+def _group_overlapping(bboxes):
+    # Group the indices of the bboxes that overlap, directly or indirectly
+    group_ids = list(range(len(bboxes)))
+
+    def find(i):
+        while group_ids[i] != i:
+            group_ids[i] = i = group_ids[group_ids[i]]
+        return i
+
+    b = np.array(bboxes).reshape(-1, 4)
+    overlap = (b[:, np.newaxis, 0] < b[np.newaxis, :, 2]) & (
+        b[np.newaxis, :, 0] < b[:, np.newaxis, 2]
+    )
+    overlap &= (b[:, np.newaxis, 1] < b[np.newaxis, :, 3]) & (
+        b[np.newaxis, :, 1] < b[:, np.newaxis, 3]
+    )
+    for i, j in zip(*np.nonzero(np.triu(overlap, 1)), strict=True):
+        group_ids[find(i)] = find(j)
+    groups = {}
+    for i in range(len(bboxes)):
+        groups.setdefault(find(i), []).append(i)
+    return list(groups.values())
+
+
+def _get_ellipse_polygon(cx, cy, rx, ry):
+    # A polygon for the ellipse, with the same area, or None if it is empty
+    if rx <= 0 or ry <= 0:
+        return None
+    r = max(rx, ry)
+    n = max(8, int(np.ceil(np.pi / np.arccos(max(0.0, 1 - ELLIPSE_TOLERANCE / r)))))
+    # Scale the polygon so that its area matches that of the ellipse
+    scale = np.sqrt(2 * np.pi / (n * np.sin(2 * np.pi / n)))
+    a = np.linspace(0, 2 * np.pi, n, endpoint=False)
+    return np.stack([cx + scale * rx * np.cos(a), cy + scale * ry * np.sin(a)], 1)
@@ -0,0 +1,995 @@
+"""
+CPU implementations of shaders, in vectorized NumPy.
+
+The renderers have the same interface as the WgslFullscreenRenderer, and honor
+the same template vars, so they can be used on machines without a GPU adapter.
+The results match the GPU within a small tolerance; the GPU interpolates with
+limited precision, and evaluates float math in a different order.
+"""
+
+import os
+import time
+import functools
+from fractions import Fraction
+from multiprocessing import shared_memory
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+from renderer_wgsl import timing_stats, format_timing_stats
+
+
+# The number of times that an image is rendered in benchmark mode.
+BENCHMARK_ITERATIONS = 10
+
+# The number of output rows that the separable filters process at a time.
+ROW_BLOCK_SIZE = 256
+
+# The min number of rows (excluding the halo) of the bands that are rendered in
+# parallel, and the number of bands per worker (for load balancing).
+MIN_BAND_SIZE = 64
+BANDS_PER_WORKER = 2
+
+LUMA_WEIGHTS = np.array([0.299, 0.587, 0.114], np.float32)
+
+
+def rgb2luma(rgb):
+    """The perceptual luma of an array of rgb values, as in the shaders."""
+    return np.sqrt(rgb @ LUMA_WEIGHTS)
+
+
+def get_padded_luma(rgb, luma_prepass=False):
+    """Get the luma of an rgb image, padded with one pixel (repeating the edge).
+
+    With ``luma_prepass``, the luma is rounded to float16, like the r16float
+    texture written by the luma prepass.
+    """
+    luma = rgb2luma(np.pad(rgb, ((1, 1), (1, 1), (0, 0)), mode="edge"))
+    if luma_prepass:
+        luma = luma.astype(np.float16).astype(np.float32)
+    return luma
+
+
+def sample_bilinear(image, x, y):
+    """Sample an image with shape (H, W, C) at the given (float) pixel coordinates.
+
+    Like a linear sampler with clamp_to_edge, i.e. the pixel centers are at
+    0.5, 1.5, etc. and the pixels beyond the edges repeat the edge pixels.
+    Returns an array with shape (len(x), C).
+    """
+    h, w = image.shape[:2]
+    x = x - 0.5
+    y = y - 0.5
+    x0 = np.floor(x)
+    y0 = np.floor(y)
+    fx = (x - x0)[:, np.newaxis]
+    fy = (y - y0)[:, np.newaxis]
+    x0 = x0.astype(np.intp)
+    y0 = y0.astype(np.intp)
+    x1 = np.clip(x0 + 1, 0, w - 1)
+    y1 = np.clip(y0 + 1, 0, h - 1)
+    x0 = np.clip(x0, 0, w - 1)
+    y0 = np.clip(y0, 0, h - 1)
+    top = image[y0, x0] * (1 - fx) + image[y0, x1] * fx
+    bottom = image[y1, x0] * (1 - fx) + image[y1, x1] * fx
+    return top * (1 - fy) + bottom * fy
+
+
+class NumpyRenderer:
+    """Base class for renderers that run on the CPU.
+
+    Subclasses implement ``_render_float()``, which gets the image as float32
+    rgba in the range 0..1, and returns the color that the fragment shader
+    would return. The blending onto the (cleared) target and the conversion to
+    uint8 happen here.
+    """
+
+    SHADER = "noaa.wgsl"  # filename of the shader that this renderer implements
+
+    TEMPLATE_VARS = {"scaleFactor": 1}
+
+    # How far (in input pixels) the algorithm reads from the pixel that it renders.
+    HALO = 32
+
+    def __init__(self, adapter=None, **template_vars):
+        # The adapter is not used, but accepted so that a NumpyRenderer can be
+        # used in place of a WgslFullscreenRenderer.
+        self._template_vars = template_vars
+
+    def _get_template_vars(self):
+        template_vars = {}
+        template_vars.update(self.TEMPLATE_VARS)
+        template_vars.update(self._template_vars)
+        return template_vars
+
+    def get_output_size(self, w, h):
+        """Get the size (w, h) of the result for an input image of the given size."""
+        scale_factor = self._get_template_vars()["scaleFactor"]
+        return int(w / scale_factor), int(h / scale_factor)
+
+    def get_halo(self):
+        """Get the number of input pixels that a tile must overlap its neighbours."""
+        return self.HALO
+
+    def render(self, image, out=None, benchmark=None):
+        """Render an rgba image (an array with shape (H, W, 4)).
+
+        If ``out`` is given, the result is written into it. With
+        ``benchmark=True``, the render is timed BENCHMARK_ITERATIONS times, and
+        the statistics are stored in ``last_stats`` and ``last_time``.
+        """
+        image = np.asarray(image)
+        assert image.ndim == 3 and image.shape[2] == 4, "Image must be rgba"
+        assert image.dtype == np.uint8, "Image must be uint8"
+        h, w = image.shape[:2]
+        if out is None:
+            w2, h2 = self.get_output_size(w, h)
+            out = np.empty((h2, w2, 4), np.uint8)
+
+        self._render_image(image, out)
+
+        if benchmark:
+            times = []
+            for _ in range(BENCHMARK_ITERATIONS):
+                t0 = time.perf_counter()
+                self._render_image(image, out)
+                times.append((time.perf_counter() - t0) * 1e6)
+            stats = timing_stats(times)
+            self.last_stats = {"pass": stats}
+            self.last_time = format_timing_stats(stats)
+            self._last_us = stats["trimmed_mean"]
+
+        return out
+
+    def render_many(self, images):
+        """Render a list of rgba images. Returns a list of result images."""
+        return [self.render(image) for image in images]
+
+    def render_stack(self, images, out=None, benchmark=None):
+        """Render a stack of rgba images, given as an array with shape (N, H, W, 4)."""
+        images = np.asarray(images)
+        assert images.ndim == 4 and images.shape[3] == 4, "Images must be rgba"
+        n, h, w = images.shape[:3]
+        if out is None:
+            w2, h2 = self.get_output_size(w, h)
+            out = np.empty((n, h2, w2, 4), np.uint8)
+        for i in range(n):
+            self.render(images[i], out[i], benchmark)
+        return out
+
+    def render_stream(self, images, frames_in_flight=3):
+        """Render an iterable of rgba images, yielding the results in order.
+
+        The ``frames_in_flight`` is ignored; frames are rendered one at a time.
+        """
+        for image in images:
+            yield self.render(image)
+
+    def _render_image(self, image, out):
+        rgba = self._render_float(image.astype(np.float32) / 255)
+        self._write_output(rgba, out)
+
+    def _render_rows(self, image, out, oy, oy2):
+        # Render the output rows oy:oy2 of the image into out (the output for
+        # the whole image). This renders a band of the input that overlaps by
+        # the halo. The band must start at a multiple of the scale factor.
+        h = image.shape[0]
+        scale_factor = Fraction(self._get_template_vars()["scaleFactor"])
+        scale_factor = scale_factor.limit_denominator(1000)
+        step = scale_factor.numerator
+        halo = -(-self.get_halo() // step) * step
+        y = int(oy * scale_factor)
+        y1 = max(0, y - halo)
+        y2 = min(h, int(oy2 * scale_factor) + halo)
+        result = self.render(image[y1:y2])
+        offset = int((y - y1) / scale_factor)
+        out[oy:oy2] = result[offset : offset + oy2 - oy]
+
+    def _write_output(self, rgba, out):
+        # Blend onto the cleared target, like the render pipeline does
+        rgba *= rgba[..., 3:].copy()
+        np.clip(rgba, 0.0, 1.0, out=rgba)
+        rgba *= 255
+        rgba += 0.5
+        np.floor(rgba, out=out, casting="unsafe")
+
+    def _render_float(self, rgba):
+        raise NotImplementedError()
+
+
+class NumpyDdaa2Renderer(NumpyRenderer):
+    """A CPU implementation of ddaa2.wgsl.
+
+    The pixels that are not on an edge are masked out early, and the edge
+    search is done for all remaining pixels at once, one step of
+    EDGE_STEP_LIST at a time, for the pixels that have not found an end yet.
+    The variable names follow the shader.
+    """
+
+    SHADER = "ddaa2.wgsl"
+
+    TEMPLATE_VARS = {
+        "scaleFactor": 1,
+        "EDGE_STEP_LIST": [3, 3, 3, 3, 3],
+        "LUMA_PREPASS": False,
+    }
+
+    def get_halo(self):
+        # The edge search reaches sum(EDGE_STEP_LIST), plus the neighbourhood
+        return sum(self._get_template_vars()["EDGE_STEP_LIST"]) + 2
+
+    def _render_float(self, rgba):
+        template_vars = self._get_template_vars()
+        assert template_vars["scaleFactor"] == 1, "ddaa2 does not support scaling"
+        edge_step_list = template_vars["EDGE_STEP_LIST"]
+        ddaa_strength = np.float32(template_vars.get("DDAA_STRENGTH", 3.0))
+        threshold_min = np.float32(template_vars.get("EDGE_THRESHOLD_MIN", 0.0625))
+        threshold_max = np.float32(template_vars.get("EDGE_THRESHOLD_MAX", 0.166))
+        luma_prepass = template_vars.get("LUMA_PREPASS", False)
+
+        h, w = rgba.shape[:2]
+        rgb = rgba[..., :3]
+        result = rgba.copy()
+
+        # Get the luma, and the lumas between two rows / columns, which is what
+        # the edge search samples. The luma prepass writes to an r16float texture,
+        # and the edge search then interpolates the luma instead of the color.
+        rgb_padded = np.pad(rgb, ((1, 1), (1, 1), (0, 0)), mode="edge")
+        luma_padded = get_padded_luma(rgb, luma_prepass)
+        if luma_prepass:
+            luma_rows = 0.5 * (luma_padded[:-1, 1:-1] + luma_padded[1:, 1:-1])
+            luma_cols = 0.5 * (luma_padded[1:-1, :-1] + luma_padded[1:-1, 1:])
+        else:
+            luma_rows = rgb2luma(0.5 * (rgb_padded[:-1, 1:-1] + rgb_padded[1:, 1:-1]))
+            luma_cols = rgb2luma(0.5 * (rgb_padded[1:-1, :-1] + rgb_padded[1:-1, 1:]))
+
+        # The 3x3 neighbourhood. Note that N is +y, i.e. the next row.
+        def neighbour(dx, dy):
+            return luma_padded[1 + dy : h + 1 + dy, 1 + dx : w + 1 + dx]
+
+        lumaCenter = neighbour(0, 0)
+        lumaN, lumaE, lumaS, lumaW = (
+            neighbour(0, 1),
+            neighbour(1, 0),
+            neighbour(0, -1),
+            neighbour(-1, 0),
+        )
+
+        # Compute the range, and select the pixels that are on an edge
+        lumaMin = np.minimum(
+            lumaCenter, np.minimum.reduce([lumaS, lumaN, lumaW, lumaE])
+        )
+        lumaMax = np.maximum(
+            lumaCenter, np.maximum.reduce([lumaS, lumaN, lumaW, lumaE])
+        )
+        lumaRange = lumaMax - lumaMin
+        ys, xs = np.nonzero(
+            lumaRange >= np.maximum(threshold_min, lumaMax * threshold_max)
+        )
+
+        # From here on, we only process the pixels on an edge (as 1D arrays)
+        lumaCenter = lumaCenter[ys, xs]
+        lumaN, lumaE, lumaS, lumaW = (
+            lumaN[ys, xs],
+            lumaE[ys, xs],
+            lumaS[ys, xs],
+            lumaW[ys, xs],
+        )
+        lumaNW, lumaNE, lumaSW, lumaSE = (
+            neighbour(-1, 1)[ys, xs],
+            neighbour(1, 1)[ys, xs],
+            neighbour(-1, -1)[ys, xs],
+            neighbour(1, -1)[ys, xs],
+        )
+
+        # Calculate the image gradient using the Scharr kernel
+        k1 = np.float32(162.0 / 256.0)
+        k2 = np.float32(47.0 / 256.0)
+        imDx = (lumaW * k1 + lumaSW * k2 + lumaNW * k2) - (
+            lumaE * k1 + lumaSE * k2 + lumaNE * k2
+        )
+        imDy = (lumaS * k1 + lumaSW * k2 + lumaSE * k2) - (
+            lumaN * k1 + lumaNW * k2 + lumaNE * k2
+        )
+
+        # Get the edge vector (orthogonal to the gradient), and calculate strength and direction
+        edgeLength = np.sqrt(imDx**2 + imDy**2)
+        diffuseStrength = np.sqrt(edgeLength) * ddaa_strength
+        nonzero = diffuseStrength >= 1e-6
+        safeLength = np.where(nonzero, edgeLength, 1)
+        diffuseDirX = np.where(nonzero, -imDy / safeLength, 0)
+        diffuseDirY = np.where(nonzero, imDx / safeLength, 0)
+        diffuseStrength = np.minimum(1, np.where(nonzero, diffuseStrength, 0))
+
+        # Is the local edge horizontal or vertical? Note that the order of the
+        # operations matches the shader, because ties are common (e.g. diagonals).
+        lumaSUp = lumaS + lumaN
+        lumaWRight = lumaW + lumaE
+        lumaWCorners = lumaSW + lumaNW
+        lumaSCorners = lumaSW + lumaSE
+        lumaECorners = lumaSE + lumaNE
+        lumaNCorners = lumaNE + lumaNW
+        edgeHorizontal = (
+            np.abs(-2 * lumaW + lumaWCorners)
+            + np.abs(-2 * lumaCenter + lumaSUp) * 2
+            + np.abs(-2 * lumaE + lumaECorners)
+        )
+        edgeVertical = (
+            np.abs(-2 * lumaN + lumaNCorners)
+            + np.abs(-2 * lumaCenter + lumaWRight) * 2
+            + np.abs(-2 * lumaS + lumaSCorners)
+        )
+        isHorizontal = edgeHorizontal >= edgeVertical
+
+        # Calculate gradient on both sides of the current pixel
+        luma1 = np.where(isHorizontal, lumaS, lumaW)
+        luma2 = np.where(isHorizontal, lumaN, lumaE)
+        gradient1 = luma1 - lumaCenter
+        gradient2 = luma2 - lumaCenter
+
+        # Maintain ridges and thin lines
+        isRidge = np.sign(gradient1) == np.sign(gradient2)
+        ridgeness = np.minimum(np.abs(gradient1), np.abs(gradient2))
+        diffuseStrength *= np.where(isRidge, 1 - np.minimum(1, 10 * ridgeness), 1)
+
+        # Edge search, resulting in an offset (in pixels) perpendicular to the edge
+        edgeOffset = np.zeros_like(lumaCenter)
+        if len(edge_step_list) > 0:
+            gradientScaled = 0.25 * np.maximum(np.abs(gradient1), np.abs(gradient2))
+            gradient2IsHigher = np.abs(gradient2) > np.abs(gradient1)
+            stepSign = np.where(gradient2IsHigher, 1, -1).astype(np.float32)
+            lumaLocalAverage = 0.5 * (
+                np.where(gradient2IsHigher, luma2, luma1) + lumaCenter
+            )
+
+            # The first sample in each direction is obtained from the neighbourhood
+            lumaFirst1 = 0.5 * np.where(
+                isHorizontal,
+                lumaW + np.where(gradient2IsHigher, lumaNW, lumaSW),
+                lumaS + np.where(gradient2IsHigher, lumaSE, lumaSW),
+            )
+            lumaFirst2 = 0.5 * np.where(
+                isHorizontal,
+                lumaE + np.where(gradient2IsHigher, lumaNE, lumaSE),
+                lumaN + np.where(gradient2IsHigher, lumaNE, lumaNW),
+            )
+
+            # Search along the rows (between this row and the next/previous),
+            # or along the columns. By transposing the latter, the search is
+            # the same for both.
+            distance1 = np.empty_like(lumaCenter)
+            distance2 = np.empty_like(lumaCenter)
+            lumaEnd1 = np.empty_like(lumaCenter)
+            lumaEnd2 = np.empty_like(lumaCenter)
+            shift = gradient2IsHigher.astype(np.intp)
+            for select, lumas, across, along in [
+                (isHorizontal, luma_rows, ys + shift, xs),
+                (~isHorizontal, luma_cols.T, xs + shift, ys),
+            ]:
+                for distance, lumaEnd, lumaFirst, direction in [
+                    (distance1, lumaEnd1, lumaFirst1, -1),
+                    (distance2, lumaEnd2, lumaFirst2, 1),
+                ]:
+                    distance[select], lumaEnd[select] = self._search_edge_end(
+                        lumas,
+                        across[select],
+                        along[select],
+                        direction,
+                        lumaFirst[select] - lumaLocalAverage[select],
+                        lumaLocalAverage[select],
+                        gradientScaled[select],
+                        edge_step_list,
+                    )
+
+            # UV offset: read in the direction of the closest side of the edge
+            pixelOffset = (
+                -np.minimum(distance1, distance2) / (distance1 + distance2) + 0.5
+            )
+
+            # If the luma at center is smaller than at its neighbor, the delta luma
+            # at each end should be positive (same variation).
+            isLumaCenterSmaller = lumaCenter < lumaLocalAverage
+            lumaEnd = np.where(distance1 < distance2, lumaEnd1, lumaEnd2)
+            correctVariation = (lumaEnd < 0) != isLumaCenterSmaller
+            edgeOffset = np.where(correctVariation, pixelOffset * stepSign, 0)
+
+        # Mix the effect of the edge-search with the directional diffusion
+        edgeStrength = np.minimum(1, np.abs(2 * edgeOffset))
+        diffuseStep = 0.51 * diffuseStrength * (1 - edgeStrength)
+        x = xs + np.where(isHorizontal, 0, edgeOffset).astype(np.float32) + 0.5
+        y = ys + np.where(isHorizontal, edgeOffset, 0).astype(np.float32) + 0.5
+        dx = diffuseDirX * diffuseStep
+        dy = diffuseDirY * diffuseStep
+
+        # Sample the final color
+        finalColor = 0.5 * sample_bilinear(rgb, x - dx, y - dy)
+        finalColor += 0.5 * sample_bilinear(rgb, x + dx, y + dy)
+        result[ys, xs, :3] = finalColor
+        return result
+
+    def _search_edge_end(
+        self,
+        lumas,
+        across,
+        along,
+        direction,
+        first,
+        lumaLocalAverage,
+        gradientScaled,
+        edge_step_list,
+    ):
+        # Search the end of the edge in one direction, for a set of pixels. The
+        # lumas are sampled at lumas[across, along + direction * distance]. Returns
+        # the distance and the luma (relative to the local average) at the end.
+        n = len(across)
+        max_distance = sum(edge_step_list)
+        distance = np.full(n, max_distance + 1, np.float32)
+        lumaEnd = np.zeros(n, np.float32)
+        active = np.arange(n)
+        offset = 0
+        for i, steps in enumerate(edge_step_list):
+            if len(active) == 0:
+                break
+            distances = np.arange(offset + 1, offset + steps + 1)
+            offset += steps
+            along_i = along[active, np.newaxis] + direction * distances
+            along_i = np.clip(along_i, 0, lumas.shape[1] - 1)
+            lumaEnds = lumas[across[active, np.newaxis], along_i]
+            lumaEnds -= lumaLocalAverage[active, np.newaxis]
+            if i == 0:
+                # The first sample we get for free
+                lumaEnds[:, 0] = first[active]
+            else:
+                lumaEnd[active] = lumaEnds[:, -1]
+            # Find the closest end, for the pixels that have one in this step
+            found = np.abs(lumaEnds) >= gradientScaled[active, np.newaxis]
+            has_end = found.any(axis=1)
+            closest = found[has_end].argmax(axis=1)
+            distance[active[has_end]] = distances[closest]
+            lumaEnd[active[has_end]] = lumaEnds[has_end][
+                np.arange(len(closest)), closest
+            ]
+            active = active[~has_end]
+        return distance, lumaEnd
+
+
+class NumpyFxaa3cRenderer(NumpyRenderer):
+    """A CPU implementation of fxaa3c.wgsl (FXAA 3.11 console).
+
+    The variable names follow the shader.
+    """
+
+    SHADER = "fxaa3c.wgsl"
+
+    TEMPLATE_VARS = {"scaleFactor": 1, "LUMA_PREPASS": False}
+
+    EDGE_THRESHOLD_MIN = 0.0625
+    EDGE_THRESHOLD_MAX = 0.166
+    EDGE_SHARPNESS = 8.0
+
+    # The farthest tap is 4 pixels away (plus interpolation)
+    HALO = 6
+
+    def _render_float(self, rgba):
+        template_vars = self._get_template_vars()
+        assert template_vars["scaleFactor"] == 1, "fxaa3c does not support scaling"
+        luma_prepass = template_vars.get("LUMA_PREPASS", False)
+
+        result = rgba.copy()
+
+        # The lumas at the (diagonal) corners. Note that N is -y here.
+        luma_padded = get_padded_luma(rgba[..., :3], luma_prepass)
+        lumaNw = luma_padded[:-2, :-2]
+        lumaSw = luma_padded[2:, :-2]
+        lumaNe = luma_padded[:-2, 2:] + np.float32(1.0 / 384.0)
+        lumaSe = luma_padded[2:, 2:]
+        lumaM = luma_padded[1:-1, 1:-1]
+
+        lumaMax = np.maximum(np.maximum(lumaNe, lumaSe), np.maximum(lumaNw, lumaSw))
+        lumaMin = np.minimum(np.minimum(lumaNe, lumaSe), np.minimum(lumaNw, lumaSw))
+        lumaMaxScaledClamped = np.maximum(
+            np.float32(self.EDGE_THRESHOLD_MIN),
+            lumaMax * np.float32(self.EDGE_THRESHOLD_MAX),
+        )
+        lumaMaxSubMinM = np.maximum(lumaMax, lumaM) - np.minimum(lumaMin, lumaM)
+        ys, xs = np.nonzero(lumaMaxSubMinM >= lumaMaxScaledClamped)
+
+        # From here on, we only process the pixels on an edge (as 1D arrays)
+        dirSwMinusNe = lumaSw[ys, xs] - lumaNe[ys, xs]
+        dirSeMinusNw = lumaSe[ys, xs] - lumaNw[ys, xs]
+        lumaMin = lumaMin[ys, xs]
+        lumaMax = lumaMax[ys, xs]
+        dirX = dirSwMinusNe + dirSeMinusNw
+        dirY = dirSwMinusNe - dirSeMinusNw
+        with np.errstate(divide="ignore", invalid="ignore"):
+            dirLength = np.sqrt(dirX**2 + dirY**2)
+            dir1X = np.nan_to_num(dirX / dirLength)
+            dir1Y = np.nan_to_num(dirY / dirLength)
+            dirAbsMinTimesC = np.minimum(np.abs(dir1X), np.abs(dir1Y))
+            dirAbsMinTimesC *= np.float32(self.EDGE_SHARPNESS)
+            # Like clamp() on the GPU, which returns the bound for NaN
+            dir2X = np.fmin(np.fmax(dir1X / dirAbsMinTimesC, -2), 2)
+            dir2Y = np.fmin(np.fmax(dir1Y / dirAbsMinTimesC, -2), 2)
+
+        x = xs + np.float32(0.5)
+        y = ys + np.float32(0.5)
+        rgbyN1 = sample_bilinear(rgba, x - 0.5 * dir1X, y - 0.5 * dir1Y)
+        rgbyP1 = sample_bilinear(rgba, x + 0.5 * dir1X, y + 0.5 * dir1Y)
+        rgbyN2 = sample_bilinear(rgba, x - 2 * dir2X, y - 2 * dir2Y)
+        rgbyP2 = sample_bilinear(rgba, x + 2 * dir2X, y + 2 * dir2Y)
+        rgbyA = rgbyN1 + rgbyP1
+        rgbyB = ((rgbyN2 + rgbyP2) * 0.25) + (rgbyA * 0.25)
+        lumaB = rgb2luma(rgbyB[:, :3])
+        twoTap = (lumaB < lumaMin) | (lumaB > lumaMax)
+        rgbyB[twoTap, :3] = rgbyA[twoTap, :3] * 0.5
+
+        result[ys, xs] = rgbyB
+        return result
+
+
+class NumpyFxaa3dRenderer(NumpyRenderer):
+    """A CPU implementation of fxaa3d.wgsl (FXAA 3.11 desktop).
+
+    The pixels that are not on an edge are masked out early, and the edge
+    search is done for all remaining pixels at once, one iteration at a time,
+    for the pixels that have not reached the end yet. The variable names
+    follow the shader.
+    """
+
+    SHADER = "fxaa3d.wgsl"
+
+    TEMPLATE_VARS = {"scaleFactor": 1, "LUMA_PREPASS": False}
+
+    EDGE_THRESHOLD_MIN = 0.0625
+    EDGE_THRESHOLD_MAX = 0.166
+    SUBPIXEL_QUALITY = 0.75
+
+    # The step size of each iteration of the edge search
+    QUALITY = [1.0, 1.0, 1.0, 1.0, 1.0, 1.5, 2.0, 2.0, 2.0, 2.0, 4.0, 8.0]
+
+    def get_halo(self):
+        return int(sum(self.QUALITY)) + 2
+
+    def _render_float(self, rgba):
+        template_vars = self._get_template_vars()
+        assert template_vars["scaleFactor"] == 1, "fxaa3d does not support scaling"
+        luma_prepass = template_vars.get("LUMA_PREPASS", False)
+
+        h, w = rgba.shape[:2]
+        rgb = rgba[..., :3]
+        result = rgba.copy()
+
+        # The 3x3 neighbourhood. Note that up is +y.
+        luma_padded = get_padded_luma(rgb, luma_prepass)
+
+        def neighbour(dx, dy):
+            return luma_padded[1 + dy : h + 1 + dy, 1 + dx : w + 1 + dx]
+
+        lumaCenter = neighbour(0, 0)
+        lumaDown, lumaUp = neighbour(0, -1), neighbour(0, 1)
+        lumaLeft, lumaRight = neighbour(-1, 0), neighbour(1, 0)
+
+        # Find the pixels that are on an edge
+        lumaMin = np.minimum(
+            lumaCenter,
+            np.minimum(np.minimum(lumaDown, lumaUp), np.minimum(lumaLeft, lumaRight)),
+        )
+        lumaMax = np.maximum(
+            lumaCenter,
+            np.maximum(np.maximum(lumaDown, lumaUp), np.maximum(lumaLeft, lumaRight)),
+        )
+        lumaRange = lumaMax - lumaMin
+        threshold = np.maximum(
+            np.float32(self.EDGE_THRESHOLD_MIN),
+            lumaMax * np.float32(self.EDGE_THRESHOLD_MAX),
+        )
+        ys, xs = np.nonzero(lumaRange >= threshold)
+
+        # From here on, we only process the pixels on an edge (as 1D arrays)
+        lumaCenter, lumaRange = lumaCenter[ys, xs], lumaRange[ys, xs]
+        lumaDown, lumaUp = lumaDown[ys, xs], lumaUp[ys, xs]
+        lumaLeft, lumaRight = lumaLeft[ys, xs], lumaRight[ys, xs]
+        lumaDownLeft = neighbour(-1, -1)[ys, xs]
+        lumaUpRight = neighbour(1, 1)[ys, xs]
+        lumaUpLeft = neighbour(-1, 1)[ys, xs]
+        lumaDownRight = neighbour(1, -1)[ys, xs]
+
+        lumaDownUp = lumaDown + lumaUp
+        lumaLeftRight = lumaLeft + lumaRight
+        lumaLeftCorners = lumaDownLeft + lumaUpLeft
+        lumaDownCorners = lumaDownLeft + lumaDownRight
+        lumaRightCorners = lumaDownRight + lumaUpRight
+        lumaUpCorners = lumaUpRight + lumaUpLeft
+
+        # Is the local edge horizontal or vertical?
+        edgeHorizontal = (
+            np.abs(-2 * lumaLeft + lumaLeftCorners)
+            + np.abs(-2 * lumaCenter + lumaDownUp) * 2
+            + np.abs(-2 * lumaRight + lumaRightCorners)
+        )
+        edgeVertical = (
+            np.abs(-2 * lumaUp + lumaUpCorners)
+            + np.abs(-2 * lumaCenter + lumaLeftRight) * 2
+            + np.abs(-2 * lumaDown + lumaDownCorners)
+        )
+        isHorizontal = edgeHorizontal >= edgeVertical
+
+        # Select the two neighboring texels lumas in the opposite direction to the local edge
+        luma1 = np.where(isHorizontal, lumaDown, lumaLeft)
+        luma2 = np.where(isHorizontal, lumaUp, lumaRight)
+        gradient1 = luma1 - lumaCenter
+        gradient2 = luma2 - lumaCenter
+        is1Steepest = np.abs(gradient1) >= np.abs(gradient2)
+        gradientScaled = 0.25 * np.maximum(np.abs(gradient1), np.abs(gradient2))
+        stepSign = np.where(is1Steepest, -1, 1).astype(np.float32)
+        lumaLocalAverage = 0.5 * (np.where(is1Steepest, luma1, luma2) + lumaCenter)
+
+        # The planes to search in: between two rows (for horizontal edges), or
+        # between two columns (transposed, so the search is the same for both).
+        # The search samples at fractional positions along the edge, so without
+        # luma prepass, the color is interpolated.
+        if luma_prepass:
+            plane = luma_padded[..., np.newaxis]
+        else:
+            plane = np.pad(rgb, ((1, 1), (1, 1), (0, 0)), mode="edge")
+        rows = 0.5 * (plane[:-1, 1:-1] + plane[1:, 1:-1])
+        cols = (0.5 * (plane[1:-1, :-1] + plane[1:-1, 1:])).transpose(1, 0, 2)
+
+        distance1 = np.empty_like(lumaCenter)
+        distance2 = np.empty_like(lumaCenter)
+        lumaEnd1 = np.empty_like(lumaCenter)
+        lumaEnd2 = np.empty_like(lumaCenter)
+        shift = (~is1Steepest).astype(np.intp)
+        for select, plane, across, along in [
+            (isHorizontal, rows, ys + shift, xs),
+            (~isHorizontal, cols, xs + shift, ys),
+        ]:
+            for distance, lumaEnd, direction in [
+                (distance1, lumaEnd1, -1),
+                (distance2, lumaEnd2, 1),
+            ]:
+                distance[select], lumaEnd[select] = self._search_edge_end(
+                    plane,
+                    across[select],
+                    along[select],
+                    direction,
+                    lumaLocalAverage[select],
+                    gradientScaled[select],
+                )
+
+        # Only keep the result in the direction of the closer side of the edge
+        isDirection1 = distance1 < distance2
+        distanceFinal = np.minimum(distance1, distance2)
+        edgeThickness = distance1 + distance2
+        isLumaCenterSmaller = lumaCenter < lumaLocalAverage
+        correctVariation = (
+            np.where(isDirection1, lumaEnd1, lumaEnd2) < 0
+        ) != isLumaCenterSmaller
+        pixelOffset = -distanceFinal / edgeThickness + 0.5
+        finalOffset = np.where(correctVariation, pixelOffset, 0)
+
+        # Sub-pixel shifting
+        lumaAverage = np.float32(1.0 / 12.0) * (
+            2 * (lumaDownUp + lumaLeftRight) + lumaLeftCorners + lumaRightCorners
+        )
+        subPixelOffset1 = np.clip(np.abs(lumaAverage - lumaCenter) / lumaRange, 0, 1)
+        subPixelOffset2 = (-2 * subPixelOffset1 + 3) * subPixelOffset1 * subPixelOffset1
+        subPixelOffsetFinal = (
+            subPixelOffset2 * subPixelOffset2 * np.float32(self.SUBPIXEL_QUALITY)
+        )
+        finalOffset = np.maximum(finalOffset, subPixelOffsetFinal) * stepSign
+
+        # Read the color at the final position
+        x = xs + np.where(isHorizontal, 0, finalOffset).astype(np.float32) + 0.5
+        y = ys + np.where(isHorizontal, finalOffset, 0).astype(np.float32) + 0.5
+        result[ys, xs, :3] = sample_bilinear(rgb, x, y)
+        return result
+
+    def _search_edge_end(
+        self, plane, across, along, direction, lumaLocalAverage, gradientScaled
+    ):
+        # Search the end of the edge in one direction, for a set of pixels. The
+        # lumas are sampled at plane[across, along + direction * distance],
+        # interpolating along. Returns the distance and the luma (relative to the
+        # local average) at the end.
+        n = len(across)
+        distance = np.zeros(n, np.float32)
+        lumaEnd = np.zeros(n, np.float32)
+        active = np.arange(n)
+        size = plane.shape[1]
+        # Like the shader, the second step in the positive direction goes backwards
+        # (uv2 - offset), so the search there samples at 1, 0, 1, 2, ... pixels.
+        steps = list(self.QUALITY)
+        if direction > 0:
+            steps[1] = -steps[1]
+        for quality in steps[:-1]:
+            distance[active] += quality
+            if len(active) == 0:
+                continue
+            pos = along[active] + direction * distance[active]
+            pos0 = np.floor(pos)
+            f = (pos - pos0)[:, np.newaxis]
+            pos0 = pos0.astype(np.intp)
+            pos1 = np.clip(pos0 + 1, 0, size - 1)
+            pos0 = np.clip(pos0, 0, size - 1)
+            sample = (
+                plane[across[active], pos0] * (1 - f) + plane[across[active], pos1] * f
+            )
+            luma = sample[:, 0] if sample.shape[1] == 1 else rgb2luma(sample)
+            lumaEnd[active] = luma - lumaLocalAverage[active]
+            reached = np.abs(lumaEnd[active]) >= gradientScaled[active]
+            active = active[~reached]
+        # If the end was not reached, the position was still moved forward
+        distance[active] += steps[-1]
+        return distance, lumaEnd
+
+
+# The (B, C) parameters of the cubic filters, see cubicWeights() in ssaa.wgsl
+CUBIC_FILTERS = {
+    "bspline": (1.0, 0.0),
+    "mitchell": (1 / 3, 1 / 3),
+    "catmull": (0.0, 0.5),
+    "cubictent": (0.0, 0.0),
+}
+
+# The radius of the filters, in units of sigma
+FILTER_RADIUS = {"box": 0.5, "tent": 1.0, **dict.fromkeys(CUBIC_FILTERS, 2.0)}
+
+
+def filter_weights(filter, t):
+    """The 1D weights of a filter at the given offsets, as in ssaa.wgsl."""
+    if filter == "box":
+        return ((-0.5 < t) & (t <= 0.5)).astype(np.float32)
+    elif filter == "tent":
+        return np.maximum(0, 1 - np.abs(t))
+    B, C = CUBIC_FILTERS[filter]
+    t = np.abs(t)
+    t2 = t * t
+    t3 = t2 * t
+    w1 = (12 - 9 * B - 6 * C) * t3 + (-18 + 12 * B + 6 * C) * t2 + (6 - 2 * B)
+    w2 = (
+        (-B - 6 * C) * t3
+        + (6 * B + 30 * C) * t2
+        + (-12 * B - 48 * C) * t
+        + (8 * B + 24 * C)
+    )
+    w = np.where(t < 1, w1, np.where(t <= 2, w2, 0))
+    return (w / 6).astype(np.float32)
+
+
+@functools.lru_cache(maxsize=64)
+def get_filter_table(filter, scale_factor, size, out_size, extra_support=0):
+    """Get the taps of a separable filter, for resampling one axis.
+
+    Returns the source indices and the (normalized) weights, both with shape
+    (out_size, ntaps). For a rational scale factor, the rows of the table repeat
+    with the period of the phase, but the indices are clamped per row at the edges.
+    """
+    # The sample position of each output pixel, in source pixels, as in the shader
+    pos = (np.arange(out_size, dtype=np.float32) + 0.5) / np.float32(out_size)
+    pos *= np.float32(size)
+    if filter == "nearest":
+        indices = np.floor(pos).astype(np.intp)[:, np.newaxis]
+        weights = np.ones((out_size, 1), np.float32)
+        return np.clip(indices, 0, size - 1), weights
+    elif filter == "linear":
+        filter, sigma, radius = "tent", 1.0, 1.0
+    else:
+        sigma = max(scale_factor, 1.0)
+        radius = FILTER_RADIUS[filter] * sigma + extra_support
+    # All taps for which the filter can be nonzero. Note that, unlike the single
+    # pass of the shader, the kernel is not truncated for large scale factors.
+    first = np.floor(pos - radius).astype(np.intp)
+    ntaps = int(np.ceil(2 * radius)) + 2
+    indices = first[:, np.newaxis] + np.arange(ntaps)
+    t = (indices + np.float32(0.5) - pos[:, np.newaxis]) / np.float32(sigma)
+    weights = filter_weights(filter, t)
+    # Drop the taps at the ends that are zero for all output pixels
+    nonzero = np.flatnonzero(weights.any(axis=0))
+    indices = indices[:, nonzero[0] : nonzero[-1] + 1]
+    weights = weights[:, nonzero[0] : nonzero[-1] + 1]
+    total = weights.sum(axis=1, keepdims=True)
+    weights /= np.where(total == 0, 1, total)
+    return np.clip(indices, 0, size - 1), weights
+
+
+class NumpySsaaRenderer(NumpyRenderer):
+    """A CPU implementation of ssaa.wgsl, for downsampling and upsampling.
+
+    The filters are separable, so the image is resampled with a horizontal
+    pass followed by a vertical pass, using precomputed tables of taps and
+    weights. The output is processed in blocks of ROW_BLOCK_SIZE rows, to bound
+    the memory. Like the separable mode of the shader (and unlike its single
+    pass), the kernel is not truncated for scale factors larger than 4, nor are
+    the corners of large kernels skipped. The 'disk'
+    filter is not separable, and not supported.
+    """
+
+    SHADER = "ssaa.wgsl"
+
+    TEMPLATE_VARS = {
+        "scaleFactor": 1,
+        "filter": "mitchell",
+        "extraKernelSupport": None,
+        "gamma": 1.0,
+        # Only used by the shader
+        "optTaps": True,
+        "optCorners": True,
+    }
+
+    def _get_filter(self):
+        template_vars = self._get_template_vars()
+        filter = template_vars["filter"]
+        # As in the shader, with scale factor 1, use linear interpolation
+        if template_vars["scaleFactor"] == 1 and filter != "nearest":
+            filter = "linear"
+        assert filter in ["nearest", "linear", *FILTER_RADIUS], (
+            f"Filter {filter!r} is not supported on the CPU."
+        )
+        return filter
+
+    def get_halo(self):
+        template_vars = self._get_template_vars()
+        filter = self._get_filter()
+        if filter in ["nearest", "linear"]:
+            return 2
+        sigma = max(template_vars["scaleFactor"], 1)
+        extra_support = template_vars["extraKernelSupport"] or 0
+        return int(np.ceil(FILTER_RADIUS[filter] * sigma + extra_support)) + 2
+
+    def _render_image(self, image, out):
+        self._render_rows(image, out, 0, out.shape[0])
+
+    def _render_rows(self, image, out, oy, oy2):
+        # The filter tables are for the whole image, so rendering a subset of
+        # the rows gives the same result, and does not need a halo.
+        template_vars = self._get_template_vars()
+        scale_factor = template_vars["scaleFactor"]
+        extra_support = template_vars["extraKernelSupport"] or 0
+        gamma = template_vars.get("gamma", 1.0)
+        filter = self._get_filter()
+
+        h, w = image.shape[:2]
+        h2, w2 = out.shape[:2]
+        indices_x, weights_x = get_filter_table(
+            filter, scale_factor, w, w2, extra_support
+        )
+        indices_y, weights_y = get_filter_table(
+            filter, scale_factor, h, h2, extra_support
+        )
+
+        for y1 in range(oy, oy2, ROW_BLOCK_SIZE):
+            y2 = min(oy2, y1 + ROW_BLOCK_SIZE)
+            # Resample the source rows that this block needs horizontally ...
+            rows = indices_y[y1:y2]
+            row1, row2 = rows.min(), rows.max() + 1
+            source = image[row1:row2].astype(np.float32) / 255
+            tmp = np.zeros((row2 - row1, w2, 4), np.float32)
+            for i in range(indices_x.shape[1]):
+                tmp += weights_x[:, i, np.newaxis] * source[:, indices_x[:, i]]
+            # ... and then vertically
+            block = np.zeros((y2 - y1, w2, 4), np.float32)
+            for i in range(indices_y.shape[1]):
+                block += (
+                    weights_y[y1:y2, i, np.newaxis, np.newaxis] * tmp[rows[:, i] - row1]
+                )
+            if gamma != 1.0:
+                block[..., :3] **= gamma
+            # The shader returns premultiplied color
+            alpha = block[..., 3:]
+            block = np.concatenate([block[..., :3] * alpha, alpha * alpha], axis=-1)
+            self._write_output(block, out[y1:y2])
+
+
+class ParallelNumpyRenderer(NumpyRenderer):
+    """Render with a NumpyRenderer on multiple cores.
+
+    The output is split in bands of rows, which are rendered by a pool of
+    worker processes. Each band is rendered from the input rows that it needs,
+    i.e. overlapping its neighbours by the renderer's ``get_halo()``. The input
+    and output images are in shared memory, so the workers only get the names
+    of the shared memory blocks and the rows to render. The result is identical
+    to rendering with the renderer directly.
+
+    The number of ``workers`` defaults to the number of cores. Call ``close()``
+    to stop the workers and release the shared memory.
+    """
+
+    def __init__(self, renderer, workers=None):
+        self.renderer = renderer
+        self.workers = workers or os.cpu_count()
+        self.SHADER = renderer.SHADER
+        self._template_vars = renderer._template_vars
+        self._pool = None
+        self._shared = {}  # role -> SharedMemory
+
+    def _get_template_vars(self):
+        return self.renderer._get_template_vars()
+
+    def get_output_size(self, w, h):
+        return self.renderer.get_output_size(w, h)
+
+    def get_halo(self):
+        return self.renderer.get_halo()
+
+    def close(self):
+        """Stop the worker processes, and release the shared memory."""
+        if self._pool is not None:
+            self._pool.shutdown()
+            self._pool = None
+        for shm in self._shared.values():
+            shm.close()
+            shm.unlink()
+        self._shared.clear()
+
+    def __del__(self):
+        self.close()
+
+    def _get_shared_array(self, role, shape):
+        # Get an array in shared memory, re-using the block of the previous call
+        nbytes = int(np.prod(shape))
+        shm = self._shared.get(role)
+        if shm is None or shm.size < nbytes:
+            if shm is not None:
+                shm.close()
+                shm.unlink()
+            shm = shared_memory.SharedMemory(create=True, size=nbytes)
+            self._shared[role] = shm
+        return shm.name, np.ndarray(shape, np.uint8, buffer=shm.buf)
+
+    def _get_bands(self, h2):
+        # Get the bands of output rows. Band boundaries must be at a multiple of
+        # the inverse of the scale factor, as in render_tiled().
+        scale_factor = Fraction(self._get_template_vars()["scaleFactor"])
+        step = scale_factor.limit_denominator(1000).denominator
+        band_size = -(-h2 // (self.workers * BANDS_PER_WORKER))
+        band_size = max(MIN_BAND_SIZE, band_size)
+        band_size = -(-band_size // step) * step
+        return [(oy, min(h2, oy + band_size)) for oy in range(0, h2, band_size)]
+
+    def _render_image(self, image, out):
+        bands = self._get_bands(out.shape[0])
+        if len(bands) == 1 or self.workers == 1:
+            self.renderer._render_image(image, out)
+            return
+
+        if self._pool is None:
+            self._pool = ProcessPoolExecutor(self.workers)
+        input_name, input_array = self._get_shared_array("input", image.shape)
+        output_name, output_array = self._get_shared_array("output", out.shape)
+        input_array[:] = image
+
+        futures = [
+            self._pool.submit(
+                _render_band,
+                self.renderer,
+                (input_name, image.shape),
+                (output_name, out.shape),
+                *band,
+            )
+            for band in bands
+        ]
+        for future in futures:
+            future.result()
+        out[:] = output_array
+
+
+# The shared memory blocks that a worker process has attached to, per role
+_attached = {}
+
+
+def _attach_shared_array(role, name, shape):
+    shm = _attached.get(role)
+    if shm is None or shm.name != name:
+        if shm is not None:
+            shm.close()
+        shm = shared_memory.SharedMemory(name=name)
+        _attached[role] = shm
+    return np.ndarray(shape, np.uint8, buffer=shm.buf)
+
+
+def _render_band(renderer, input_info, output_info, oy, oy2):
+    # Render a band of output rows in a worker process
+    image = _attach_shared_array("input", *input_info)
+    out = _attach_shared_array("output", *output_info)
+    renderer._render_rows(image, out, oy, oy2)
@@ -3,7 +3,15 @@ Utility to do a full-screen pass using a WGSL shader.
 """
 
 import os
+import re
+import json
+import math
 import time
+import hashlib
+import weakref
+import functools
+from fractions import Fraction
+from collections import OrderedDict, deque
 
 import jinja2
 import wgpu
@@ -12,6 +20,10 @@ import numpy as np
 
 shader_dir = os.path.abspath(os.path.join(__file__, "..", "..", "wgsl"))
 
+# Templated shaders and validation results are cached here, so that warm starts
+# skip the templating. Entries are content-addressed, so they never go stale.
+cache_dir = os.environ.get("PPAA_CACHE_DIR", os.path.join(shader_dir, ".cache"))
+
 
 jinja_env = jinja2.Environment(
     block_start_string="{$",
@@ -20,6 +32,8 @@ jinja_env = jinja2.Environment(
     variable_end_string="}}",
     line_statement_prefix="$$",
     undefined=jinja2.StrictUndefined,
+    # For shaders that include or import other files in the wgsl dir
+    loader=jinja2.FileSystemLoader(shader_dir),
 )
 
 
@@ -31,6 +45,91 @@ def apply_templating(code, **kwargs):
         raise ValueError(f"Cannot compose shader: {err.args[0]}") from None
 
 
+@functools.lru_cache(maxsize=None)
+def load_shader(filename):
+    """Load the source of a shader in the wgsl dir."""
+    with open(os.path.join(shader_dir, filename), "rb") as f:
+        return f.read().decode()
+
+
+def read_cache_file(name):
+    """Read a file from the cache dir. Returns None if it does not exist."""
+    try:
+        with open(os.path.join(cache_dir, name), "rb") as f:
+            return f.read().decode()
+    except FileNotFoundError:
+        return None
+
+
+def write_cache_file(name, text):
+    """Write a file to the cache dir.
+
+    The file is written under a temporary name and then renamed, so that
+    concurrent processes never see a partially written file.
+    """
+    os.makedirs(cache_dir, exist_ok=True)
+    filename = os.path.join(cache_dir, name)
+    tmp_filename = f"{filename}.{os.getpid()}.tmp"
+    with open(tmp_filename, "wb") as f:
+        f.write(text.encode())
+    os.replace(tmp_filename, filename)
+
+
+def get_shader_sources(filename):
+    """Get the sources of a shader and of the files that it includes or imports."""
+    sources = [load_shader(filename)]
+    for name in re.findall(r'(?:include|import|from)\s+"([^"]+)"', sources[0]):
+        sources.extend(get_shader_sources(name))
+    return sources
+
+
+_templated_shaders = {}
+
+
+def get_templated_shader(filename, template_vars):
+    """Get the shader with templating applied.
+
+    Results are cached in memory, and on disk, keyed by the hash of the shader
+    source (including the files that it includes) and the template vars.
+    """
+    key = filename, repr(sorted(template_vars.items()))
+    wgsl = _templated_shaders.get(key)
+    if wgsl is None:
+        sources = get_shader_sources(filename)
+        digest = hashlib.sha1(("".join(sources) + key[1]).encode()).hexdigest()
+        cache_name = f"{filename.rpartition('.')[0]}-{digest}.wgsl"
+        wgsl = read_cache_file(cache_name)
+        if wgsl is None:
+            wgsl = apply_templating(sources[0], **template_vars)
+            write_cache_file(cache_name, wgsl)
+        _templated_shaders[key] = wgsl
+    return wgsl
+
+
+def create_shader_module(device, code):
+    """Create a shader module, caching the result of the validation on disk.
+
+    A shader that failed validation before (with the same wgpu version and
+    device features) raises right away, without invoking the compiler. Other
+    errors (e.g. a lost device) are not cached.
+    """
+    features = sorted(str(f) for f in device.features)
+    digest = hashlib.sha1(repr((code, wgpu.__version__, features)).encode())
+    cache_name = f"validation-{digest.hexdigest()}.json"
+    cached = read_cache_file(cache_name)
+    if cached is not None and not json.loads(cached)["valid"]:
+        error = json.loads(cached)["error"]
+        raise ValueError(f"Shader failed validation (cached result): {error}")
+    try:
+        shader_module = device.create_shader_module(code=code)
+    except wgpu.GPUValidationError as err:
+        write_cache_file(cache_name, json.dumps({"valid": False, "error": str(err)}))
+        raise
+    if cached is None:
+        write_cache_file(cache_name, json.dumps({"valid": True, "error": None}))
+    return shader_module
+
+
 SHADER_TEMPLATE = """
 
 struct VertexInput {
@@ -61,59 +160,694 @@ var texSampler: sampler;
 """
 
 
+COMPUTE_SHADER_TEMPLATE = """
+
+@group(0) @binding(0)
+var colorTex: texture_2d<f32>;
+@group(0) @binding(1)
+var texSampler: sampler;
+@group(0) @binding(2)
+var outTex: texture_storage_2d<rgba8unorm, write>;
+
+// Store a color like the fullscreen pipeline's blending (onto a cleared target) does
+fn storeColor(pixel: vec2i, color: vec4f) {
+    textureStore(outTex, pixel, vec4f(color.rgb * color.a, color.a * color.a));
+}
+
+"""
+
+
+# The default memory budget (in bytes) for the textures held by a resource pool.
+DEFAULT_POOL_BYTES = 256 * 1024 * 1024
+
+# The max size (in bytes) of the input images processed in one batch by render_stack().
+MAX_BATCH_BYTES = 256 * 1024 * 1024
+
+# The max size (in pixels, of the input and the output) of a tile in render_tiled().
+MAX_TILE_SIZE = 4096
+
+# The number of times that each stage is run in benchmark mode.
+BENCHMARK_ITERATIONS = 100
+
+BYTES_PER_TEXEL = {
+    "rgba8unorm": 4,
+    "r16float": 2,
+    "r32float": 4,
+    "rgba16float": 8,
+}
+
+
+class PooledTexture:
+    """A texture held by a ResourcePool, with a 2D view for each layer."""
+
+    def __init__(self, texture, key, nbytes):
+        self.texture = texture
+        self.views = [
+            texture.create_view(dimension="2d", base_array_layer=i, array_layer_count=1)
+            for i in range(texture.depth_or_array_layers)
+        ]
+        self.view = self.views[0]
+        self.key = key
+        self.nbytes = nbytes
+
+    def destroy(self):
+        self.texture.destroy()
+
+
+class PooledBuffer:
+    """A buffer held by a ResourcePool."""
+
+    def __init__(self, buffer, key, nbytes):
+        self.buffer = buffer
+        self.views = []
+        self.key = key
+        self.nbytes = nbytes
+
+    def destroy(self):
+        self.buffer.destroy()
+
+
+class ResourcePool:
+    """A per-device pool of textures, buffers, samplers and bind groups.
+
+    Textures are keyed by (width, height, format, usage, layers), and buffers by
+    (size, usage). A released resource goes back into the pool and is handed out
+    again for the next request with the same key (a texture together with its
+    views and the bind groups that use it). When the total size of the pooled
+    resources exceeds ``max_bytes``, free resources are destroyed in
+    least-recently-used order.
+
+    The ``hits`` and ``misses`` counters include all resource kinds, so in a steady
+    state (e.g. rendering many frames of the same size) ``misses`` stays constant.
+    """
+
+    def __init__(self, device, max_bytes=DEFAULT_POOL_BYTES):
+        self._device = device
+        self.max_bytes = max_bytes
+        self._free = {}  # key -> list of pooled resources
+        self._lru = OrderedDict()  # free pooled resources, least recently used first
+        self._samplers = {}
+        self._bind_groups = {}
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.nbytes = 0  # bytes currently held by the pool (in use and free)
+
+    def __repr__(self):
+        return (
+            f"<ResourcePool {self.nbytes / 2**20:0.1f} MiB / {self.max_bytes / 2**20:0.0f} MiB, "
+            f"hits: {self.hits}, misses: {self.misses}, evictions: {self.evictions}>"
+        )
+
+    def stats(self):
+        """Get a dict with the pool's counters."""
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "nbytes": self.nbytes,
+            "max_bytes": self.max_bytes,
+        }
+
+    def _acquire_free(self, key):
+        free_list = self._free.get(key)
+        if free_list:
+            entry = free_list.pop()
+            self._lru.pop(entry)
+            self.hits += 1
+            return entry
+        self.misses += 1
+        return None
+
+    def acquire_texture(self, w, h, usage, format="rgba8unorm", layers=1):
+        """Get a PooledTexture. Call ``release()`` when done with it."""
+        key = ("texture", w, h, format, usage, layers)
+        entry = self._acquire_free(key)
+        if entry is None:
+            nbytes = w * h * layers * BYTES_PER_TEXEL[format]
+            self._evict(self.max_bytes - nbytes)
+            texture = self._device.create_texture(
+                size=(w, h, layers),
+                mip_level_count=1,
+                sample_count=1,
+                dimension="2d",
+                format=format,
+                usage=usage,
+            )
+            self.nbytes += nbytes
+            entry = PooledTexture(texture, key, nbytes)
+        return entry
+
+    def acquire_buffer(self, size, usage):
+        """Get a PooledBuffer. Call ``release()`` when done with it."""
+        key = ("buffer", size, usage)
+        entry = self._acquire_free(key)
+        if entry is None:
+            self._evict(self.max_bytes - size)
+            buffer = self._device.create_buffer(size=size, usage=usage)
+            self.nbytes += size
+            entry = PooledBuffer(buffer, key, size)
+        return entry
+
+    def release(self, entry):
+        """Put a texture or buffer back into the pool, so it can be re-used."""
+        self._free.setdefault(entry.key, []).append(entry)
+        self._lru[entry] = None
+        self._evict(self.max_bytes)
+
+    def _evict(self, max_bytes):
+        # Destroy free resources until the total size is within max_bytes
+        while self.nbytes > max_bytes and self._lru:
+            entry, _ = self._lru.popitem(last=False)
+            self._free[entry.key].remove(entry)
+            views = set(entry.views)
+            for key in [key for key in self._bind_groups if views.intersection(key)]:
+                self._bind_groups.pop(key)
+            entry.destroy()
+            self.nbytes -= entry.nbytes
+            self.evictions += 1
+
+    def get_sampler(self, **kwargs):
+        """Get a sampler with the given properties."""
+        key = tuple(sorted(kwargs.items()))
+        sampler = self._samplers.get(key)
+        if sampler is None:
+            self.misses += 1
+            sampler = self._samplers[key] = self._device.create_sampler(**kwargs)
+        else:
+            self.hits += 1
+        return sampler
+
+    def get_bind_group(self, layout, resources):
+        """Get a bind group for the given layout, binding the resources in order."""
+        key = (layout, *resources)
+        bind_group = self._bind_groups.get(key)
+        if bind_group is None:
+            self.misses += 1
+            entries = [
+                {"binding": i, "resource": resource}
+                for i, resource in enumerate(resources)
+            ]
+            bind_group = self._device.create_bind_group(layout=layout, entries=entries)
+            self._bind_groups[key] = bind_group
+        else:
+            self.hits += 1
+        return bind_group
+
+
+_resource_pools = weakref.WeakKeyDictionary()
+
+
+def get_resource_pool(device):
+    """Get the ResourcePool for the given device."""
+    pool = _resource_pools.get(device)
+    if pool is None:
+        pool = _resource_pools[device] = ResourcePool(device)
+    return pool
+
+
+class PipelineCache:
+    """A cache for pipelines (and related objects), keyed by a hash of the full
+    (templated) wgsl and the pipeline layout.
+
+    Keeps track of the number of compiles and the time spent compiling.
+    """
+
+    def __init__(self):
+        self._pipelines = {}
+        self.hits = 0
+        self.compiles = 0
+        self.compile_time = 0.0  # in seconds
+
+    def __repr__(self):
+        return (
+            f"<PipelineCache {len(self._pipelines)} pipelines, hits: {self.hits}, "
+            f"compiles: {self.compiles} in {self.compile_time:0.2f} s>"
+        )
+
+    def stats(self):
+        """Get a dict with the cache's counters."""
+        return {
+            "pipelines": len(self._pipelines),
+            "hits": self.hits,
+            "compiles": self.compiles,
+            "compile_time": self.compile_time,
+        }
+
+    @staticmethod
+    def get_key(wgsl, *layout):
+        """Get the key for the given wgsl and layout description (e.g. dicts)."""
+        return hashlib.sha1((wgsl + repr(layout)).encode()).hexdigest()
+
+    def get(self, key, create):
+        """Get the cached object for key, or create it by calling ``create()``."""
+        result = self._pipelines.get(key)
+        if result is None:
+            t0 = time.perf_counter()
+            result = self._pipelines[key] = create()
+            self.compile_time += time.perf_counter() - t0
+            self.compiles += 1
+        else:
+            self.hits += 1
+        return result
+
+
+class DeviceContext:
+    """A device with its resource pool and pipeline cache.
+
+    There is one context per adapter, shared by all renderers in the process.
+    Use ``get_device_context()`` to get it.
+    """
+
+    def __init__(self, adapter):
+        self.adapter = adapter
+        # Subgroups are optional, compute shaders can use them when available
+        features = [wgpu.FeatureName.timestamp_query]
+        self.has_subgroups = wgpu.FeatureName.subgroups in adapter.features
+        if self.has_subgroups:
+            features.append(wgpu.FeatureName.subgroups)
+        self.device = adapter.request_device_sync(required_features=features)
+        self.pool = get_resource_pool(self.device)
+        self.pipeline_cache = PipelineCache()
+        self._timestamp_queries = {}
+        self._sync_buf = self.device.create_buffer(
+            size=4, usage=wgpu.BufferUsage.COPY_SRC
+        )
+
+    def wait_for_gpu(self):
+        """Block until the GPU has finished all submitted work."""
+        # Reading a buffer waits for the queue, and works on all backends.
+        self.device.queue.read_buffer(self._sync_buf)
+
+    def get_timestamp_queries(self, count):
+        """Get a (query_set, query_buf) tuple for the given number of timestamps."""
+        queries = self._timestamp_queries.get(count)
+        if queries is None:
+            query_set = self.device.create_query_set(
+                type=wgpu.QueryType.timestamp, count=count
+            )
+            query_buf = self.device.create_buffer(
+                size=align(8 * count, 256),
+                usage=wgpu.BufferUsage.QUERY_RESOLVE | wgpu.BufferUsage.COPY_SRC,
+            )
+            queries = self._timestamp_queries[count] = query_set, query_buf
+        return queries
+
+    def __repr__(self):
+        return f"<DeviceContext for {self.adapter.summary}>"
+
+
+_device_contexts = weakref.WeakKeyDictionary()
+
+
+def get_device_context(adapter):
+    """Get the DeviceContext for the given adapter."""
+    context = _device_contexts.get(adapter)
+    if context is None:
+        context = _device_contexts[adapter] = DeviceContext(adapter)
+    return context
+
+
+def align(n, alignment):
+    """Round n up to a multiple of alignment."""
+    return (n + alignment - 1) // alignment * alignment
+
+
+def as_texture_data(images):
+    """Get (data, bytes_per_row, rows_per_image) to upload an (N, H, W, 4) array.
+
+    The data is a contiguous 1D view that spans the images, so no copy is made for
+    arrays that are strided, as long as the pixels in each row are contiguous, e.g.
+    a crop of a larger image. Other arrays are copied.
+    """
+    n, h, w = images.shape[:3]
+    stride_n, stride_h, stride_w, stride_c = images.strides
+    if n == 1:
+        stride_n = stride_h * h
+    if (
+        stride_c == 1
+        and stride_w == 4
+        and stride_h >= 4 * w
+        and stride_n >= stride_h * h
+        and stride_n % stride_h == 0
+    ):
+        nbytes = (n - 1) * stride_n + (h - 1) * stride_h + 4 * w
+        data = np.lib.stride_tricks.as_strided(
+            images, shape=(nbytes,), strides=(1,), writeable=False
+        )
+        return data, stride_h, stride_n // stride_h
+    return np.ascontiguousarray(images), 4 * w, h
+
+
+def timing_stats(times):
+    """Get statistics for a series of measured times.
+
+    Returns a dict with the median, the trimmed mean (the mean of the middle
+    half), the 5th and 95th percentiles, and a 95% confidence interval for the
+    median (based on order statistics, so no assumptions about the distribution
+    are made).
+    """
+    times = np.sort(np.asarray(times, np.float64))
+    n = len(times)
+    trimmed = times[n // 4 : n - n // 4]
+    # The ranks that bound the CI of the median, using the normal approximation
+    # to the binomial distribution.
+    half_width = 1.96 * np.sqrt(n) / 2
+    i_low = max(0, int(np.floor(n / 2 - half_width)))
+    i_high = min(n - 1, int(np.ceil(n / 2 + half_width)))
+    return {
+        "n": n,
+        "median": float(np.median(times)),
+        "trimmed_mean": float(trimmed.mean()),
+        "p5": float(np.percentile(times, 5)),
+        "p95": float(np.percentile(times, 95)),
+        "ci_low": float(times[i_low]),
+        "ci_high": float(times[i_high]),
+    }
+
+
+def format_timing_stats(stats, unit="us"):
+    """Format the result of timing_stats() as a short string."""
+    return (
+        f"{stats['median']:0.0f} {unit} "
+        f"(CI {stats['ci_low']:0.0f}-{stats['ci_high']:0.0f}, "
+        f"p5-p95 {stats['p5']:0.0f}-{stats['p95']:0.0f}, "
+        f"tmean {stats['trimmed_mean']:0.0f})"
+    )
+
+
+class FrameInFlight:
+    """A frame that is submitted to the GPU, and whose result is being read back."""
+
+    def __init__(self, textures, staging, size, promise):
+        self.textures = textures
+        self.staging = staging
+        self.size = size
+        self.promise = promise
+
+
 class WgslFullscreenRenderer:
     SHADER = "noaa.wgsl"  # filename of the shader to invoke
 
     TEMPLATE_VARS = {"scaleFactor": 1}
 
-    def __init__(self, adapter, **template_vars):
-        self._shader = open(os.path.join(shader_dir, self.SHADER), "rb").read().decode()
+    # The usage that the target texture needs, on top of COPY_SRC etc.
+    TARGET_USAGE = wgpu.TextureUsage.RENDER_ATTACHMENT
+
+    # The format of the target texture. Only rgba8unorm results can be read back.
+    TARGET_FORMAT = "rgba8unorm"
 
+    # Whether the result is blended onto the (cleared) target texture. Without
+    # blending, the result is written as is, e.g. into an intermediate texture.
+    BLEND = True
+
+    # How far (in input pixels) the shader reads from the pixel that it renders.
+    # The default is conservative; subclasses can override get_halo().
+    HALO = 32
+
+    def __init__(self, adapter, **template_vars):
+        # Note that the device, pipeline and resources are shared between renderers,
+        # so creating a renderer is cheap.
         self._adapter = adapter
+        self._context = None
         self._device = None
         self._pipeline = None
-        self._bind_group = None
+        self._bind_group_layout = None
+        self._luma_renderer = None
+        self._prepass_renderer = None
         self._template_vars = template_vars
 
-    def _apply_wgsl_templating(self, wgsl):
+    def _get_template_vars(self):
         template_vars = {}
         template_vars.update(self.TEMPLATE_VARS)
         template_vars.update(self._template_vars)
-        return apply_templating(wgsl, **template_vars)
+        return template_vars
+
+    def _apply_wgsl_templating(self):
+        return get_templated_shader(self.SHADER, self._get_template_vars())
 
-    def render(self, image, benchmark=None):
+    def _get_full_wgsl(self, templated_wgsl):
+        return SHADER_TEMPLATE + templated_wgsl
+
+    def get_wgsl(self, full=True):
+        """Get the WGSL code of this renderer, with templating applied.
+
+        If ``full`` is False, the boilerplate (the vertex shader and bindings)
+        is omitted.
+        """
+        templated_wgsl = self._apply_wgsl_templating()
+        if not full:
+            return templated_wgsl
+        return self._get_full_wgsl(templated_wgsl)
+
+    def export_wgsl(self, filename, full=True):
+        """Write the WGSL code of this renderer to a file. See ``get_wgsl()``."""
+        with open(filename, "wb") as f:
+            f.write(self.get_wgsl(full).encode())
+
+    def get_halo(self):
+        """Get the number of input pixels that a tile must overlap its neighbours."""
+        return self.HALO
+
+    def render(self, image, out=None, benchmark=None):
+        """Render an rgba image (an array with shape (H, W, 4)).
+
+        The image can be any object that numpy can wrap without copying, e.g. a
+        memoryview. If ``out`` is given, the result is written into it. Images
+        (or results) larger than MAX_TILE_SIZE are rendered with ``render_tiled()``.
+
+        With ``benchmark=True``, the upload, the render pass(es) and the readback
+        are each timed BENCHMARK_ITERATIONS times. The statistics (see
+        ``timing_stats()``) are stored in ``last_stats``, and a summary of the
+        pass timings in ``last_time``.
+        """
+        image = np.asarray(image)
         assert image.ndim == 3 and image.shape[2] == 4, "Image must be rgba"
         h, w = image.shape[:2]
-        scale_factor = self.TEMPLATE_VARS["scaleFactor"]
+        if max(w, h, *self.get_output_size(w, h)) > self._get_max_tile_size():
+            assert not benchmark, "Cannot benchmark a tiled render"
+            return self.render_tiled(image, out)
+        if out is not None:
+            out = out[np.newaxis]
+        return self.render_stack(image[np.newaxis], out=out, benchmark=benchmark)[0]
 
-        if self._device is None:
-            self._device = self._adapter.request_device_sync(
-                required_features=[wgpu.FeatureName.timestamp_query]
-            )
-            self._query_set = self._device.create_query_set(
-                type=wgpu.QueryType.timestamp, count=2
-            )
-            self._query_buf = self._device.create_buffer(
-                size=8 * self._query_set.count,
-                usage=wgpu.BufferUsage.QUERY_RESOLVE | wgpu.BufferUsage.COPY_SRC,
+    def render_tiled(self, image, out=None, tile_size=None):
+        """Render an rgba image in tiles, e.g. an image that is too large for a texture.
+
+        The tiles overlap by ``get_halo()`` pixels, so that each output pixel sees
+        the same neighbourhood as when rendering the image in one go. The result
+        is not bit-identical though: the shaders sample at normalized texture
+        coordinates, which round differently for a different texture size. For
+        most shaders, about 1e-4 of the pixels differ, mostly by 1 (max 2). With
+        a luma prepass, the edge search can end at a different pixel, so that a
+        few pixels (below 1e-3) differ by up to about 60. The same happens when
+        rendering a crop of the image. ``tile_size`` is the max size (in pixels)
+        of the tiles, including the halo, and defaults to MAX_TILE_SIZE (or the
+        max texture size, if that is smaller). Two tiles are in flight at a time,
+        so the used GPU memory does not depend on the size of the image.
+        """
+        image = np.asarray(image)
+        assert image.ndim == 3 and image.shape[2] == 4, "Image must be rgba"
+        assert image.dtype == np.uint8, "Image must be uint8"
+        h, w = image.shape[:2]
+
+        self._ensure_device()
+
+        w2, h2 = self.get_output_size(w, h)
+        if out is None:
+            out = np.empty((h2, w2, 4), np.uint8)
+
+        # Tile boundaries must be at a multiple of the scale factor (in input
+        # pixels), and of its inverse (in output pixels).
+        scale_factor = Fraction(self._get_template_vars()["scaleFactor"])
+        scale_factor = scale_factor.limit_denominator(1000)
+        step = scale_factor.numerator
+        halo = -(-self.get_halo() // step) * step
+
+        # The size of the tiles (in input pixels), excluding the halo
+        tile_size = tile_size or self._get_max_tile_size()
+        tile_size = min(tile_size, int(tile_size * scale_factor))
+        tile_size = (tile_size - 2 * halo) // step * step
+        assert tile_size > 0, "Tile size is too small for the halo"
+
+        tiles = []
+        for y in range(0, h, tile_size):
+            for x in range(0, w, tile_size):
+                tiles.append((x, y))
+
+        def submit_tile(x, y):
+            x1, y1 = max(0, x - halo), max(0, y - halo)
+            x2, y2 = min(w, x + tile_size + halo), min(h, y + tile_size + halo)
+            return self._submit_frame(image[y1:y2, x1:x2]), (x, y, x1, y1)
+
+        # Keep two tiles in flight, so that the upload of the next tile overlaps
+        # with the rendering and readback of the current tile.
+        in_flight = deque([submit_tile(*tiles[0])])
+        for i in range(len(tiles)):
+            if i + 1 < len(tiles):
+                in_flight.append(submit_tile(*tiles[i + 1]))
+            frame, (x, y, x1, y1) = in_flight.popleft()
+            result = self._finish_frame(frame)
+            # Copy the part of the result that is not halo
+            ox, oy = int(x / scale_factor), int(y / scale_factor)
+            dx, dy = int((x - x1) / scale_factor), int((y - y1) / scale_factor)
+            ox2 = min(w2, int((x + tile_size) / scale_factor))
+            oy2 = min(h2, int((y + tile_size) / scale_factor))
+            out[oy:oy2, ox:ox2] = result[dy : dy + oy2 - oy, dx : dx + ox2 - ox]
+        return out
+
+    def _get_max_tile_size(self):
+        self._ensure_device()
+        return min(MAX_TILE_SIZE, self._device.limits["max-texture-dimension-2d"])
+
+    def render_many(self, images):
+        """Render a list of rgba images, batching the images that have the same shape.
+
+        Returns a list of result images, in the same order.
+        """
+        results = [None] * len(images)
+        groups = {}
+        for i, image in enumerate(images):
+            groups.setdefault(image.shape, []).append(i)
+        for indices in groups.values():
+            stack = np.stack([images[i] for i in indices])
+            for i, result in zip(indices, self.render_stack(stack), strict=True):
+                results[i] = result
+        return results
+
+    def render_stack(self, images, out=None, benchmark=None):
+        """Render a stack of rgba images, given as an array with shape (N, H, W, 4).
+
+        The images are uploaded into a 2D texture array in one go, all render
+        passes are encoded in a single command encoder, and all results are read
+        back with a single copy. Large stacks are processed in batches of at most
+        MAX_BATCH_BYTES. Returns an array with shape (N, H2, W2, 4). If ``out`` is
+        given, the result is written into it.
+
+        The images do not have to be contiguous: arrays of which the pixels in a
+        row are contiguous (e.g. a crop of a larger image) are uploaded without
+        copying them first.
+        """
+        images = np.asarray(images)
+        assert images.ndim == 4 and images.shape[3] == 4, "Images must be rgba"
+        assert images.dtype == np.uint8, "Images must be uint8"
+        n, h, w = images.shape[:3]
+
+        self._ensure_device()
+
+        if out is None:
+            w2, h2 = self.get_output_size(w, h)
+            out = np.empty((n, h2, w2, 4), np.uint8)
+
+        max_layers = self._device.limits["max-texture-array-layers"]
+        batch_size = max(1, min(max_layers, MAX_BATCH_BYTES // (w * h * 4)))
+        for i in range(0, n, batch_size):
+            self._render_batch(
+                images[i : i + batch_size], out[i : i + batch_size], benchmark
             )
+        return out
 
-        device = self._device
+    async def render_async(self, image, out=None):
+        """Render an rgba image, asynchronously.
 
-        if self._pipeline is None:
-            self._pipeline = self._create_pipeline()
+        The upload, render pass and copy to a staging buffer are submitted at
+        once, and the readback awaits the mapping of the staging buffer. Running
+        multiple calls concurrently (e.g. with ``asyncio.gather()``) keeps
+        multiple frames in flight. Each result is identical to ``render()``.
+        """
+        image = np.asarray(image)
+        assert image.ndim == 3 and image.shape[2] == 4, "Image must be rgba"
+        frame = self._submit_frame(image)
+        await frame.promise
+        return self._finish_frame(frame, out)
+
+    def render_stream(self, images, frames_in_flight=3):
+        """Render an iterable of rgba images, yielding the results in order.
+
+        Up to ``frames_in_flight`` frames are submitted before the oldest result
+        is read back, so that the CPU (e.g. decoding the next frame) and the GPU
+        (uploading, rendering and copying previous frames) work in parallel.
+        """
+        in_flight = deque()
+        for image in images:
+            image = np.asarray(image)
+            assert image.ndim == 3 and image.shape[2] == 4, "Image must be rgba"
+            in_flight.append(self._submit_frame(image))
+            if len(in_flight) >= frames_in_flight:
+                yield self._finish_frame(in_flight.popleft())
+        while in_flight:
+            yield self._finish_frame(in_flight.popleft())
+
+    def _submit_frame(self, image):
+        # Upload the image, render it, copy the result to a staging buffer,
+        # and start mapping that buffer. Returns a FrameInFlight.
+        h, w = image.shape[:2]
 
-        # Prepare textures
+        self._ensure_device()
+        device = self._device
+        pool = self.pool
 
-        tex1 = self._create_texture(
+        source = pool.acquire_texture(
             w, h, wgpu.TextureUsage.COPY_DST | wgpu.TextureUsage.TEXTURE_BINDING
         )
-        tex2 = self._create_texture(
-            int(w / scale_factor),
-            int(h / scale_factor),
-            wgpu.TextureUsage.COPY_SRC | wgpu.TextureUsage.RENDER_ATTACHMENT,
+        self._write_texture(source.texture, image[np.newaxis])
+
+        command_encoder = device.create_command_encoder()
+        temporaries = []
+        target = self._encode_render(
+            command_encoder, source, wgpu.TextureUsage.COPY_SRC, temporaries
         )
-        sampler = device.create_sampler(
+        staging = self._encode_readback(command_encoder, target.texture)
+        device.queue.submit([command_encoder.finish()])
+        for texture in temporaries:
+            pool.release(texture)
+
+        promise = staging.buffer.map_async(wgpu.MapMode.READ)
+        return FrameInFlight([source, target], staging, target.texture.size, promise)
+
+    def _finish_frame(self, frame, out=None):
+        # Wait for the staging buffer to be mapped, and read the result.
+        pool = self.pool
+        frame.promise.sync_wait()
+        if out is not None:
+            out = out[np.newaxis]
+        result = self._read_staging(frame.staging, frame.size, out)
+        for entry in frame.textures:
+            pool.release(entry)
+        return result[0]
+
+    def _ensure_device(self):
+        if self._device is None:
+            self._context = get_device_context(self._adapter)
+            self._device = self._context.device
+
+        if self._pipeline is None:
+            # With LUMA_PREPASS, the shader reads luma from a texture produced
+            # by a LumaRenderer, in a pass that precedes each main pass.
+            if self._get_template_vars().get("LUMA_PREPASS", False):
+                self._luma_renderer = LumaRenderer(self._adapter)
+                self._luma_renderer._ensure_device()
+            self._prepass_renderer = self._create_prepass_renderer()
+            if self._prepass_renderer is not None:
+                self._prepass_renderer._ensure_device()
+            self._pipeline = self._create_pipeline()
+
+    def _create_prepass_renderer(self):
+        # A renderer that renders the source into an intermediate texture, which
+        # this renderer's pass then reads instead of the source. None by default.
+        return None
+
+    def _get_prepass_chain(self):
+        # The prepass renderer, and its prepass renderers, in the order they run
+        chain = []
+        renderer = self._prepass_renderer
+        while renderer is not None:
+            chain.insert(0, renderer)
+            renderer = renderer._prepass_renderer
+        return chain
+
+    def _get_sampler(self):
+        return self.pool.get_sampler(
             address_mode_u=wgpu.AddressMode.clamp_to_edge,
             address_mode_v=wgpu.AddressMode.clamp_to_edge,
             address_mode_w=wgpu.AddressMode.clamp_to_edge,
@@ -122,76 +856,167 @@ class WgslFullscreenRenderer:
             mipmap_filter=wgpu.FilterMode.linear,
         )
 
-        # Prepare bind group
-        bind_group_entries = [
-            {"binding": 0, "resource": tex1.create_view()},
-            {"binding": 1, "resource": sampler},
-        ]
-        bind_group = self._device.create_bind_group(
-            layout=self._pipeline.get_bind_group_layout(0), entries=bind_group_entries
+    def _render_batch(self, images, out, benchmark=None):
+        n, h, w = images.shape[:3]
+        device = self._device
+
+        # Prepare textures, sampler and bind groups. These are re-used between calls.
+        pool = self.pool
+        tex2 = pool.acquire_texture(
+            *self.get_output_size(w, h),
+            wgpu.TextureUsage.COPY_SRC | self.TARGET_USAGE,
+            layers=n,
         )
 
-        # Prepare target
-        attachment = {
-            "view": tex2.create_view(),
-            "resolve_target": None,
-            "clear_value": (0, 0, 0, 0),
-            "load_op": wgpu.LoadOp.clear,
-            "store_op": wgpu.StoreOp.store,
-        }
+        # Upload the images into a 2D texture array. The OpenGL backend cannot bind
+        # a single layer of an array texture, so there we use a texture per image.
+        usage = wgpu.TextureUsage.COPY_DST | wgpu.TextureUsage.TEXTURE_BINDING
+        if device.adapter.info["backend_type"] == "OpenGL":
+            sources = [pool.acquire_texture(w, h, usage) for _ in range(n)]
+        else:
+            sources = [pool.acquire_texture(w, h, usage, layers=n)]
+        self._write_sources(sources, images)
 
-        # Upload
-        self._write_texture(tex1, image)
+        source_views = [view for source in sources for view in source.views]
 
-        niters = 100 if benchmark else 1
+        # Collect the passes to encode: per layer the (optional) luma prepass
+        # or chain of other prepasses, and the main pass. The luma and intermediate
+        # textures are not arrays, for the same reason as above.
+        passes = []
+        intermediates = []
+        luma_renderer = self._luma_renderer
+        prepass_renderers = self._get_prepass_chain()
+        for layer in range(n):
+            for prepass_renderer in prepass_renderers:
+                intermediate = pool.acquire_texture(
+                    *prepass_renderer.get_output_size(w, h),
+                    wgpu.TextureUsage.TEXTURE_BINDING | prepass_renderer.TARGET_USAGE,
+                    format=prepass_renderer.TARGET_FORMAT,
+                )
+                intermediates.append(intermediate)
+                bind_group = prepass_renderer._get_bind_group(
+                    source_views[layer], intermediate.view
+                )
+                passes.append((prepass_renderer, bind_group, intermediate.view))
+                source_views[layer] = intermediate.view
+            luma_view = None
+            if luma_renderer is not None:
+                luma = pool.acquire_texture(
+                    w,
+                    h,
+                    wgpu.TextureUsage.TEXTURE_BINDING | luma_renderer.TARGET_USAGE,
+                    format=luma_renderer.TARGET_FORMAT,
+                )
+                intermediates.append(luma)
+                luma_view = luma.view
+                luma_bind_group = luma_renderer._get_bind_group(
+                    source_views[layer], luma_view
+                )
+                passes.append((luma_renderer, luma_bind_group, luma_view))
+            bind_group = self._get_bind_group(
+                source_views[layer], tex2.views[layer], luma_view
+            )
+            passes.append((self, bind_group, tex2.views[layer]))
+
+        # Render!
+        command_encoder = device.create_command_encoder()
+        for renderer, bind_group, target_view in passes:
+            renderer._encode_pass(command_encoder, bind_group, target_view)
+        staging = self._encode_readback(command_encoder, tex2.texture)
+        device.queue.submit([command_encoder.finish()])
+
+        staging.buffer.map_sync(wgpu.MapMode.READ)
+        result = self._read_staging(staging, tex2.texture.size, out)
 
-        # Allow the GPU to breath, resulting in lower stds
         if benchmark:
-            time.sleep(0.1)
+            self._benchmark_batch(images, sources, passes, tex2, out)
 
-        # Render!
-        times = []
+        for source in sources + intermediates:
+            pool.release(source)
+        pool.release(tex2)
+        return result
+
+    def _benchmark_batch(self, images, sources, passes, tex2, out):
+        # Time the upload, the passes and the readback, each BENCHMARK_ITERATIONS
+        # times. The passes are timed on the GPU: all iterations are encoded
+        # back-to-back, each with its own pair of timestamps, and the timestamps
+        # are read in one go. The upload and readback are timed on the CPU,
+        # including the wait for the GPU.
+        device = self._device
+        niters = BENCHMARK_ITERATIONS
+
+        # Allow the GPU to breath, resulting in lower stds
+        time.sleep(0.1)
+
+        upload_times = []
+        for _ in range(niters):
+            t0 = time.perf_counter()
+            self._write_sources(sources, images)
+            self._context.wait_for_gpu()
+            upload_times.append(time.perf_counter() - t0)
+
+        # With multiple passes per iteration, the timestamps span all passes.
+        query_set, query_buf = self._context.get_timestamp_queries(2 * niters)
+        npasses = len(passes)
+        command_encoder = device.create_command_encoder()
         for i in range(niters):
-            command_encoder = self._device.create_command_encoder()
-
-            render_pass = command_encoder.begin_render_pass(
-                color_attachments=[attachment],
-                depth_stencil_attachment=None,
-                timestamp_writes={
-                    "query_set": self._query_set,
-                    "beginning_of_pass_write_index": 0,
-                    "end_of_pass_write_index": 1,
-                },
-            )
-            render_pass.set_pipeline(self._pipeline)
-            render_pass.set_bind_group(0, bind_group, [], 0, 99)
-            render_pass.draw(4, 1)
-            render_pass.end()
-
-            command_encoder.resolve_query_set(
-                query_set=self._query_set,
-                first_query=0,
-                query_count=2,
-                destination=self._query_buf,
-                destination_offset=0,
-            )
+            for pass_index, (renderer, bind_group, target_view) in enumerate(passes):
+                timestamp_writes = None
+                if pass_index == 0 or pass_index == npasses - 1:
+                    timestamp_writes = {"query_set": query_set}
+                    if pass_index == 0:
+                        timestamp_writes["beginning_of_pass_write_index"] = 2 * i
+                    if pass_index == npasses - 1:
+                        timestamp_writes["end_of_pass_write_index"] = 2 * i + 1
+                renderer._encode_pass(
+                    command_encoder, bind_group, target_view, timestamp_writes
+                )
+        command_encoder.resolve_query_set(
+            query_set=query_set,
+            first_query=0,
+            query_count=2 * niters,
+            destination=query_buf,
+            destination_offset=0,
+        )
+        device.queue.submit([command_encoder.finish()])
+        timestamps = np.frombuffer(device.queue.read_buffer(query_buf), np.uint64)
+        timestamps = timestamps[: 2 * niters].reshape(niters, 2).astype(np.float64)
+        pass_times = (timestamps[:, 1] - timestamps[:, 0]) / 1e9  # ns to s
 
+        readback_times = []
+        for _ in range(niters):
+            t0 = time.perf_counter()
+            command_encoder = device.create_command_encoder()
+            staging = self._encode_readback(command_encoder, tex2.texture)
             device.queue.submit([command_encoder.finish()])
+            staging.buffer.map_sync(wgpu.MapMode.READ)
+            self._read_staging(staging, tex2.texture.size, out)
+            readback_times.append(time.perf_counter() - t0)
 
-            timestamps = device.queue.read_buffer(self._query_buf).cast("Q").tolist()
-            times.append(timestamps[1] - timestamps[0])  # in ns
-
-        if benchmark:
-            times.sort()
-            times = [(t / 1000) for t in times]  # turn to us
+        self.last_stats = {
+            "upload": timing_stats(np.array(upload_times) * 1e6),
+            "pass": timing_stats(pass_times * 1e6),
+            "readback": timing_stats(np.array(readback_times) * 1e6),
+        }
+        stats = self.last_stats["pass"]
+        self.last_time = format_timing_stats(stats)
+        self._last_us = stats["trimmed_mean"]
 
-            times = times[niters // 4 : -niters // 4]
+    def get_output_size(self, w, h):
+        """Get the size (w, h) of the result for an input image of the given size."""
+        scale_factor = self._get_template_vars()["scaleFactor"]
+        return int(w / scale_factor), int(h / scale_factor)
 
-            # self.last_time = f"mean: {np.mean(times):0.0f},  median: {times[len(times) // 2]} us,  std: {np.std(times):0.0f}, range: [{times[0]}, {times[-1]}]"
-            self.last_time = f"{np.mean(times):0.0f} ± {np.std(times):0.0f} us"
-            self._last_us = float(np.mean(times))
+    @property
+    def context(self):
+        """The DeviceContext for this renderer."""
+        self._ensure_device()
+        return self._context
 
-        return self._read_texture(tex2)
+    @property
+    def pool(self):
+        """The ResourcePool for this renderer's device."""
+        return self.context.pool
 
     def _create_pipeline(self):
         binding_layout = [
@@ -210,10 +1035,22 @@ class WgslFullscreenRenderer:
                 "sampler": {},
             },
         ]
+        if self._luma_renderer is not None:
+            binding_layout.append(
+                {
+                    "binding": 2,
+                    "visibility": wgpu.ShaderStage.FRAGMENT,
+                    "texture": {
+                        "sample_type": wgpu.TextureSampleType.float,
+                        "view_dimension": wgpu.TextureViewDimension.d2,
+                        "multisampled": False,
+                    },
+                }
+            )
 
         targets = [
             {
-                "format": "rgba8unorm",
+                "format": self.TARGET_FORMAT,
                 "blend": {
                     "color": {
                         "operation": wgpu.BlendOperation.add,
@@ -228,30 +1065,32 @@ class WgslFullscreenRenderer:
                 },
             },
         ]
+        if not self.BLEND:
+            targets[0]["blend"] = None
 
         return self._create_full_quad_pipeline(targets, binding_layout)
 
     def _create_full_quad_pipeline(self, targets, binding_layout):
+        full_wgsl = self.get_wgsl()
+
+        # Get the pipeline from the cache, or compile it
+        pipeline_cache = self._context.pipeline_cache
+        key = pipeline_cache.get_key(full_wgsl, targets, binding_layout)
+        render_pipeline, self._bind_group_layout = pipeline_cache.get(
+            key,
+            lambda: self._compile_full_quad_pipeline(
+                targets, binding_layout, full_wgsl
+            ),
+        )
+        return render_pipeline
+
+    def _compile_full_quad_pipeline(self, targets, binding_layout, full_wgsl):
         device = self._device
 
         # Get bind group layout
         bind_group_layout = device.create_bind_group_layout(entries=binding_layout)
 
-        # Get render pipeline
-        templated_wgsl = self._apply_wgsl_templating(self._shader)
-        full_wgsl = SHADER_TEMPLATE + templated_wgsl
-
-        # Store the shader with templating applied in a file not tracked by git.
-        with open(os.path.join(shader_dir, "last.wgsl"), "wb") as f:
-            f.write(full_wgsl.encode())
-
-        # For some shaders, we store this as the default
-        if self.SHADER in ["ddaa1.wgsl", "ddaa2.wgsl"]:
-            default_name = self.SHADER.replace(".wgsl", "_default.wgsl")
-            with open(os.path.join(shader_dir, default_name), "wb") as f:
-                f.write(templated_wgsl.encode())
-
-        shader_module = device.create_shader_module(code=full_wgsl)
+        shader_module = create_shader_module(device, full_wgsl)
 
         pipeline_layout = device.create_pipeline_layout(
             bind_group_layouts=[bind_group_layout]
@@ -277,50 +1116,480 @@ class WgslFullscreenRenderer:
             },
         )
 
-        return render_pipeline
+        return render_pipeline, bind_group_layout
 
-    def _create_texture(self, w, h, usage):
-        return self._device.create_texture(
-            **{
-                "size": (w, h, 1),
-                "mip_level_count": 1,
-                "sample_count": 1,
-                "dimension": "2d",
-                "format": "rgba8unorm",
-                "usage": usage,
-            }
+    def _get_bind_group(self, source_view, target_view, luma_view=None):
+        resources = [source_view, self._get_sampler()]
+        if luma_view is not None:
+            resources.append(luma_view)
+        return self.pool.get_bind_group(self._bind_group_layout, resources)
+
+    def _encode_render(self, command_encoder, source, usage, temporaries):
+        # Encode a pass that renders the source (a PooledTexture) into a new
+        # pooled texture with the given usage, which is returned. The textures
+        # of the prepasses are appended to temporaries, which the caller must
+        # release *after* the submit, because the pool may destroy released
+        # textures.
+        pool = self.pool
+        luma = None
+        if self._luma_renderer is not None:
+            luma = self._luma_renderer._encode_render(
+                command_encoder, source, wgpu.TextureUsage.TEXTURE_BINDING, temporaries
+            )
+            temporaries.append(luma)
+        target = pool.acquire_texture(
+            *self.get_output_size(*source.texture.size[:2]),
+            usage | self.TARGET_USAGE,
+            format=self.TARGET_FORMAT,
         )
+        if self._prepass_renderer is not None:
+            source = self._prepass_renderer._encode_render(
+                command_encoder, source, wgpu.TextureUsage.TEXTURE_BINDING, temporaries
+            )
+            temporaries.append(source)
+        if luma is None:
+            bind_group = self._get_bind_group(source.view, target.view)
+        else:
+            bind_group = self._get_bind_group(source.view, target.view, luma.view)
+        self._encode_pass(command_encoder, bind_group, target.view)
+        return target
 
-    def _write_texture(self, texture, image):
-        h, w = image.shape[:2]
-        self._device.queue.write_texture(
+    def _encode_pass(
+        self, command_encoder, bind_group, target_view, timestamp_writes=None
+    ):
+        render_pass = command_encoder.begin_render_pass(
+            color_attachments=[
+                {
+                    "view": target_view,
+                    "resolve_target": None,
+                    "clear_value": (0, 0, 0, 0),
+                    "load_op": wgpu.LoadOp.clear,
+                    "store_op": wgpu.StoreOp.store,
+                }
+            ],
+            depth_stencil_attachment=None,
+            timestamp_writes=timestamp_writes,
+        )
+        render_pass.set_pipeline(self._pipeline)
+        render_pass.set_bind_group(0, bind_group, [], 0, 99)
+        render_pass.draw(4, 1)
+        render_pass.end()
+
+    def _encode_readback(self, command_encoder, texture):
+        # Copy the texture to a (pooled) staging buffer. The bytes_per_row must
+        # be a multiple of 256, so the rows are padded.
+        w, h, n = texture.size
+        bytes_per_row = align(4 * w, 256)
+        staging = self.pool.acquire_buffer(
+            bytes_per_row * h * n, wgpu.BufferUsage.COPY_DST | wgpu.BufferUsage.MAP_READ
+        )
+        command_encoder.copy_texture_to_buffer(
             {
                 "texture": texture,
                 "mip_level": 0,
                 "origin": (0, 0, 0),
             },
-            image,
             {
+                "buffer": staging.buffer,
                 "offset": 0,
-                "bytes_per_row": w * 4,
+                "bytes_per_row": bytes_per_row,
                 "rows_per_image": h,
             },
-            (w, h, 1),
+            (w, h, n),
         )
+        return staging
+
+    def _read_staging(self, staging, size, out=None):
+        # Read the data from a mapped staging buffer into out, stripping the row
+        # padding. This is the only copy that the data goes through.
+        w, h, n = size
+        bytes_per_row = align(4 * w, 256)
+        if out is None:
+            out = np.empty((n, h, w, 4), np.uint8)
+        assert out.shape == (n, h, w, 4), f"out must have shape {(n, h, w, 4)}"
+        mapped = staging.buffer.read_mapped(copy=False)
+        rows = np.frombuffer(mapped, np.uint8).reshape(n, h, bytes_per_row)
+        out[...] = rows[:, :, : 4 * w].reshape(n, h, w, 4)
+        del rows, mapped
+        staging.buffer.unmap()
+        self.pool.release(staging)
+        return out
 
-    def _read_texture(self, texture):
-        w, h = texture.size[:2]
-        data = self._device.queue.read_texture(
+    def _write_sources(self, sources, images):
+        # Write the images to the source textures: one array texture, or one
+        # texture per image.
+        if len(sources) == 1:
+            self._write_texture(sources[0].texture, images)
+        else:
+            for source, image in zip(sources, images, strict=True):
+                self._write_texture(source.texture, image[np.newaxis])
+
+    def _write_texture(self, texture, images):
+        n, h, w = images.shape[:3]
+        data, bytes_per_row, rows_per_image = as_texture_data(images)
+        self._device.queue.write_texture(
             {
                 "texture": texture,
                 "mip_level": 0,
                 "origin": (0, 0, 0),
             },
+            data,
             {
                 "offset": 0,
-                "bytes_per_row": 4 * w,
-                "rows_per_image": h,
+                "bytes_per_row": bytes_per_row,
+                "rows_per_image": rows_per_image,
+            },
+            (w, h, n),
+        )
+
+
+class LumaRenderer(WgslFullscreenRenderer):
+    """Renders the (perceptual) luma of an image into a single-channel texture.
+
+    Used as a prepass by renderers that have LUMA_PREPASS set.
+    """
+
+    SHADER = "luma.wgsl"
+
+    TARGET_FORMAT = "r16float"
+
+
+class SsaaRenderer(WgslFullscreenRenderer):
+    """Renders with ssaa.wgsl, to downsample (or upsample) an image.
+
+    If ``separable`` is set, the filter is applied in two passes: a 1D kernel
+    along x, into an intermediate (rgba16float) texture, and then along y. For a
+    kernel of k pixels wide, this takes 2k instead of k*k texture lookups, and
+    the kernel is not truncated (the single pass truncates at 8 pixels). With
+    "auto", the two passes are used for the cubic filters, unless the single
+    pass has pre-calculated taps (see kernel_opt.py) for a kernel that is not
+    truncated, i.e. for integer scale factors up to 4. The taps are only used
+    for images whose size is a multiple of the scale factor; for other sizes the
+    single pass evaluates the kernel per pixel.
+
+    If ``prefilter`` is set ("box" or "tent"), the image is first downsampled
+    by 2 (with that filter) a number of times, into a chain of mip levels, and
+    the kernel is applied to the last level, with a scale factor of 2 or 3.
+    This makes the cost (nearly) independent of the scale factor, at the cost
+    of a slightly blurrier result. Only the integer scale factors that are
+    divisible by 2 (at least once) have mip levels.
+    """
+
+    SHADER = "ssaa.wgsl"
+    TEMPLATE_VARS = {
+        "scaleFactor": 1,
+        "filter": "mitchell",
+        "extraKernelSupport": None,
+        "optTaps": True,
+        "optCorners": True,
+        "separable": "auto",
+        "prefilter": None,
+    }
+
+    def get_mip_levels(self):
+        """The number of mip levels that the kernel is applied to (after each other)."""
+        template_vars = super()._get_template_vars()
+        scale_factor = template_vars["scaleFactor"]
+        levels = 0
+        if template_vars["prefilter"]:
+            # Downsample by 2 while the kernel keeps an integer scale factor >= 2
+            step = 2 ** (levels + 1)
+            while scale_factor % step == 0 and scale_factor >= 2 * step:
+                levels += 1
+                step *= 2
+        return levels
+
+    def is_separable(self):
+        """Whether the filter is applied in two passes."""
+        template_vars = super()._get_template_vars()
+        scale_factor = template_vars["scaleFactor"] / 2 ** self.get_mip_levels()
+        filter = template_vars["filter"]
+        separable = template_vars["separable"]
+        if scale_factor == 1 or filter in ["nearest", "linear", "disk"]:
+            return False
+        elif separable == "auto":
+            has_taps = template_vars["optTaps"] and scale_factor in [2, 3, 4]
+            return filter in ["bspline", "mitchell", "catmull"] and not has_taps
+        return bool(separable)
+
+    def _get_template_vars(self):
+        template_vars = super()._get_template_vars()
+        template_vars["axis"] = "y" if self.is_separable() else None
+        template_vars["mipLevels"] = self.get_mip_levels()
+        return template_vars
+
+    def _create_prepass_renderer(self):
+        if self.is_separable():
+            return _SsaaFirstPassRenderer(self._adapter, **super()._get_template_vars())
+        return self._create_mip_renderer()
+
+    def _create_mip_renderer(self):
+        # The renderer for the last mip level, which has the others as prepasses
+        levels = self.get_mip_levels()
+        if levels:
+            prefilter = self._get_template_vars()["prefilter"]
+            return _SsaaMipRenderer(self._adapter, filter=prefilter, mipLevel=levels)
+
+    def get_halo(self):
+        # The kernel support (in input pixels), as in ssaa.wgsl, where the
+        # kernel is truncated at 8 pixels, except in separable mode.
+        template_vars = self._get_template_vars()
+        levels = template_vars["mipLevels"]
+        scale_factor = template_vars["scaleFactor"] / 2**levels
+        if template_vars["filter"] in ["nearest", "linear"]:
+            support = 1
+        elif template_vars["filter"] in ["box", "disk", "tent"]:
+            support = max(0.999, scale_factor * 0.999)
+        else:
+            support = max(1.999, scale_factor * 1.999)
+        support += template_vars["extraKernelSupport"] or 0
+        if not self.is_separable():
+            support = min(support, 8)
+        if levels:
+            # The prefilter of each mip level reaches 2 pixels (of that level)
+            support += 2
+        return math.ceil(support * 2**levels) + 1
+
+
+class _SsaaFirstPassRenderer(SsaaRenderer):
+    # The first (horizontal) pass of an SsaaRenderer in separable mode
+
+    TARGET_FORMAT = "rgba16float"
+    BLEND = False
+
+    def _get_template_vars(self):
+        return {**super()._get_template_vars(), "axis": "x", "intermediate": True}
+
+    def _create_prepass_renderer(self):
+        return self._create_mip_renderer()
+
+    def get_output_size(self, w, h):
+        # Downsampled along x, and (by the mip levels, if any) along y
+        template_vars = self._get_template_vars()
+        scale_factor = template_vars["scaleFactor"]
+        return int(w / scale_factor), int(h / 2 ** template_vars["mipLevels"])
+
+
+class _SsaaMipRenderer(SsaaRenderer):
+    # Renders a mip level for the prefilter of an SsaaRenderer, by downsampling
+    # the previous level (rendered by its prepass) by 2.
+
+    TEMPLATE_VARS = {
+        **SsaaRenderer.TEMPLATE_VARS,
+        "scaleFactor": 2,
+        "filter": "box",
+        "separable": False,
+        "mipLevel": 1,
+    }
+    TARGET_FORMAT = "rgba16float"
+    BLEND = False
+
+    def _get_template_vars(self):
+        return {**super()._get_template_vars(), "intermediate": True}
+
+    def get_output_size(self, w, h):
+        # The size of the mip level, for the size of the image (of level 0)
+        mip_level = self._get_template_vars()["mipLevel"]
+        return int(w / 2**mip_level), int(h / 2**mip_level)
+
+    def _create_prepass_renderer(self):
+        template_vars = self._get_template_vars()
+        if template_vars["mipLevel"] > 1:
+            return _SsaaMipRenderer(
+                self._adapter,
+                filter=template_vars["filter"],
+                mipLevel=template_vars["mipLevel"] - 1,
+            )
+
+
+class WgslComputeRenderer(WgslFullscreenRenderer):
+    """A renderer that runs a compute shader instead of a fullscreen pass.
+
+    The shader has a ``cs_main`` entrypoint with workgroup size (TILE_SIZE,
+    TILE_SIZE), reads from ``colorTex`` and writes the result with
+    ``storeColor()``. If USE_SUBGROUPS is set and the adapter supports
+    subgroups, the shader is compiled with subgroups enabled, otherwise
+    (also without an adapter, e.g. when exporting) USE_SUBGROUPS is set to False.
+    """
+
+    TEMPLATE_VARS = {"scaleFactor": 1, "TILE_SIZE": 16, "USE_SUBGROUPS": True}
+
+    TARGET_USAGE = wgpu.TextureUsage.STORAGE_BINDING
+
+    def _get_template_vars(self):
+        template_vars = super()._get_template_vars()
+        # Resolve from the adapter, so that the result does not depend on
+        # whether the device has been created yet.
+        adapter = self._adapter
+        if adapter is None or wgpu.FeatureName.subgroups not in adapter.features:
+            template_vars["USE_SUBGROUPS"] = False
+        return template_vars
+
+    def _get_full_wgsl(self, templated_wgsl):
+        full_wgsl = COMPUTE_SHADER_TEMPLATE + templated_wgsl
+        if self._get_template_vars()["USE_SUBGROUPS"]:
+            full_wgsl = "enable subgroups;\n" + full_wgsl
+        return full_wgsl
+
+    @property
+    def tile_size(self):
+        """The tile size (in pixels) of the workgroups."""
+        return self._get_template_vars()["TILE_SIZE"]
+
+    def _create_pipeline(self):
+        binding_layout = [
+            {
+                "binding": 0,
+                "visibility": wgpu.ShaderStage.COMPUTE,
+                "texture": {
+                    "sample_type": wgpu.TextureSampleType.float,
+                    "view_dimension": wgpu.TextureViewDimension.d2,
+                    "multisampled": False,
+                },
             },
-            (w, h, 1),
+            {
+                "binding": 1,
+                "visibility": wgpu.ShaderStage.COMPUTE,
+                "sampler": {},
+            },
+            {
+                "binding": 2,
+                "visibility": wgpu.ShaderStage.COMPUTE,
+                "storage_texture": {
+                    "access": wgpu.StorageTextureAccess.write_only,
+                    "format": wgpu.TextureFormat.rgba8unorm,
+                    "view_dimension": wgpu.TextureViewDimension.d2,
+                },
+            },
+        ]
+
+        full_wgsl = self.get_wgsl()
+
+        pipeline_cache = self._context.pipeline_cache
+        key = pipeline_cache.get_key(full_wgsl, binding_layout)
+        compute_pipeline, self._bind_group_layout = pipeline_cache.get(
+            key,
+            lambda: self._compile_compute_pipeline(binding_layout, full_wgsl),
+        )
+        return compute_pipeline
+
+    def _compile_compute_pipeline(self, binding_layout, full_wgsl):
+        device = self._device
+        bind_group_layout = device.create_bind_group_layout(entries=binding_layout)
+
+        shader_module = create_shader_module(device, full_wgsl)
+        pipeline_layout = device.create_pipeline_layout(
+            bind_group_layouts=[bind_group_layout]
+        )
+        compute_pipeline = device.create_compute_pipeline(
+            layout=pipeline_layout,
+            compute={"module": shader_module, "entry_point": "cs_main"},
+        )
+        return compute_pipeline, bind_group_layout
+
+    def _get_bind_group(self, source_view, target_view, luma_view=None):
+        assert luma_view is None, "Compute renderers do not support LUMA_PREPASS"
+        return self.pool.get_bind_group(
+            self._bind_group_layout, [source_view, self._get_sampler(), target_view]
+        )
+
+    def _encode_pass(
+        self, command_encoder, bind_group, target_view, timestamp_writes=None
+    ):
+        w, h = target_view.size[:2]
+        tile_size = self.tile_size
+        compute_pass = command_encoder.begin_compute_pass(
+            timestamp_writes=timestamp_writes
+        )
+        compute_pass.set_pipeline(self._pipeline)
+        compute_pass.set_bind_group(0, bind_group, [], 0, 99)
+        compute_pass.dispatch_workgroups(
+            (w + tile_size - 1) // tile_size, (h + tile_size - 1) // tile_size, 1
         )
-        return np.frombuffer(data, np.uint8).reshape(h, w, 4)
+        compute_pass.end()
+
+
+class RenderChain:
+    """Render an image with a sequence of fullscreen passes, on the GPU.
+
+    E.g. ``RenderChain([Renderer_ddaa2(adapter), Renderer_ssaax2(adapter)])``.
+    The intermediate results stay on the GPU, and only the final result is read
+    back. Intermediate textures come from the resource pool and are released
+    once the frame is submitted (the pool may destroy released textures), so
+    that they are re-used by the next frames. The results are the same as when
+    calling ``render()`` on each renderer in turn.
+    """
+
+    # Intermediate and final textures have the same usage, so they can be re-used
+    USAGE = (
+        wgpu.TextureUsage.RENDER_ATTACHMENT
+        | wgpu.TextureUsage.TEXTURE_BINDING
+        | wgpu.TextureUsage.COPY_SRC
+    )
+
+    def __init__(self, renderers):
+        self.renderers = list(renderers)
+        assert self.renderers, "Need at least one renderer"
+
+    def get_output_size(self, w, h):
+        """Get the size (w, h) of the result for an input image of the given size."""
+        for renderer in self.renderers:
+            w, h = renderer.get_output_size(w, h)
+        return w, h
+
+    def render(self, image, out=None):
+        """Render an rgba image. If ``out`` is given, the result is written into it."""
+        image = np.asarray(image)
+        assert image.ndim == 3 and image.shape[2] == 4, "Image must be rgba"
+        frame = self._submit_frame(image)
+        return self.renderers[0]._finish_frame(frame, out)
+
+    def render_stream(self, images, frames_in_flight=3):
+        """Render an iterable of rgba images, yielding the results in order.
+
+        See ``WgslFullscreenRenderer.render_stream()``.
+        """
+        first = self.renderers[0]
+        in_flight = deque()
+        for image in images:
+            image = np.asarray(image)
+            assert image.ndim == 3 and image.shape[2] == 4, "Image must be rgba"
+            in_flight.append(self._submit_frame(image))
+            if len(in_flight) >= frames_in_flight:
+                yield first._finish_frame(in_flight.popleft())
+        while in_flight:
+            yield first._finish_frame(in_flight.popleft())
+
+    def _submit_frame(self, image):
+        h, w = image.shape[:2]
+        first = self.renderers[0]
+        context = first.context
+        for renderer in self.renderers:
+            assert renderer.context is context, "Renderers must share an adapter"
+        pool = context.pool
+
+        source = pool.acquire_texture(
+            w, h, wgpu.TextureUsage.COPY_DST | wgpu.TextureUsage.TEXTURE_BINDING
+        )
+        first._write_texture(source.texture, image[np.newaxis])
+
+        # Encode all passes. The textures are released after the submit, because
+        # the pool may destroy a released texture (when it's over budget), which
+        # must not happen to a texture that is used by a pending command buffer.
+        command_encoder = context.device.create_command_encoder()
+        textures = [source]
+        temporaries = []
+        for renderer in self.renderers:
+            textures.append(
+                renderer._encode_render(
+                    command_encoder, textures[-1], self.USAGE, temporaries
+                )
+            )
+        current = textures[-1]
+        staging = first._encode_readback(command_encoder, current.texture)
+        context.device.queue.submit([command_encoder.finish()])
+        for texture in textures + temporaries:
+            pool.release(texture)
+
+        promise = staging.buffer.map_async(wgpu.MapMode.READ)
+        return FrameInFlight([], staging, current.texture.size, promise)
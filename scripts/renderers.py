@@ -0,0 +1,152 @@
+"""
+The renderer classes for the shaders, i.e. a shader and its template vars, as used
+by run_shaders.py and the benchmark scripts. Importing this module has no side
+effects (it does not request an adapter), and templating does not need a device,
+so e.g. ``Renderer_ddaa2(None).get_wgsl()`` works without a GPU.
+"""
+
+from renderer_wgsl import WgslFullscreenRenderer, WgslComputeRenderer, SsaaRenderer
+
+
+# SSAA
+
+
+class Renderer_ssaax2(SsaaRenderer):
+    TEMPLATE_VARS = {**SsaaRenderer.TEMPLATE_VARS, "scaleFactor": 2}
+
+
+class Renderer_ssaax4(SsaaRenderer):
+    # Note: 4 is the largest scale factor with pre-calculated taps, and kernels that
+    # are not truncated. Larger factors use the separable two-pass mode.
+    TEMPLATE_VARS = {**SsaaRenderer.TEMPLATE_VARS, "scaleFactor": 4}
+
+
+class Renderer_ssaax8(SsaaRenderer):
+    # Note: *a lot* of pixels, rendered in two passes.
+    TEMPLATE_VARS = {**SsaaRenderer.TEMPLATE_VARS, "scaleFactor": 8}
+
+
+# Upsampling
+
+
+class Renderer_up_nearest(SsaaRenderer):
+    TEMPLATE_VARS = {
+        **SsaaRenderer.TEMPLATE_VARS,
+        "scaleFactor": 0.25,
+        "filter": "nearest",
+    }
+
+
+class Renderer_up_triangle(SsaaRenderer):
+    TEMPLATE_VARS = {
+        **SsaaRenderer.TEMPLATE_VARS,
+        "scaleFactor": 0.25,
+        "filter": "tent",
+    }
+
+
+class Renderer_up_bspline(SsaaRenderer):
+    TEMPLATE_VARS = {
+        **SsaaRenderer.TEMPLATE_VARS,
+        "scaleFactor": 0.25,
+        "filter": "bspline",
+    }
+
+
+class Renderer_up_mitchell(SsaaRenderer):
+    TEMPLATE_VARS = {
+        **SsaaRenderer.TEMPLATE_VARS,
+        "scaleFactor": 0.25,
+        "filter": "mitchell",
+    }
+
+
+class Renderer_up_catmull(SsaaRenderer):
+    TEMPLATE_VARS = {
+        **SsaaRenderer.TEMPLATE_VARS,
+        "scaleFactor": 0.25,
+        "filter": "catmull",
+    }
+
+
+# PPAA filters
+
+
+class Renderer_null(WgslFullscreenRenderer):
+    SHADER = "noaa.wgsl"
+
+
+class Renderer_blur(WgslFullscreenRenderer):
+    SHADER = "blur.wgsl"
+
+
+class Renderer_dlaa(WgslFullscreenRenderer):
+    SHADER = "dlaa.wgsl"
+
+
+class Renderer_fxaa2(WgslFullscreenRenderer):
+    SHADER = "fxaa2.wgsl"
+
+
+class Renderer_fxaa3c(WgslFullscreenRenderer):
+    SHADER = "fxaa3c.wgsl"
+
+
+class Renderer_fxaa3d(WgslFullscreenRenderer):
+    SHADER = "fxaa3d.wgsl"
+
+
+class Renderer_ddaa1(WgslFullscreenRenderer):
+    SHADER = "ddaa1.wgsl"
+
+
+class Renderer_ddaa2(WgslFullscreenRenderer):
+    SHADER = "ddaa2.wgsl"
+
+    TEMPLATE_VARS = {
+        **WgslFullscreenRenderer.TEMPLATE_VARS,
+        # "EDGE_STEP_LIST": [],
+        "EDGE_STEP_LIST": [3, 3, 3, 3, 3],
+    }
+
+    def get_halo(self):
+        # The edge search reaches sum(EDGE_STEP_LIST), plus the neighbourhood
+        return sum(self._get_template_vars()["EDGE_STEP_LIST"]) + 2
+
+
+# Luma prepass variants, reading luma from a single-channel texture with textureGather
+
+
+class Renderer_fxaa3cl(Renderer_fxaa3c):
+    TEMPLATE_VARS = {**Renderer_fxaa3c.TEMPLATE_VARS, "LUMA_PREPASS": True}
+
+
+class Renderer_fxaa3dl(Renderer_fxaa3d):
+    TEMPLATE_VARS = {**Renderer_fxaa3d.TEMPLATE_VARS, "LUMA_PREPASS": True}
+
+
+class Renderer_ddaa2l(Renderer_ddaa2):
+    TEMPLATE_VARS = {**Renderer_ddaa2.TEMPLATE_VARS, "LUMA_PREPASS": True}
+
+
+class Renderer_ddaa2c(WgslComputeRenderer):
+    # Compute shader version of ddaa2, with the colors of a tile in workgroup memory
+    SHADER = "ddaa2_compute.wgsl"
+
+    TEMPLATE_VARS = {
+        **WgslComputeRenderer.TEMPLATE_VARS,
+        "TILE_SIZE": 16,
+        "EDGE_STEP_LIST": [3, 3, 3, 3, 3],
+    }
+
+    get_halo = Renderer_ddaa2.get_halo
+
+
+# SMAA: Subpixel Morphological Anti Aliasing
+# Would be nice (is available as wgsl in Bevy) but is multi-pass, and we focus on single-pass for now.
+# https://github.com/bevyengine/bevy/blob/main/crates/bevy_anti_aliasing/src/smaa/smaa.wgsl
+
+
+# CMAA2: Conservative Morphological Anti-Aliasing version 2
+# https://github.com/GameTechDev/CMAA2
+# https://www.intel.com/content/www/us/en/developer/articles/technical/conservative-morphological-anti-aliasing-20.html
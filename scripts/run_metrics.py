@@ -0,0 +1,289 @@
+"""
+Compute the quality metrics (MSE, PSNR, SSIM, MS-SSIM) of all results in
+images_all, compared to the x8 reference, and write them to a CSV or JSON file.
+For animated images, the temporal stability is computed too: the temporal PSNR
+(of the frame-to-frame changes, compared to those of the reference) and the
+flicker (the mean change in excess of the reference). The per-frame values are
+only in the JSON output.
+
+The (image, algorithm) pairs are computed in parallel by a pool of worker
+processes. The results are cached, keyed by the content of the result, the
+original and the reference image, and the metric parameters. So after changing
+one shader (and running run_shaders.py), only the rows of that shader are
+recomputed. E.g.:
+
+    python run_metrics.py --output metrics.csv
+    python run_metrics.py --mode upscale --workers 4 --output metrics.json
+
+The modes are:
+* "native": compare at the original resolution, with the x8 reference
+  downsampled (once, the result is cached) with a Mitchell filter.
+* "upscale": the results are upscaled by 8 and compared to the x8 reference.
+* "coverage": compare at the original resolution to the ideal reference
+  ({image}_ref.png), drawn with exact area coverage (see rasterizer.py). Only
+  the images that are made of simple primitives have such a reference.
+"""
+
+import os
+import csv
+import json
+import time
+import hashlib
+import argparse
+import functools
+from concurrent.futures import ProcessPoolExecutor
+
+from PIL import Image
+import numpy as np
+
+from renderer_numpy import NumpySsaaRenderer
+from metrics import ssim, ms_ssim, temporal_stability
+
+
+all_images_dir = os.path.abspath(os.path.join(__file__, "..", "..", "images_all"))
+cache_dir = os.path.join(all_images_dir, ".cache")
+
+# Bump this when the way that the metrics are computed changes
+METRICS_VERSION = 2
+
+UPSCALE = 8
+
+COLUMNS = ["image", "algorithm", "mse", "psnr", "ssim", "ms_ssim", "tpsnr", "flicker"]
+
+
+@functools.lru_cache(maxsize=None)
+def file_hash(filename):
+    with open(filename, "rb") as f:
+        return hashlib.sha1(f.read()).hexdigest()
+
+
+def load_image(filename, upscale=False):
+    """Load an image from images_all as float32 rgb, optionally upscaled by 8."""
+    img = Image.open(os.path.join(all_images_dir, filename))
+    return _convert_frame(img, upscale)
+
+
+def iter_frames(filename, upscale=False):
+    """Load the frames of an animated image one by one, like load_image()."""
+    img = Image.open(os.path.join(all_images_dir, filename))
+    for frame_index in range(getattr(img, "n_frames", 1)):
+        img.seek(frame_index)
+        yield _convert_frame(img, upscale)
+
+
+def is_animated(filename):
+    return (
+        getattr(Image.open(os.path.join(all_images_dir, filename)), "n_frames", 1) > 1
+    )
+
+
+def _convert_frame(img, upscale):
+    im = np.asarray(img.convert("RGBA"))
+    if upscale:
+        renderer = NumpySsaaRenderer(scaleFactor=1 / UPSCALE, filter="mitchell")
+        im = renderer.render(im)
+    return im.astype("f4")[:, :, :3] / 255
+
+
+def get_downsampled_reference(filename):
+    """Get the filename of the reference image, downsampled by 8.
+
+    The downsampled image is cached, keyed by the hash of the reference. For
+    an animated image, all frames are downsampled.
+    """
+    digest = file_hash(os.path.join(all_images_dir, filename))[:16]
+    basename = os.path.splitext(filename)[0]
+    cache_filename = os.path.join(
+        cache_dir, f"{basename}-down-v{METRICS_VERSION}-{digest}.png"
+    )
+    if not os.path.isfile(cache_filename):
+        img = Image.open(os.path.join(all_images_dir, filename))
+        renderer = NumpySsaaRenderer(scaleFactor=UPSCALE, filter="mitchell")
+        frames = []
+        for frame_index in range(getattr(img, "n_frames", 1)):
+            img.seek(frame_index)
+            im = renderer.render(np.asarray(img.convert("RGBA")))
+            frames.append(Image.fromarray(im).convert("RGB"))
+        os.makedirs(cache_dir, exist_ok=True)
+        tmp_filename = f"{cache_filename}.{os.getpid()}.tmp.png"
+        frames[0].save(
+            tmp_filename, save_all=True, append_images=frames[1:], loop=0, duration=40
+        )
+        os.replace(tmp_filename, cache_filename)
+    return cache_filename
+
+
+def get_reference(image, mode):
+    """Get the filename of the reference for the given image and mode."""
+    if mode == "coverage":
+        return f"{image}_ref.png"
+    return f"{image}x{UPSCALE}.png"
+
+
+def find_pairs(mode="native"):
+    """Find the (image, algorithm) pairs in images_all that can be compared.
+
+    These are the images that have a reference (for the given mode), and the
+    results that have the same size as the original.
+    """
+    pairs = []
+    filenames = sorted(os.listdir(all_images_dir))
+    for filename in filenames:
+        image, ext = os.path.splitext(filename)
+        if ext != ".png" or "_" in image or get_reference(image, mode) not in filenames:
+            continue
+        size = Image.open(os.path.join(all_images_dir, filename)).size
+        for result_filename in filenames:
+            prefix = image + "_"
+            if result_filename.startswith(prefix) and result_filename.endswith(ext):
+                algorithm = result_filename[len(prefix) : -len(ext)]
+                if algorithm == "ref":
+                    continue
+                result_size = Image.open(
+                    os.path.join(all_images_dir, result_filename)
+                ).size
+                if result_size == size:
+                    pairs.append((image, algorithm))
+    return pairs
+
+
+def compute_metrics(image, algorithm, params):
+    """Compute the metrics for one (image, algorithm) pair. Returns a dict."""
+    upscale = params["mode"] == "upscale"
+    ref_filename = get_reference(image, params["mode"])
+    if params["mode"] == "native":
+        ref_filename = get_downsampled_reference(ref_filename)
+    filename = f"{image}_{algorithm}.png"
+    ref_im = load_image(ref_filename)
+    im = load_image(filename, upscale)
+    assert im.shape == ref_im.shape
+
+    mse = float(((im - ref_im) ** 2).sum() / im.size)
+    row = {
+        "image": image,
+        "algorithm": algorithm,
+        "mse": mse,
+        "psnr": _psnr(mse),
+        "ssim": ssim(im, ref_im, params["ssim_size"]),
+        "ms_ssim": float(ms_ssim(im, ref_im, params["ssim_size"])),
+        "tpsnr": None,
+        "flicker": None,
+    }
+
+    if is_animated(filename):
+        tmse, flicker = temporal_stability(
+            iter_frames(filename, upscale), iter_frames(ref_filename)
+        )
+        row["tpsnr"] = _psnr(float(tmse.mean()))
+        row["flicker"] = float(flicker.mean())
+        row["frames"] = {
+            "tpsnr": [_psnr(float(x)) for x in tmse],
+            "flicker": flicker.tolist(),
+        }
+    return row
+
+
+def _psnr(mse):
+    return float(10 * np.log10(1 / mse)) if mse > 0 else float("inf")
+
+
+def get_cache_key(image, algorithm, params):
+    hashes = [
+        file_hash(os.path.join(all_images_dir, filename))
+        for filename in [
+            f"{image}.png",
+            f"{image}_{algorithm}.png",
+            get_reference(image, params["mode"]),
+        ]
+    ]
+    text = json.dumps([image, algorithm, *hashes, params], sort_keys=True)
+    return hashlib.sha1(text.encode()).hexdigest()
+
+
+def load_cache(filename):
+    try:
+        with open(filename, "rb") as f:
+            return json.loads(f.read().decode())
+    except FileNotFoundError:
+        return {}
+
+
+def save_json(filename, data):
+    # Write under a temporary name and rename, so the file is never partial
+    tmp_filename = f"{filename}.{os.getpid()}.tmp"
+    with open(tmp_filename, "wb") as f:
+        f.write(json.dumps(data, indent=2).encode())
+    os.replace(tmp_filename, filename)
+
+
+def run(mode="native", workers=None, output=None):
+    """Compute the metrics for all pairs, using the cache. Returns a list of rows."""
+    params = {
+        "version": METRICS_VERSION,
+        "mode": mode,
+        # The SSIM window, 8 pixels in the original image
+        "ssim_size": 8 * UPSCALE if mode == "upscale" else 8,
+    }
+    cache_filename = os.path.join(cache_dir, "metrics.json")
+    cache = load_cache(cache_filename)
+
+    pairs = find_pairs(mode)
+    keys = [get_cache_key(image, algorithm, params) for image, algorithm in pairs]
+    todo = [
+        (pair, key) for pair, key in zip(pairs, keys, strict=True) if key not in cache
+    ]
+    print(f"{len(pairs)} pairs, {len(todo)} to compute")
+
+    if todo:
+        t0 = time.perf_counter()
+        with ProcessPoolExecutor(workers) as pool:
+            # Downsample the references first, so that they're not computed
+            # multiple times by different workers.
+            if mode == "native":
+                references = sorted(
+                    {get_reference(image, mode) for (image, _), _ in todo}
+                )
+                list(pool.map(get_downsampled_reference, references))
+            futures = [
+                (key, pool.submit(compute_metrics, *pair, params)) for pair, key in todo
+            ]
+            for key, future in futures:
+                row = future.result()
+                cache[key] = row
+                line = f"{row['image']:>12} {row['algorithm']:>14}  psnr {row['psnr']:0.1f}"
+                if row["tpsnr"] is not None:
+                    line += (
+                        f"  tpsnr {row['tpsnr']:0.1f}  flicker {row['flicker']:0.4f}"
+                    )
+                print(line)
+        os.makedirs(cache_dir, exist_ok=True)
+        save_json(cache_filename, cache)
+        print(f"Computed in {time.perf_counter() - t0:0.1f} s")
+
+    rows = [cache[key] for key in keys]
+    if output:
+        write_results(output, rows)
+        print("Written to", output)
+    return rows
+
+
+def write_results(filename, rows):
+    """Write the rows to a CSV or JSON file, depending on the extension."""
+    if filename.endswith(".json"):
+        save_json(filename, rows)
+    else:
+        with open(filename, "w", newline="") as f:
+            writer = csv.DictWriter(f, COLUMNS, extrasaction="ignore")
+            writer.writeheader()
+            writer.writerows(rows)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Compute the quality metrics.")
+    parser.add_argument(
+        "--mode", choices=["native", "upscale", "coverage"], default="native"
+    )
+    parser.add_argument("--workers", type=int, default=None)
+    parser.add_argument("--output", default="metrics.csv")
+    args = parser.parse_args()
+    run(args.mode, args.workers, args.output)
@@ -13,7 +13,34 @@ from PIL import Image
 import numpy as np
 import wgpu
 
-from renderer_wgsl import WgslFullscreenRenderer
+from renderer_wgsl import (
+    WgslFullscreenRenderer,
+    WgslComputeRenderer,
+    RenderChain,
+    get_device_context,
+)
+from renderers import (
+    Renderer_ssaax2,
+    Renderer_ssaax4,
+    Renderer_ssaax8,
+    Renderer_up_nearest,
+    Renderer_up_triangle,
+    Renderer_up_bspline,
+    Renderer_up_mitchell,
+    Renderer_up_catmull,
+    Renderer_null,
+    Renderer_blur,
+    Renderer_dlaa,
+    Renderer_fxaa2,
+    Renderer_fxaa3c,
+    Renderer_fxaa3d,
+    Renderer_ddaa1,
+    Renderer_ddaa2,
+    Renderer_ddaa2c,
+    Renderer_fxaa3cl,
+    Renderer_fxaa3dl,
+    Renderer_ddaa2l,
+)
 
 
 src_images_dir = os.path.abspath(os.path.join(__file__, "..", "..", "images_src"))
@@ -31,129 +58,22 @@ with open(os.path.join(all_images_dir, "README.md"), "bw") as f:
     f.write(images_text.encode())
 
 
-# ---------------------------- Shaders classes
-
-
-class SSAAFullScreenRenderer(WgslFullscreenRenderer):
-    SHADER = "ssaa.wgsl"
-    TEMPLATE_VARS = {
-        "scaleFactor": 1,
-        "filter": "mitchell",
-        "extraKernelSupport": None,
-        "optScale2": True,
-        "optCorners": True,
-    }
-
-
-# SSAA
-
-
-class Renderer_ssaax2(SSAAFullScreenRenderer):
-    TEMPLATE_VARS = {**SSAAFullScreenRenderer.TEMPLATE_VARS, "scaleFactor": 2}
-
-
-class Renderer_ssaax4(SSAAFullScreenRenderer):
-    # Note: 4 is the largest scale factor for which kernels are not truncated.
-    TEMPLATE_VARS = {**SSAAFullScreenRenderer.TEMPLATE_VARS, "scaleFactor": 4}
-
-
-class Renderer_ssaax8(SSAAFullScreenRenderer):
-    # Note: not a great kernel, but *a lot* of pixels.
-    TEMPLATE_VARS = {**SSAAFullScreenRenderer.TEMPLATE_VARS, "scaleFactor": 8}
-
-
-# Upsampling
-
-
-class Renderer_up_nearest(SSAAFullScreenRenderer):
-    TEMPLATE_VARS = {
-        **SSAAFullScreenRenderer.TEMPLATE_VARS,
-        "scaleFactor": 0.25,
-        "filter": "nearest",
-    }
-
-
-class Renderer_up_triangle(SSAAFullScreenRenderer):
-    TEMPLATE_VARS = {
-        **SSAAFullScreenRenderer.TEMPLATE_VARS,
-        "scaleFactor": 0.25,
-        "filter": "tent",
-    }
-
-
-class Renderer_up_bspline(SSAAFullScreenRenderer):
-    TEMPLATE_VARS = {
-        **SSAAFullScreenRenderer.TEMPLATE_VARS,
-        "scaleFactor": 0.25,
-        "filter": "bspline",
-    }
-
-
-class Renderer_up_mitchell(SSAAFullScreenRenderer):
-    TEMPLATE_VARS = {
-        **SSAAFullScreenRenderer.TEMPLATE_VARS,
-        "scaleFactor": 0.25,
-        "filter": "mitchell",
-    }
-
-
-class Renderer_up_catmull(SSAAFullScreenRenderer):
-    TEMPLATE_VARS = {
-        **SSAAFullScreenRenderer.TEMPLATE_VARS,
-        "scaleFactor": 0.25,
-        "filter": "catmull",
-    }
-
-
-# PPAA filters
-
-
-class Renderer_null(WgslFullscreenRenderer):
-    SHADER = "noaa.wgsl"
-
-
-class Renderer_blur(WgslFullscreenRenderer):
-    SHADER = "blur.wgsl"
-
-
-class Renderer_dlaa(WgslFullscreenRenderer):
-    SHADER = "dlaa.wgsl"
-
-
-class Renderer_fxaa2(WgslFullscreenRenderer):
-    SHADER = "fxaa2.wgsl"
-
-
-class Renderer_fxaa3c(WgslFullscreenRenderer):
-    SHADER = "fxaa3c.wgsl"
-
-
-class Renderer_fxaa3d(WgslFullscreenRenderer):
-    SHADER = "fxaa3d.wgsl"
-
-
-class Renderer_ddaa1(WgslFullscreenRenderer):
-    SHADER = "ddaa1.wgsl"
-
-
-class Renderer_ddaa2(WgslFullscreenRenderer):
-    SHADER = "ddaa2.wgsl"
-
-    TEMPLATE_VARS = {
-        **WgslFullscreenRenderer.TEMPLATE_VARS,
-        # "EDGE_STEP_LIST": [],
-        "EDGE_STEP_LIST": [3, 3, 3, 3, 3],
-    }
-
-
-# SMAA: Subpixel Morphological Anti Aliasing
-# Would be nice (is available as wgsl in Bevy) but is multi-pass, and we focus on single-pass for now.
-# https://github.com/bevyengine/bevy/blob/main/crates/bevy_anti_aliasing/src/smaa/smaa.wgsl
+def as_opaque_rgba(im):
+    """Get an rgba array from a PIL image, copying only when the alpha must be set."""
+    im1 = np.asarray(im.convert("RGBA"))
+    assert im1.dtype == np.uint8
+    if not np.all(im1[:, :, 3] == 255):
+        im1 = im1.copy()
+        im1[:, :, 3] = 255  # set opaque, just in case
+    return im1
 
 
-# CMAA2: Conservative Morphological Anti-Aliasing version 2
-# https://github.com/GameTechDev/CMAA2
-# https://www.intel.com/content/www/us/en/developer/articles/technical/conservative-morphological-anti-aliasing-20.html
+def format_stage_medians(stats):
+    """Format the median times of the benchmarked stages, to see which dominates."""
+    return ", ".join(
+        f"{stage} {stats[stage]['median']:0.0f} us"
+        for stage in ["upload", "pass", "readback"]
+    )
 
 
 # ---------------------------- Copy source images
@@ -180,6 +100,12 @@ for fname in [
             output_fname = os.path.join(all_images_dir, fname)
             shutil.copy(input_fname, output_fname)
 
+    # Ideal reference (exact area coverage), for images made of simple primitives
+    fname = f"{name}_ref.png"
+    input_fname = os.path.join(src_images_dir, fname)
+    if os.path.isfile(input_fname):
+        shutil.copy(input_fname, os.path.join(all_images_dir, fname))
+
 
 # ----------------------------  Select experiment
 
@@ -200,6 +126,10 @@ exp_renderers = [
     Renderer_fxaa3d,
     Renderer_ddaa1,
     Renderer_ddaa2,
+    # Renderer_ddaa2c,
+    # Renderer_fxaa3cl,
+    # Renderer_fxaa3dl,
+    # Renderer_ddaa2l,
 ]
 
 
@@ -245,6 +175,10 @@ for Renderer in [
     Renderer_fxaa3d,
     Renderer_ddaa1,
     Renderer_ddaa2,
+    Renderer_ddaa2c,
+    Renderer_fxaa3cl,
+    Renderer_fxaa3dl,
+    Renderer_ddaa2l,
 ]:
     if exp_renderers and Renderer not in exp_renderers:
         continue
@@ -255,6 +189,8 @@ for Renderer in [
     if issubclass(Renderer, WgslFullscreenRenderer) and scale_factor > 1:
         hirez_flag = "x" + str(scale_factor).rstrip(".0")
     shadername = renderer.SHADER.split(".")[0] + hirez_flag
+    if Renderer.TEMPLATE_VARS.get("LUMA_PREPASS", False):
+        shadername += "_luma"
 
     for fname in image_names:
         name = fname.rpartition(".")[0]
@@ -268,16 +204,17 @@ for Renderer in [
         info = f"    Generating {name} ({os.path.basename(output_fname)})"
         print(info, end="")
 
-        im1 = Image.open(input_fname).convert("RGBA")
-        im1 = np.asarray(im1).copy()
-        assert im1.dtype == np.uint8
-        im1[:, :, 3] = 255  # set opaque, just in case
+        im1 = as_opaque_rgba(Image.open(input_fname))
 
         im2 = renderer.render(im1)
 
         if exp_renderers:
             renderer.render(im1, benchmark=True)
-            print(" " * (50 - len(info)) + renderer.last_time)
+            tile_info = ""
+            if isinstance(renderer, WgslComputeRenderer):
+                tile_info = f"  (tile {renderer.tile_size}x{renderer.tile_size})"
+            print(" " * (50 - len(info)) + renderer.last_time + tile_info)
+            print(" " * 50 + format_stage_medians(renderer.last_stats))
             d = benchmarks.setdefault(Renderer.__name__.partition("_")[2], {})
             d[name] = min(d.get(name, 9999999), renderer._last_us)
         else:
@@ -285,10 +222,10 @@ for Renderer in [
 
         Image.fromarray(im2).convert("RGB").save(output_fname)
 
-        # Also do ssaax2+ddaa2 (ddaa2p)
+        # Also do ssaax2+ddaa2 (ddaa2p), without reading the intermediate back
         if Renderer is Renderer_ssaax2:
-            im2 = Renderer_ddaa2(adapter).render(im1)
-            im3 = renderer.render(im2)
+            chain = RenderChain([Renderer_ddaa2(adapter), renderer])
+            im3 = chain.render(im1)
             alt_output_fname = os.path.join(all_images_dir, f"{name}_ddaa2p.png")
             Image.fromarray(im3).convert("RGB").save(alt_output_fname)
 
@@ -328,22 +265,26 @@ for Renderer in [
     img = Image.open(input_fname)
     assert img.is_animated
 
-    images = []
-    images_ddaa2p = []
-    for frame_index in range(img.n_frames):
-        print(f"{frame_index}", end=" ")
-        img.seek(frame_index)
-        im1 = np.asarray(img.convert("RGBA")).copy()
-        assert im1.dtype == np.uint8
-        im1[:, :, 3] = 255  # set opaque, just in case
+    def iter_frames(img):
+        # Decode frames lazily, so that decoding overlaps with rendering
+        for frame_index in range(img.n_frames):
+            print(f"{frame_index}", end=" ")
+            img.seek(frame_index)
+            yield as_opaque_rgba(img)
 
-        im2 = renderer.render(im1)
-        images.append(Image.fromarray(im2).convert("RGB"))
+    # Render the frames as a stream, with multiple frames in flight
+    images = [
+        Image.fromarray(im2).convert("RGB")
+        for im2 in renderer.render_stream(iter_frames(img))
+    ]
 
-        if Renderer is Renderer_ssaax2:
-            im2 = Renderer_ddaa2(adapter).render(im1)
-            im3 = renderer.render(im2)
-            images_ddaa2p.append(Image.fromarray(im3).convert("RGB"))
+    images_ddaa2p = []
+    if Renderer is Renderer_ssaax2:
+        chain = RenderChain([Renderer_ddaa2(adapter), renderer])
+        images_ddaa2p = [
+            Image.fromarray(im3).convert("RGB")
+            for im3 in chain.render_stream(iter_frames(img))
+        ]
 
     print("done")
 
@@ -382,18 +323,16 @@ for Renderer in [
         info = f"    Generating {name} (in {os.path.basename(output_fname)})"
         print(info, end="")
 
-        im1 = Image.open(input_fname).convert("RGBA")
-        im1 = np.asarray(im1).copy()
-        assert im1.dtype == np.uint8
-        im1[:, :, 3] = 255  # set opaque, just in case
+        im1 = as_opaque_rgba(Image.open(input_fname))
 
         im2 = renderer.render(im1)
 
         if exp_renderers:
             renderer.render(im1, benchmark=True)
             print(" " * (50 - len(info)) + renderer.last_time)
+            print(" " * 50 + format_stage_medians(renderer.last_stats))
             d = benchmarks.setdefault(Renderer.__name__.partition("_")[2], {})
-            d[name] = min(d.get(name, 9999999), renderer.last_us)
+            d[name] = min(d.get(name, 9999999), renderer._last_us)
         else:
             print("done")
 
@@ -401,6 +340,7 @@ for Renderer in [
 
 
 print("Done!")
+print(get_device_context(adapter).pipeline_cache)
 if exp_renderers:
     alt_benchmarks = benchmarks
 
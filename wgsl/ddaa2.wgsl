@@ -1,4 +1,4 @@
-// ddaa2.wgsl version 2.4
+// ddaa2.wgsl version 2.5
 //
 // Directional Diffusion Anti Aliasing (DDAA) version 2
 //
@@ -22,6 +22,7 @@
 // v2.2 (2025): Made SAMPLES_PER_STEP configurable, and fixed a little sampling bug causing an asymetry.
 // v2.3 (2025): Configure edge search with EDGE_STEP_LIST, optimized sample batching, and get one sample for free.
 // v2.4 (2025): Fix template logic for empty EDGE_STEP_LIST.
+// v2.5 (2025): Optionally read luma from a texture produced by a prepass (LUMA_PREPASS).
 
 
 // ========== CONFIG ==========
@@ -79,6 +80,20 @@ $$ set EDGE_THRESHOLD_MAX = 0.166
 $$ endif
 const EDGE_THRESHOLD_MAX : f32 = {{ EDGE_THRESHOLD_MAX }};
 
+// Whether to read the luma from a single-channel texture, written by a prepass.
+// The 3x3 neighbourhood is then read using two textureGather calls and two
+// samples, and the edge search samples the luma directly, instead of
+// calculating it from the rgb of each sample. Note that the edge search then
+// interpolates luma instead of color, so the results are slightly different.
+$$ if LUMA_PREPASS is not defined
+$$ set LUMA_PREPASS = False
+$$ endif
+$$ if LUMA_PREPASS
+@group(0) @binding(2)
+var lumaTex: texture_2d<f32>;
+$$ endif
+const LUMA_PREPASS = {{ "true" if LUMA_PREPASS else "false" }};
+
 
 // ========== Constants and helper functions ==========
 
@@ -89,6 +104,15 @@ fn rgb2luma(rgb: vec3f) -> f32 {
     // return dot(rgb, vec3f(0.299, 0.587, 0.114));  // real luma
 }
 
+// Get the luma from a sample of lumaSrc.
+fn sample2luma(s: vec4f) -> f32 {
+    $$ if LUMA_PREPASS
+    return s.r;
+    $$ else
+    return rgb2luma(s.rgb);
+    $$ endif
+}
+
 
 @fragment
 fn fs_main(varyings: Varyings) -> @location(0) vec4<f32> {
@@ -96,12 +120,33 @@ fn fs_main(varyings: Varyings) -> @location(0) vec4<f32> {
     let tex: texture_2d<f32> = colorTex;
     let smp: sampler = texSampler;
     let texCoord: vec2f = varyings.texCoord;
+    let lumaSrc: texture_2d<f32> = {{ "lumaTex" if LUMA_PREPASS else "colorTex" }};
 
     let resolution = vec2f(textureDimensions(tex));
     let pixelStep = 1.0 / resolution.xy;
 
     // Sample the center pixel
     let centerSample = textureSampleLevel(tex, smp, texCoord, 0.0);
+    $$ if LUMA_PREPASS
+    // Gather the lumas of the 2x2 quads at the center and to the lower left. Each
+    // gather returns the texels at offsets (0, 1), (1, 1), (1, 0), (0, 0) from
+    // the quad's origin, which is the current pixel, or the lower left pixel.
+    // Gather at the corner between texels, because at the pixel center, the
+    // rounding determines which quad is selected.
+    let gatherCoord = texCoord + 0.5 * pixelStep;
+    let lumaQuadCenter = textureGather(0, lumaSrc, smp, gatherCoord);
+    let lumaQuadSW = textureGather(0, lumaSrc, smp, gatherCoord, vec2i(-1, -1));
+    let lumaCenter = lumaQuadCenter.w;
+    let lumaN = lumaQuadCenter.x;
+    let lumaE = lumaQuadCenter.z;
+    let lumaS = lumaQuadSW.z;
+    let lumaW = lumaQuadSW.x;
+    let lumaNE = lumaQuadCenter.y;
+    let lumaSW = lumaQuadSW.w;
+    let lumaNW = textureSampleLevel(lumaSrc, smp, texCoord, 0.0, vec2i(-1, 1)).r;
+    let lumaSE = textureSampleLevel(lumaSrc, smp, texCoord, 0.0, vec2i(1, -1)).r;
+
+    $$ else
     let lumaCenter = rgb2luma(centerSample.rgb);
 
     // Luma at the four direct neighbors of the current fragment.
@@ -116,6 +161,7 @@ fn fs_main(varyings: Varyings) -> @location(0) vec4<f32> {
     let lumaSW = rgb2luma(textureSampleLevel(tex, smp, texCoord, 0.0, vec2i(-1, -1)).rgb);
     let lumaSE = rgb2luma(textureSampleLevel(tex, smp, texCoord, 0.0, vec2i(1, -1)).rgb);
 
+    $$ endif
     // Compute the range
     let lumaMin = min(lumaCenter, min(min(lumaS, lumaN), min(lumaW, lumaE)));
     let lumaMax = max(lumaCenter, max(max(lumaS, lumaN), max(lumaW, lumaE)));
@@ -229,19 +275,19 @@ fn fs_main(varyings: Varyings) -> @location(0) vec4<f32> {
             lumaEnd_0 = 0.5 * (lumaW + select(lumaSW, lumaNW, gradient2IsHigher)) - lumaLocalAverage;
             lumaEnd_{{ns.edgeSteps}} = 0.5 * (lumaE + select(lumaSE, lumaNE, gradient2IsHigher)) - lumaLocalAverage;
             $$ for si in range(1, ns.edgeSteps)
-            lumaEnd_{{ si }} = rgb2luma(textureSampleLevel(tex, smp, currentUv, 0.0, -vec2i({{ si + 1 }}, 0)).rgb) - lumaLocalAverage;
+            lumaEnd_{{ si }} = sample2luma(textureSampleLevel(lumaSrc, smp, currentUv, 0.0, -vec2i({{ si + 1 }}, 0))) - lumaLocalAverage;
             $$ endfor
             $$ for si in range(1+ns.edgeSteps, ns.edgeSteps*2)
-            lumaEnd_{{ si }} = rgb2luma(textureSampleLevel(tex, smp, currentUv, 0.0, vec2i({{ si - ns.edgeSteps + 1 }}, 0)).rgb) - lumaLocalAverage;
+            lumaEnd_{{ si }} = sample2luma(textureSampleLevel(lumaSrc, smp, currentUv, 0.0, vec2i({{ si - ns.edgeSteps + 1 }}, 0))) - lumaLocalAverage;
             $$ endfor
         } else {
             lumaEnd_0 = 0.5 * (lumaS + select(lumaSW, lumaSE, gradient2IsHigher)) - lumaLocalAverage;
             lumaEnd_{{ns.edgeSteps}} = 0.5 * (lumaN + select(lumaNW, lumaNE, gradient2IsHigher)) - lumaLocalAverage;
             $$ for si in range(1, ns.edgeSteps)
-            lumaEnd_{{ si }} = rgb2luma(textureSampleLevel(tex, smp, currentUv, 0.0, -vec2i(0, {{ si + 1 }})).rgb) - lumaLocalAverage;
+            lumaEnd_{{ si }} = sample2luma(textureSampleLevel(lumaSrc, smp, currentUv, 0.0, -vec2i(0, {{ si + 1 }}))) - lumaLocalAverage;
             $$ endfor
             $$ for si in range(1+ns.edgeSteps, ns.edgeSteps*2)
-            lumaEnd_{{ si }} = rgb2luma(textureSampleLevel(tex, smp, currentUv, 0.0, vec2i(0, {{ si - ns.edgeSteps + 1 }})).rgb) - lumaLocalAverage;
+            lumaEnd_{{ si }} = sample2luma(textureSampleLevel(lumaSrc, smp, currentUv, 0.0, vec2i(0, {{ si - ns.edgeSteps + 1 }}))) - lumaLocalAverage;
             $$ endfor
         }
 
@@ -272,12 +318,12 @@ fn fs_main(varyings: Varyings) -> @location(0) vec4<f32> {
             if isHorizontal {
                 let currentUv1 = currentUv - vec2f({{ ns.stepOffset + ns.edgeSteps//2 + 1 }}.0, 0.0) * pixelStep;
                 $$ for si in range(ns.edgeSteps)
-                lumaEnd_{{si}} = rgb2luma(textureSampleLevel(tex, smp, currentUv1, 0.0, -vec2i( {{si-ns.edgeSteps//2}}, 0)).rgb) - lumaLocalAverage;
+                lumaEnd_{{si}} = sample2luma(textureSampleLevel(lumaSrc, smp, currentUv1, 0.0, -vec2i( {{si-ns.edgeSteps//2}}, 0))) - lumaLocalAverage;
                 $$ endfor
             } else {
                 let currentUv1 = currentUv - vec2f(0.0, {{ ns.stepOffset + ns.edgeSteps//2 +1 }}.0) * pixelStep;
                 $$ for si in range(ns.edgeSteps)
-                lumaEnd_{{si}} = rgb2luma(textureSampleLevel(tex, smp, currentUv1, 0.0, -vec2i(0, {{si-ns.edgeSteps//2}} )).rgb) - lumaLocalAverage;
+                lumaEnd_{{si}} = sample2luma(textureSampleLevel(lumaSrc, smp, currentUv1, 0.0, -vec2i(0, {{si-ns.edgeSteps//2}} ))) - lumaLocalAverage;
                 $$ endfor
             }
             lumaEnd1 = lumaEnd_{{ns.edgeSteps-1}};
@@ -289,12 +335,12 @@ fn fs_main(varyings: Varyings) -> @location(0) vec4<f32> {
             if isHorizontal {
                 let currentUv2 = currentUv + vec2f({{ ns.stepOffset + ns.edgeSteps//2 + 1}}.0, 0.0) * pixelStep;
                 $$ for si in range(ns.edgeSteps)
-                lumaEnd_{{si}} = rgb2luma(textureSampleLevel(tex, smp, currentUv2, 0.0, vec2i( {{si-ns.edgeSteps//2}}, 0)).rgb) - lumaLocalAverage;
+                lumaEnd_{{si}} = sample2luma(textureSampleLevel(lumaSrc, smp, currentUv2, 0.0, vec2i( {{si-ns.edgeSteps//2}}, 0))) - lumaLocalAverage;
                 $$ endfor
             } else {
                 let currentUv2 = currentUv + vec2f(0.0, {{ ns.stepOffset + ns.edgeSteps//2 + 1 }}.0) * pixelStep;
                 $$ for si in range(ns.edgeSteps)
-                lumaEnd_{{si}} = rgb2luma(textureSampleLevel(tex, smp, currentUv2, 0.0, vec2i(0, {{si-ns.edgeSteps//2}} )).rgb) - lumaLocalAverage;
+                lumaEnd_{{si}} = sample2luma(textureSampleLevel(lumaSrc, smp, currentUv2, 0.0, vec2i(0, {{si-ns.edgeSteps//2}} ))) - lumaLocalAverage;
                 $$ endfor
             }
             lumaEnd2 = lumaEnd_{{ns.edgeSteps-1}};
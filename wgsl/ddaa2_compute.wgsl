@@ -0,0 +1,289 @@
+// ddaa2_compute.wgsl
+//
+// Directional Diffusion Anti Aliasing (DDAA) version 2, as a compute shader.
+//
+// This is the same algorithm as ddaa2.wgsl, but each workgroup first loads
+// the colors of its tile of TILE_SIZE x TILE_SIZE pixels plus a halo, and
+// stores them (packed as rgba8) in workgroup memory. The 3x3 neighbourhood and
+// the edge search then read from there, instead of sampling the texture for
+// each pixel. Only the center pixel and the final color are read from the
+// texture.
+//
+// The edge-search in ddaa2.wgsl samples halfway between two pixels (using
+// linear interpolation), and calculates the luma of that. Here we average the
+// colors of these two pixels and calculate the luma of that, which is the same,
+// up to the precision of the sampler's filtering (e.g. llvmpipe rounds the
+// interpolated color to 8 bits). The first sample in each direction averages
+// the luma of the two pixels instead, like ddaa2.wgsl does for the samples it
+// gets "for free". A tile of f32 luma is not stored as well, because together
+// with the colors it would not fit in the (default) 16 KiB of workgroup memory.
+
+
+// ========== CONFIG ==========
+
+// The edge search can track an edge for sum(EDGE_STEP_LIST) pixels. The list
+// is the same as for ddaa2.wgsl, but here only its sum matters, since the
+// samples come from workgroup memory.
+$$ if EDGE_STEP_LIST is not defined
+$$     set EDGE_STEP_LIST = [3, 3, 3, 3, 3]
+$$ endif
+$$ set MAX_EDGE_SAMPLES = EDGE_STEP_LIST | sum
+//
+// The templated EDGE_STEP_LIST = {{EDGE_STEP_LIST}}
+const MAX_EDGE_SAMPLES = {{ MAX_EDGE_SAMPLES }}; // how far the algorithm can look along an edge
+
+// The size of a tile, processed by one workgroup of TILE_SIZE x TILE_SIZE invocations.
+$$ if TILE_SIZE is not defined
+$$ set TILE_SIZE = 16
+$$ endif
+$$ if TILE_SIZE * TILE_SIZE > 256
+{{  'woops_TILE_SIZE_must_be_no_larger_than_16'}}
+$$ endif
+const TILE_SIZE = {{ TILE_SIZE }}u;
+
+// The halo must cover the 3x3 neighbourhood and the edge search.
+const HALO = {{ [MAX_EDGE_SAMPLES, 1] | max }}u;
+const TILE_WIDTH = TILE_SIZE + 2u * HALO;
+
+// Whether to use subgroup operations. This is set by the renderer, depending
+// on whether the adapter supports subgroups.
+$$ if USE_SUBGROUPS is not defined
+$$ set USE_SUBGROUPS = False
+$$ endif
+
+// The strength of the diffusion. A value of 3 seems to work well.
+$$ if DDAA_STRENGTH is not defined
+$$ set DDAA_STRENGTH = 3.0
+$$ endif
+const DDAA_STRENGTH : f32 = {{ DDAA_STRENGTH }};
+
+// Trims the algorithm from processing darks.
+$$ if EDGE_THRESHOLD_MIN is not defined
+$$ set EDGE_THRESHOLD_MIN = 0.0625
+$$ endif
+const EDGE_THRESHOLD_MIN : f32 = {{ EDGE_THRESHOLD_MIN }};
+
+// The minimum amount of local contrast required to apply algorithm.
+$$ if EDGE_THRESHOLD_MAX is not defined
+$$ set EDGE_THRESHOLD_MAX = 0.166
+$$ endif
+const EDGE_THRESHOLD_MAX : f32 = {{ EDGE_THRESHOLD_MAX }};
+
+
+// ========== Constants and helper functions ==========
+
+fn rgb2luma(rgb: vec3f) -> f32 {
+    return sqrt(dot(rgb, vec3f(0.299, 0.587, 0.114)));  // trick for perceived lightness, used in Bevy
+}
+
+var<workgroup> colorTile: array<u32, TILE_WIDTH * TILE_WIDTH>;
+
+fn tileColor(p: vec2i) -> vec3f {
+    return unpack4x8unorm(colorTile[u32(p.y) * TILE_WIDTH + u32(p.x)]).rgb;
+}
+
+fn tileLuma(p: vec2i) -> f32 {
+    return rgb2luma(tileColor(p));
+}
+
+// The luma halfway between two pixels, like a linear sample in between.
+fn tileLumaBetween(p1: vec2i, p2: vec2i) -> f32 {
+    return rgb2luma(0.5 * (tileColor(p1) + tileColor(p2)));
+}
+
+
+@compute @workgroup_size({{ TILE_SIZE }}, {{ TILE_SIZE }})
+fn cs_main(
+    @builtin(workgroup_id) workgroupId: vec3u,
+    @builtin(local_invocation_id) localId: vec3u,
+    @builtin(local_invocation_index) localIndex: u32,
+) {
+    let tex: texture_2d<f32> = colorTex;
+    let smp: sampler = texSampler;
+
+    let size = vec2i(textureDimensions(tex));
+    let resolution = vec2f(size);
+    let pixelStep = 1.0 / resolution.xy;
+
+    // Load the colors of the tile and its halo, clamped to the edge like the sampler does.
+    let tileOrigin = vec2i(workgroupId.xy * TILE_SIZE) - vec2i(i32(HALO));
+    for (var i = localIndex; i < TILE_WIDTH * TILE_WIDTH; i += TILE_SIZE * TILE_SIZE) {
+        let offset = vec2i(i32(i % TILE_WIDTH), i32(i / TILE_WIDTH));
+        let p = clamp(tileOrigin + offset, vec2i(0), size - 1);
+        colorTile[i] = pack4x8unorm(textureLoad(tex, p, 0));
+    }
+    workgroupBarrier();
+
+    // The current pixel, and its position in the tile.
+    let pixel = vec2i(workgroupId.xy * TILE_SIZE + localId.xy);
+    let inside = all(pixel < size);
+    let c = vec2i(localId.xy) + vec2i(i32(HALO));
+    let texCoord = (vec2f(pixel) + 0.5) * pixelStep;
+
+    let centerSample = textureLoad(tex, min(pixel, size - 1), 0);
+    let lumaCenter = tileLuma(c);
+
+    // Luma at the four direct neighbors of the current pixel.
+    let lumaN = tileLuma(c + vec2i(0, 1));
+    let lumaE = tileLuma(c + vec2i(1, 0));
+    let lumaS = tileLuma(c + vec2i(0, -1));
+    let lumaW = tileLuma(c + vec2i(-1, 0));
+
+    // The 4 remaining corners lumas.
+    let lumaNW = tileLuma(c + vec2i(-1, 1));
+    let lumaNE = tileLuma(c + vec2i(1, 1));
+    let lumaSW = tileLuma(c + vec2i(-1, -1));
+    let lumaSE = tileLuma(c + vec2i(1, -1));
+
+    // Compute the range
+    let lumaMin = min(lumaCenter, min(min(lumaS, lumaN), min(lumaW, lumaE)));
+    let lumaMax = max(lumaCenter, max(max(lumaS, lumaN), max(lumaW, lumaE)));
+    let lumaRange = lumaMax - lumaMin;
+    let isEdge = inside && lumaRange >= max(EDGE_THRESHOLD_MIN, lumaMax * EDGE_THRESHOLD_MAX);
+
+    $$ if USE_SUBGROUPS
+    // If no pixel in the subgroup is on an edge, the whole subgroup can take the
+    // early exit, without diverging.
+    if (!subgroupAny(isEdge)) {
+        if (inside) {
+            storeColor(pixel, centerSample);
+        }
+        return;
+    }
+    $$ endif
+
+    // If we are not on an edge, don't perform any AA.
+    if (!isEdge) {
+        if (inside) {
+            storeColor(pixel, centerSample);
+        }
+        return;
+    }
+
+    // Combine the four edges lumas.
+    let lumaSUp = lumaS + lumaN;
+    let lumaWRight = lumaW + lumaE;
+    let lumaWCorners = lumaSW + lumaNW;
+    let lumaSCorners = lumaSW + lumaSE;
+    let lumaECorners = lumaSE + lumaNE;
+    let lumaNCorners = lumaNE + lumaNW;
+
+    // Calculate the image gradient using the Schar kernel.
+    const k1 = 162.0 / 256.0;
+    const k2 = 47.0 / 256.0;
+    let imDx = (lumaW * k1 + lumaSW * k2 + lumaNW * k2) - (lumaE * k1 + lumaSE * k2 + lumaNE * k2);
+    let imDy = (lumaS * k1 + lumaSW * k2 + lumaSE * k2) - (lumaN * k1 + lumaNW * k2 + lumaNE * k2);
+
+    // Get the edge vector (orthogonal to the gradient), and calculate strength and direction.
+    let edgeVector = vec2f(-imDy, imDx);
+    var diffuseStrength = sqrt(length(edgeVector)) * DDAA_STRENGTH;
+    var diffuseDirection = normalize(edgeVector);
+    if diffuseStrength < 1e-6 {
+        diffuseDirection = vec2f(0.0, 0.0);
+        diffuseStrength = 0.0;
+    }
+    diffuseStrength = min(1.0, diffuseStrength);
+
+    // Is the local edge horizontal or vertical ?
+    let edgeHorizontal = abs(-2.0 * lumaW + lumaWCorners) + abs(-2.0 * lumaCenter + lumaSUp) * 2.0 + abs(-2.0 * lumaE + lumaECorners);
+    let edgeVertical = abs(-2.0 * lumaN + lumaNCorners) + abs(-2.0 * lumaCenter + lumaWRight) * 2.0 + abs(-2.0 * lumaS + lumaSCorners);
+    let isHorizontal = (edgeHorizontal >= edgeVertical);
+
+    // Calculate gradient on both sides of the current pixel
+    let luma1 = select(lumaW, lumaS, isHorizontal);
+    let luma2 = select(lumaE, lumaN, isHorizontal);
+    let gradient1 = luma1 - lumaCenter;
+    let gradient2 = luma2 - lumaCenter;
+
+    // Maintain ridges and thin lines.
+    if sign(gradient1) == sign(gradient2) {
+        let ridgeness = min(abs(gradient1), abs(gradient2));
+        let diminish_factor = 1.0 - (min(1.0, 10 * ridgeness));
+        diffuseStrength *= diminish_factor;
+    }
+
+    // Edge search, reading the colors from the tile.
+    var subpixelEdgeOffset = vec2f(0.0);
+    $$ if MAX_EDGE_SAMPLES > 0
+    {
+        var stepLength = select(pixelStep.x, pixelStep.y, isHorizontal);
+        let gradientScaled = 0.25 * max(abs(gradient1), abs(gradient2));
+
+        // Average luma in the current direction, and the side of the edge to search on.
+        var lumaLocalAverage = 0.0;
+        var side = 1;
+        let gradient2IsHigher = abs(gradient2) > abs(gradient1);
+        if gradient2IsHigher {
+            lumaLocalAverage = 0.5 * (luma2 + lumaCenter);
+        } else {
+            stepLength = -stepLength;  // switch the direction
+            side = -1;
+            lumaLocalAverage = 0.5 * (luma1 + lumaCenter);
+        }
+
+        // We search along the edge, halfway between the current row/column and the one at the side.
+        let along = select(vec2i(0, 1), vec2i(1, 0), isHorizontal);
+        let c2 = c + select(vec2i(side, 0), vec2i(0, side), isHorizontal);
+
+        let maxDistance = f32(MAX_EDGE_SAMPLES + 1);
+        var distance1 = maxDistance;
+        var distance2 = maxDistance;
+        var lumaEnd1 = 0.0;
+        var lumaEnd2 = 0.0;
+
+        // The first sample in each direction is "for free", from the neighbourhood.
+        lumaEnd1 = 0.5 * (tileLuma(c - along) + tileLuma(c2 - along)) - lumaLocalAverage;
+        if (abs(lumaEnd1) >= gradientScaled) { distance1 = 1.0; }
+        lumaEnd2 = 0.5 * (tileLuma(c + along) + tileLuma(c2 + along)) - lumaLocalAverage;
+        if (abs(lumaEnd2) >= gradientScaled) { distance2 = 1.0; }
+
+        for (var d = 2; d <= MAX_EDGE_SAMPLES && distance1 == maxDistance; d++) {
+            lumaEnd1 = tileLumaBetween(c - d * along, c2 - d * along) - lumaLocalAverage;
+            if (abs(lumaEnd1) >= gradientScaled) { distance1 = f32(d); }
+        }
+        for (var d = 2; d <= MAX_EDGE_SAMPLES && distance2 == maxDistance; d++) {
+            lumaEnd2 = tileLumaBetween(c + d * along, c2 + d * along) - lumaLocalAverage;
+            if (abs(lumaEnd2) >= gradientScaled) { distance2 = f32(d); }
+        }
+
+        // UV offset: read in the direction of the closest side of the edge.
+        let pixelOffset = - min(distance1, distance2) / (distance1 + distance2) + 0.5;
+
+        // If the luma at center is smaller than at its neighbor, the delta luma at each end should be positive (same variation).
+        let isLumaCenterSmaller = lumaCenter < lumaLocalAverage;
+        var correctVariation: bool;
+        if (distance1 < distance2) {
+            correctVariation = (lumaEnd1 < 0.0) != isLumaCenterSmaller;
+        } else {
+            correctVariation = (lumaEnd2 < 0.0) != isLumaCenterSmaller;
+        }
+
+        // Set subpixel texCoord offset
+        if (!correctVariation) {
+            subpixelEdgeOffset = vec2f(0.0);
+        } else if isHorizontal {
+            subpixelEdgeOffset = vec2f(0.0, pixelOffset * stepLength);
+        } else {
+            subpixelEdgeOffset = vec2f(pixelOffset * stepLength, 0.0);
+        }
+    }
+    $$ endif
+
+    // We mix the effects of the edge-search with the directional diffusion.
+    let edgeStrength = (min(1.0, length(2.0 * subpixelEdgeOffset / pixelStep)));
+    diffuseStrength = diffuseStrength * (1.0 - edgeStrength);
+
+    // The step to take for the diffusion effect (blur in the direction of the edge).
+    let max_step_size = 0.51;
+    let diffuseStep = diffuseDirection * pixelStep * (max_step_size * diffuseStrength);
+
+    let texCoord1 = texCoord - diffuseStep + subpixelEdgeOffset;
+    let texCoord2 = texCoord + diffuseStep + subpixelEdgeOffset;
+
+    // Sample the final color
+    var finalColor = vec3f(0.0);
+    finalColor += 0.5 * textureSampleLevel(tex, smp, texCoord1, 0.0).rgb;
+    finalColor += 0.5 * textureSampleLevel(tex, smp, texCoord2, 0.0).rgb;
+
+    storeColor(pixel, vec4f(finalColor, centerSample.a));
+}
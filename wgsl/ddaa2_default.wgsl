@@ -1,4 +1,4 @@
-// ddaa2.wgsl version 2.4
+// ddaa2.wgsl version 2.5
 //
 // Directional Diffusion Anti Aliasing (DDAA) version 2
 //
@@ -22,6 +22,7 @@
 // v2.2 (2025): Made SAMPLES_PER_STEP configurable, and fixed a little sampling bug causing an asymetry.
 // v2.3 (2025): Configure edge search with EDGE_STEP_LIST, optimized sample batching, and get one sample for free.
 // v2.4 (2025): Fix template logic for empty EDGE_STEP_LIST.
+// v2.5 (2025): Optionally read luma from a texture produced by a prepass (LUMA_PREPASS).
 
 
 // ========== CONFIG ==========
@@ -56,6 +57,13 @@ const EDGE_THRESHOLD_MIN : f32 = 0.0625;
 // low: 0.250, medium: 0.166, high: 0.125, ultra: 0.063, extreme: 0.031
 const EDGE_THRESHOLD_MAX : f32 = 0.166;
 
+// Whether to read the luma from a single-channel texture, written by a prepass.
+// The 3x3 neighbourhood is then read using two textureGather calls and two
+// samples, and the edge search samples the luma directly, instead of
+// calculating it from the rgb of each sample. Note that the edge search then
+// interpolates luma instead of color, so the results are slightly different.
+const LUMA_PREPASS = false;
+
 
 // ========== Constants and helper functions ==========
 
@@ -66,6 +74,11 @@ fn rgb2luma(rgb: vec3f) -> f32 {
     // return dot(rgb, vec3f(0.299, 0.587, 0.114));  // real luma
 }
 
+// Get the luma from a sample of lumaSrc.
+fn sample2luma(s: vec4f) -> f32 {
+    return rgb2luma(s.rgb);
+}
+
 
 @fragment
 fn fs_main(varyings: Varyings) -> @location(0) vec4<f32> {
@@ -73,6 +86,7 @@ fn fs_main(varyings: Varyings) -> @location(0) vec4<f32> {
     let tex: texture_2d<f32> = colorTex;
     let smp: sampler = texSampler;
     let texCoord: vec2f = varyings.texCoord;
+    let lumaSrc: texture_2d<f32> = colorTex;
 
     let resolution = vec2f(textureDimensions(tex));
     let pixelStep = 1.0 / resolution.xy;
@@ -204,17 +218,17 @@ fn fs_main(varyings: Varyings) -> @location(0) vec4<f32> {
         if isHorizontal {
             lumaEnd_0 = 0.5 * (lumaW + select(lumaSW, lumaNW, gradient2IsHigher)) - lumaLocalAverage;
             lumaEnd_3 = 0.5 * (lumaE + select(lumaSE, lumaNE, gradient2IsHigher)) - lumaLocalAverage;
-            lumaEnd_1 = rgb2luma(textureSampleLevel(tex, smp, currentUv, 0.0, -vec2i(2, 0)).rgb) - lumaLocalAverage;
-            lumaEnd_2 = rgb2luma(textureSampleLevel(tex, smp, currentUv, 0.0, -vec2i(3, 0)).rgb) - lumaLocalAverage;
-            lumaEnd_4 = rgb2luma(textureSampleLevel(tex, smp, currentUv, 0.0, vec2i(2, 0)).rgb) - lumaLocalAverage;
-            lumaEnd_5 = rgb2luma(textureSampleLevel(tex, smp, currentUv, 0.0, vec2i(3, 0)).rgb) - lumaLocalAverage;
+            lumaEnd_1 = sample2luma(textureSampleLevel(lumaSrc, smp, currentUv, 0.0, -vec2i(2, 0))) - lumaLocalAverage;
+            lumaEnd_2 = sample2luma(textureSampleLevel(lumaSrc, smp, currentUv, 0.0, -vec2i(3, 0))) - lumaLocalAverage;
+            lumaEnd_4 = sample2luma(textureSampleLevel(lumaSrc, smp, currentUv, 0.0, vec2i(2, 0))) - lumaLocalAverage;
+            lumaEnd_5 = sample2luma(textureSampleLevel(lumaSrc, smp, currentUv, 0.0, vec2i(3, 0))) - lumaLocalAverage;
         } else {
             lumaEnd_0 = 0.5 * (lumaS + select(lumaSW, lumaSE, gradient2IsHigher)) - lumaLocalAverage;
             lumaEnd_3 = 0.5 * (lumaN + select(lumaNW, lumaNE, gradient2IsHigher)) - lumaLocalAverage;
-            lumaEnd_1 = rgb2luma(textureSampleLevel(tex, smp, currentUv, 0.0, -vec2i(0, 2)).rgb) - lumaLocalAverage;
-            lumaEnd_2 = rgb2luma(textureSampleLevel(tex, smp, currentUv, 0.0, -vec2i(0, 3)).rgb) - lumaLocalAverage;
-            lumaEnd_4 = rgb2luma(textureSampleLevel(tex, smp, currentUv, 0.0, vec2i(0, 2)).rgb) - lumaLocalAverage;
-            lumaEnd_5 = rgb2luma(textureSampleLevel(tex, smp, currentUv, 0.0, vec2i(0, 3)).rgb) - lumaLocalAverage;
+            lumaEnd_1 = sample2luma(textureSampleLevel(lumaSrc, smp, currentUv, 0.0, -vec2i(0, 2))) - lumaLocalAverage;
+            lumaEnd_2 = sample2luma(textureSampleLevel(lumaSrc, smp, currentUv, 0.0, -vec2i(0, 3))) - lumaLocalAverage;
+            lumaEnd_4 = sample2luma(textureSampleLevel(lumaSrc, smp, currentUv, 0.0, vec2i(0, 2))) - lumaLocalAverage;
+            lumaEnd_5 = sample2luma(textureSampleLevel(lumaSrc, smp, currentUv, 0.0, vec2i(0, 3))) - lumaLocalAverage;
         }
 
         // Search for left endpoint in the current 3 samples
@@ -238,14 +252,14 @@ fn fs_main(varyings: Varyings) -> @location(0) vec4<f32> {
         if (distance1 > 900.0) {
             if isHorizontal {
                 let currentUv1 = currentUv - vec2f(5.0, 0.0) * pixelStep;
-                lumaEnd_0 = rgb2luma(textureSampleLevel(tex, smp, currentUv1, 0.0, -vec2i( -1, 0)).rgb) - lumaLocalAverage;
-                lumaEnd_1 = rgb2luma(textureSampleLevel(tex, smp, currentUv1, 0.0, -vec2i( 0, 0)).rgb) - lumaLocalAverage;
-                lumaEnd_2 = rgb2luma(textureSampleLevel(tex, smp, currentUv1, 0.0, -vec2i( 1, 0)).rgb) - lumaLocalAverage;
+                lumaEnd_0 = sample2luma(textureSampleLevel(lumaSrc, smp, currentUv1, 0.0, -vec2i( -1, 0))) - lumaLocalAverage;
+                lumaEnd_1 = sample2luma(textureSampleLevel(lumaSrc, smp, currentUv1, 0.0, -vec2i( 0, 0))) - lumaLocalAverage;
+                lumaEnd_2 = sample2luma(textureSampleLevel(lumaSrc, smp, currentUv1, 0.0, -vec2i( 1, 0))) - lumaLocalAverage;
             } else {
                 let currentUv1 = currentUv - vec2f(0.0, 5.0) * pixelStep;
-                lumaEnd_0 = rgb2luma(textureSampleLevel(tex, smp, currentUv1, 0.0, -vec2i(0, -1 )).rgb) - lumaLocalAverage;
-                lumaEnd_1 = rgb2luma(textureSampleLevel(tex, smp, currentUv1, 0.0, -vec2i(0, 0 )).rgb) - lumaLocalAverage;
-                lumaEnd_2 = rgb2luma(textureSampleLevel(tex, smp, currentUv1, 0.0, -vec2i(0, 1 )).rgb) - lumaLocalAverage;
+                lumaEnd_0 = sample2luma(textureSampleLevel(lumaSrc, smp, currentUv1, 0.0, -vec2i(0, -1 ))) - lumaLocalAverage;
+                lumaEnd_1 = sample2luma(textureSampleLevel(lumaSrc, smp, currentUv1, 0.0, -vec2i(0, 0 ))) - lumaLocalAverage;
+                lumaEnd_2 = sample2luma(textureSampleLevel(lumaSrc, smp, currentUv1, 0.0, -vec2i(0, 1 ))) - lumaLocalAverage;
             }
             lumaEnd1 = lumaEnd_2;
             if (abs(lumaEnd_2) >= gradientScaled) { distance1 = 6.0; lumaEnd1 = lumaEnd_2; }
@@ -255,14 +269,14 @@ fn fs_main(varyings: Varyings) -> @location(0) vec4<f32> {
         if (distance2 > 900.0) {
             if isHorizontal {
                 let currentUv2 = currentUv + vec2f(5.0, 0.0) * pixelStep;
-                lumaEnd_0 = rgb2luma(textureSampleLevel(tex, smp, currentUv2, 0.0, vec2i( -1, 0)).rgb) - lumaLocalAverage;
-                lumaEnd_1 = rgb2luma(textureSampleLevel(tex, smp, currentUv2, 0.0, vec2i( 0, 0)).rgb) - lumaLocalAverage;
-                lumaEnd_2 = rgb2luma(textureSampleLevel(tex, smp, currentUv2, 0.0, vec2i( 1, 0)).rgb) - lumaLocalAverage;
+                lumaEnd_0 = sample2luma(textureSampleLevel(lumaSrc, smp, currentUv2, 0.0, vec2i( -1, 0))) - lumaLocalAverage;
+                lumaEnd_1 = sample2luma(textureSampleLevel(lumaSrc, smp, currentUv2, 0.0, vec2i( 0, 0))) - lumaLocalAverage;
+                lumaEnd_2 = sample2luma(textureSampleLevel(lumaSrc, smp, currentUv2, 0.0, vec2i( 1, 0))) - lumaLocalAverage;
             } else {
                 let currentUv2 = currentUv + vec2f(0.0, 5.0) * pixelStep;
-                lumaEnd_0 = rgb2luma(textureSampleLevel(tex, smp, currentUv2, 0.0, vec2i(0, -1 )).rgb) - lumaLocalAverage;
-                lumaEnd_1 = rgb2luma(textureSampleLevel(tex, smp, currentUv2, 0.0, vec2i(0, 0 )).rgb) - lumaLocalAverage;
-                lumaEnd_2 = rgb2luma(textureSampleLevel(tex, smp, currentUv2, 0.0, vec2i(0, 1 )).rgb) - lumaLocalAverage;
+                lumaEnd_0 = sample2luma(textureSampleLevel(lumaSrc, smp, currentUv2, 0.0, vec2i(0, -1 ))) - lumaLocalAverage;
+                lumaEnd_1 = sample2luma(textureSampleLevel(lumaSrc, smp, currentUv2, 0.0, vec2i(0, 0 ))) - lumaLocalAverage;
+                lumaEnd_2 = sample2luma(textureSampleLevel(lumaSrc, smp, currentUv2, 0.0, vec2i(0, 1 ))) - lumaLocalAverage;
             }
             lumaEnd2 = lumaEnd_2;
             if (abs(lumaEnd_2) >= gradientScaled) { distance2 = 6.0; lumaEnd2 = lumaEnd_2; }
@@ -275,14 +289,14 @@ fn fs_main(varyings: Varyings) -> @location(0) vec4<f32> {
         if (distance1 > 900.0) {
             if isHorizontal {
                 let currentUv1 = currentUv - vec2f(8.0, 0.0) * pixelStep;
-                lumaEnd_0 = rgb2luma(textureSampleLevel(tex, smp, currentUv1, 0.0, -vec2i( -1, 0)).rgb) - lumaLocalAverage;
-                lumaEnd_1 = rgb2luma(textureSampleLevel(tex, smp, currentUv1, 0.0, -vec2i( 0, 0)).rgb) - lumaLocalAverage;
-                lumaEnd_2 = rgb2luma(textureSampleLevel(tex, smp, currentUv1, 0.0, -vec2i( 1, 0)).rgb) - lumaLocalAverage;
+                lumaEnd_0 = sample2luma(textureSampleLevel(lumaSrc, smp, currentUv1, 0.0, -vec2i( -1, 0))) - lumaLocalAverage;
+                lumaEnd_1 = sample2luma(textureSampleLevel(lumaSrc, smp, currentUv1, 0.0, -vec2i( 0, 0))) - lumaLocalAverage;
+                lumaEnd_2 = sample2luma(textureSampleLevel(lumaSrc, smp, currentUv1, 0.0, -vec2i( 1, 0))) - lumaLocalAverage;
             } else {
                 let currentUv1 = currentUv - vec2f(0.0, 8.0) * pixelStep;
-                lumaEnd_0 = rgb2luma(textureSampleLevel(tex, smp, currentUv1, 0.0, -vec2i(0, -1 )).rgb) - lumaLocalAverage;
-                lumaEnd_1 = rgb2luma(textureSampleLevel(tex, smp, currentUv1, 0.0, -vec2i(0, 0 )).rgb) - lumaLocalAverage;
-                lumaEnd_2 = rgb2luma(textureSampleLevel(tex, smp, currentUv1, 0.0, -vec2i(0, 1 )).rgb) - lumaLocalAverage;
+                lumaEnd_0 = sample2luma(textureSampleLevel(lumaSrc, smp, currentUv1, 0.0, -vec2i(0, -1 ))) - lumaLocalAverage;
+                lumaEnd_1 = sample2luma(textureSampleLevel(lumaSrc, smp, currentUv1, 0.0, -vec2i(0, 0 ))) - lumaLocalAverage;
+                lumaEnd_2 = sample2luma(textureSampleLevel(lumaSrc, smp, currentUv1, 0.0, -vec2i(0, 1 ))) - lumaLocalAverage;
             }
             lumaEnd1 = lumaEnd_2;
             if (abs(lumaEnd_2) >= gradientScaled) { distance1 = 9.0; lumaEnd1 = lumaEnd_2; }
@@ -292,14 +306,14 @@ fn fs_main(varyings: Varyings) -> @location(0) vec4<f32> {
         if (distance2 > 900.0) {
             if isHorizontal {
                 let currentUv2 = currentUv + vec2f(8.0, 0.0) * pixelStep;
-                lumaEnd_0 = rgb2luma(textureSampleLevel(tex, smp, currentUv2, 0.0, vec2i( -1, 0)).rgb) - lumaLocalAverage;
-                lumaEnd_1 = rgb2luma(textureSampleLevel(tex, smp, currentUv2, 0.0, vec2i( 0, 0)).rgb) - lumaLocalAverage;
-                lumaEnd_2 = rgb2luma(textureSampleLevel(tex, smp, currentUv2, 0.0, vec2i( 1, 0)).rgb) - lumaLocalAverage;
+                lumaEnd_0 = sample2luma(textureSampleLevel(lumaSrc, smp, currentUv2, 0.0, vec2i( -1, 0))) - lumaLocalAverage;
+                lumaEnd_1 = sample2luma(textureSampleLevel(lumaSrc, smp, currentUv2, 0.0, vec2i( 0, 0))) - lumaLocalAverage;
+                lumaEnd_2 = sample2luma(textureSampleLevel(lumaSrc, smp, currentUv2, 0.0, vec2i( 1, 0))) - lumaLocalAverage;
             } else {
                 let currentUv2 = currentUv + vec2f(0.0, 8.0) * pixelStep;
-                lumaEnd_0 = rgb2luma(textureSampleLevel(tex, smp, currentUv2, 0.0, vec2i(0, -1 )).rgb) - lumaLocalAverage;
-                lumaEnd_1 = rgb2luma(textureSampleLevel(tex, smp, currentUv2, 0.0, vec2i(0, 0 )).rgb) - lumaLocalAverage;
-                lumaEnd_2 = rgb2luma(textureSampleLevel(tex, smp, currentUv2, 0.0, vec2i(0, 1 )).rgb) - lumaLocalAverage;
+                lumaEnd_0 = sample2luma(textureSampleLevel(lumaSrc, smp, currentUv2, 0.0, vec2i(0, -1 ))) - lumaLocalAverage;
+                lumaEnd_1 = sample2luma(textureSampleLevel(lumaSrc, smp, currentUv2, 0.0, vec2i(0, 0 ))) - lumaLocalAverage;
+                lumaEnd_2 = sample2luma(textureSampleLevel(lumaSrc, smp, currentUv2, 0.0, vec2i(0, 1 ))) - lumaLocalAverage;
             }
             lumaEnd2 = lumaEnd_2;
             if (abs(lumaEnd_2) >= gradientScaled) { distance2 = 9.0; lumaEnd2 = lumaEnd_2; }
@@ -312,14 +326,14 @@ fn fs_main(varyings: Varyings) -> @location(0) vec4<f32> {
         if (distance1 > 900.0) {
             if isHorizontal {
                 let currentUv1 = currentUv - vec2f(11.0, 0.0) * pixelStep;
-                lumaEnd_0 = rgb2luma(textureSampleLevel(tex, smp, currentUv1, 0.0, -vec2i( -1, 0)).rgb) - lumaLocalAverage;
-                lumaEnd_1 = rgb2luma(textureSampleLevel(tex, smp, currentUv1, 0.0, -vec2i( 0, 0)).rgb) - lumaLocalAverage;
-                lumaEnd_2 = rgb2luma(textureSampleLevel(tex, smp, currentUv1, 0.0, -vec2i( 1, 0)).rgb) - lumaLocalAverage;
+                lumaEnd_0 = sample2luma(textureSampleLevel(lumaSrc, smp, currentUv1, 0.0, -vec2i( -1, 0))) - lumaLocalAverage;
+                lumaEnd_1 = sample2luma(textureSampleLevel(lumaSrc, smp, currentUv1, 0.0, -vec2i( 0, 0))) - lumaLocalAverage;
+                lumaEnd_2 = sample2luma(textureSampleLevel(lumaSrc, smp, currentUv1, 0.0, -vec2i( 1, 0))) - lumaLocalAverage;
             } else {
                 let currentUv1 = currentUv - vec2f(0.0, 11.0) * pixelStep;
-                lumaEnd_0 = rgb2luma(textureSampleLevel(tex, smp, currentUv1, 0.0, -vec2i(0, -1 )).rgb) - lumaLocalAverage;
-                lumaEnd_1 = rgb2luma(textureSampleLevel(tex, smp, currentUv1, 0.0, -vec2i(0, 0 )).rgb) - lumaLocalAverage;
-                lumaEnd_2 = rgb2luma(textureSampleLevel(tex, smp, currentUv1, 0.0, -vec2i(0, 1 )).rgb) - lumaLocalAverage;
+                lumaEnd_0 = sample2luma(textureSampleLevel(lumaSrc, smp, currentUv1, 0.0, -vec2i(0, -1 ))) - lumaLocalAverage;
+                lumaEnd_1 = sample2luma(textureSampleLevel(lumaSrc, smp, currentUv1, 0.0, -vec2i(0, 0 ))) - lumaLocalAverage;
+                lumaEnd_2 = sample2luma(textureSampleLevel(lumaSrc, smp, currentUv1, 0.0, -vec2i(0, 1 ))) - lumaLocalAverage;
             }
             lumaEnd1 = lumaEnd_2;
             if (abs(lumaEnd_2) >= gradientScaled) { distance1 = 12.0; lumaEnd1 = lumaEnd_2; }
@@ -329,14 +343,14 @@ fn fs_main(varyings: Varyings) -> @location(0) vec4<f32> {
         if (distance2 > 900.0) {
             if isHorizontal {
                 let currentUv2 = currentUv + vec2f(11.0, 0.0) * pixelStep;
-                lumaEnd_0 = rgb2luma(textureSampleLevel(tex, smp, currentUv2, 0.0, vec2i( -1, 0)).rgb) - lumaLocalAverage;
-                lumaEnd_1 = rgb2luma(textureSampleLevel(tex, smp, currentUv2, 0.0, vec2i( 0, 0)).rgb) - lumaLocalAverage;
-                lumaEnd_2 = rgb2luma(textureSampleLevel(tex, smp, currentUv2, 0.0, vec2i( 1, 0)).rgb) - lumaLocalAverage;
+                lumaEnd_0 = sample2luma(textureSampleLevel(lumaSrc, smp, currentUv2, 0.0, vec2i( -1, 0))) - lumaLocalAverage;
+                lumaEnd_1 = sample2luma(textureSampleLevel(lumaSrc, smp, currentUv2, 0.0, vec2i( 0, 0))) - lumaLocalAverage;
+                lumaEnd_2 = sample2luma(textureSampleLevel(lumaSrc, smp, currentUv2, 0.0, vec2i( 1, 0))) - lumaLocalAverage;
             } else {
                 let currentUv2 = currentUv + vec2f(0.0, 11.0) * pixelStep;
-                lumaEnd_0 = rgb2luma(textureSampleLevel(tex, smp, currentUv2, 0.0, vec2i(0, -1 )).rgb) - lumaLocalAverage;
-                lumaEnd_1 = rgb2luma(textureSampleLevel(tex, smp, currentUv2, 0.0, vec2i(0, 0 )).rgb) - lumaLocalAverage;
-                lumaEnd_2 = rgb2luma(textureSampleLevel(tex, smp, currentUv2, 0.0, vec2i(0, 1 )).rgb) - lumaLocalAverage;
+                lumaEnd_0 = sample2luma(textureSampleLevel(lumaSrc, smp, currentUv2, 0.0, vec2i(0, -1 ))) - lumaLocalAverage;
+                lumaEnd_1 = sample2luma(textureSampleLevel(lumaSrc, smp, currentUv2, 0.0, vec2i(0, 0 ))) - lumaLocalAverage;
+                lumaEnd_2 = sample2luma(textureSampleLevel(lumaSrc, smp, currentUv2, 0.0, vec2i(0, 1 ))) - lumaLocalAverage;
             }
             lumaEnd2 = lumaEnd_2;
             if (abs(lumaEnd_2) >= gradientScaled) { distance2 = 12.0; lumaEnd2 = lumaEnd_2; }
@@ -349,14 +363,14 @@ fn fs_main(varyings: Varyings) -> @location(0) vec4<f32> {
         if (distance1 > 900.0) {
             if isHorizontal {
                 let currentUv1 = currentUv - vec2f(14.0, 0.0) * pixelStep;
-                lumaEnd_0 = rgb2luma(textureSampleLevel(tex, smp, currentUv1, 0.0, -vec2i( -1, 0)).rgb) - lumaLocalAverage;
-                lumaEnd_1 = rgb2luma(textureSampleLevel(tex, smp, currentUv1, 0.0, -vec2i( 0, 0)).rgb) - lumaLocalAverage;
-                lumaEnd_2 = rgb2luma(textureSampleLevel(tex, smp, currentUv1, 0.0, -vec2i( 1, 0)).rgb) - lumaLocalAverage;
+                lumaEnd_0 = sample2luma(textureSampleLevel(lumaSrc, smp, currentUv1, 0.0, -vec2i( -1, 0))) - lumaLocalAverage;
+                lumaEnd_1 = sample2luma(textureSampleLevel(lumaSrc, smp, currentUv1, 0.0, -vec2i( 0, 0))) - lumaLocalAverage;
+                lumaEnd_2 = sample2luma(textureSampleLevel(lumaSrc, smp, currentUv1, 0.0, -vec2i( 1, 0))) - lumaLocalAverage;
             } else {
                 let currentUv1 = currentUv - vec2f(0.0, 14.0) * pixelStep;
-                lumaEnd_0 = rgb2luma(textureSampleLevel(tex, smp, currentUv1, 0.0, -vec2i(0, -1 )).rgb) - lumaLocalAverage;
-                lumaEnd_1 = rgb2luma(textureSampleLevel(tex, smp, currentUv1, 0.0, -vec2i(0, 0 )).rgb) - lumaLocalAverage;
-                lumaEnd_2 = rgb2luma(textureSampleLevel(tex, smp, currentUv1, 0.0, -vec2i(0, 1 )).rgb) - lumaLocalAverage;
+                lumaEnd_0 = sample2luma(textureSampleLevel(lumaSrc, smp, currentUv1, 0.0, -vec2i(0, -1 ))) - lumaLocalAverage;
+                lumaEnd_1 = sample2luma(textureSampleLevel(lumaSrc, smp, currentUv1, 0.0, -vec2i(0, 0 ))) - lumaLocalAverage;
+                lumaEnd_2 = sample2luma(textureSampleLevel(lumaSrc, smp, currentUv1, 0.0, -vec2i(0, 1 ))) - lumaLocalAverage;
             }
             lumaEnd1 = lumaEnd_2;
             if (abs(lumaEnd_2) >= gradientScaled) { distance1 = 15.0; lumaEnd1 = lumaEnd_2; }
@@ -366,14 +380,14 @@ fn fs_main(varyings: Varyings) -> @location(0) vec4<f32> {
         if (distance2 > 900.0) {
             if isHorizontal {
                 let currentUv2 = currentUv + vec2f(14.0, 0.0) * pixelStep;
-                lumaEnd_0 = rgb2luma(textureSampleLevel(tex, smp, currentUv2, 0.0, vec2i( -1, 0)).rgb) - lumaLocalAverage;
-                lumaEnd_1 = rgb2luma(textureSampleLevel(tex, smp, currentUv2, 0.0, vec2i( 0, 0)).rgb) - lumaLocalAverage;
-                lumaEnd_2 = rgb2luma(textureSampleLevel(tex, smp, currentUv2, 0.0, vec2i( 1, 0)).rgb) - lumaLocalAverage;
+                lumaEnd_0 = sample2luma(textureSampleLevel(lumaSrc, smp, currentUv2, 0.0, vec2i( -1, 0))) - lumaLocalAverage;
+                lumaEnd_1 = sample2luma(textureSampleLevel(lumaSrc, smp, currentUv2, 0.0, vec2i( 0, 0))) - lumaLocalAverage;
+                lumaEnd_2 = sample2luma(textureSampleLevel(lumaSrc, smp, currentUv2, 0.0, vec2i( 1, 0))) - lumaLocalAverage;
             } else {
                 let currentUv2 = currentUv + vec2f(0.0, 14.0) * pixelStep;
-                lumaEnd_0 = rgb2luma(textureSampleLevel(tex, smp, currentUv2, 0.0, vec2i(0, -1 )).rgb) - lumaLocalAverage;
-                lumaEnd_1 = rgb2luma(textureSampleLevel(tex, smp, currentUv2, 0.0, vec2i(0, 0 )).rgb) - lumaLocalAverage;
-                lumaEnd_2 = rgb2luma(textureSampleLevel(tex, smp, currentUv2, 0.0, vec2i(0, 1 )).rgb) - lumaLocalAverage;
+                lumaEnd_0 = sample2luma(textureSampleLevel(lumaSrc, smp, currentUv2, 0.0, vec2i(0, -1 ))) - lumaLocalAverage;
+                lumaEnd_1 = sample2luma(textureSampleLevel(lumaSrc, smp, currentUv2, 0.0, vec2i(0, 0 ))) - lumaLocalAverage;
+                lumaEnd_2 = sample2luma(textureSampleLevel(lumaSrc, smp, currentUv2, 0.0, vec2i(0, 1 ))) - lumaLocalAverage;
             }
             lumaEnd2 = lumaEnd_2;
             if (abs(lumaEnd_2) >= gradientScaled) { distance2 = 15.0; lumaEnd2 = lumaEnd_2; }
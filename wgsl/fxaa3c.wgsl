@@ -19,6 +19,17 @@ const EDGE_THRESHOLD_MAX: f32 = 0.166;  // medium
 // const EDGE_THRESHOLD_MAX: f32 = 0.063;  // ultra
 // const EDGE_THRESHOLD_MAX: f32 = 0.031;  // extreme
 
+// Whether to read the luma from a single-channel texture, written by a prepass.
+// The corner lumas are then read using two textureGather calls and two samples.
+$$ if LUMA_PREPASS is not defined
+$$ set LUMA_PREPASS = False
+$$ endif
+$$ if LUMA_PREPASS
+@group(0) @binding(2)
+var lumaTex: texture_2d<f32>;
+$$ endif
+const LUMA_PREPASS = {{ "true" if LUMA_PREPASS else "false" }};
+
 
 fn rgb2luma(rgb: vec3<f32>) -> f32 {
     return sqrt(dot(rgb, vec3<f32>(0.299, 0.587, 0.114)));
@@ -40,14 +51,30 @@ fn fs_main(varyings: Varyings) -> @location(0) vec4<f32> {
     let fxaaConsoleRcpFrameOpt2 = 2.0 * vec4f(-inverseScreenSize, inverseScreenSize);
     const fxaaConsoleEdgeSharpness = 8.0;
 
+    let rgbyM: vec4f = textureSampleLevel(tex, samp, texCoord.xy, 0.0);
+
+    $$ if LUMA_PREPASS
+    // Gather at the corner between texels, because at the pixel center, the
+    // rounding determines which quad is selected. Each gather returns the texels
+    // at offsets (0, 1), (1, 1), (1, 0), (0, 0) from the quad's origin, which is
+    // the current pixel, or the upper left pixel.
+    let gatherCoord = texCoord + 0.5 * inverseScreenSize;
+    let lumaQuadM = textureGather(0, lumaTex, samp, gatherCoord);
+    let lumaQuadNw = textureGather(0, lumaTex, samp, gatherCoord, vec2i(-1, -1));
+    let lumaNw: f32 = lumaQuadNw.w;
+    let lumaSw: f32 = textureSampleLevel(lumaTex, samp, fxaaConsolePosPos.xw, 0.0).r;
+    var lumaNe: f32 = textureSampleLevel(lumaTex, samp, fxaaConsolePosPos.zy, 0.0).r;
+    let lumaSe: f32 = lumaQuadM.y;
+    let lumaM: f32 = lumaQuadM.w;
+
+    $$ else
     let lumaNw: f32 = rgb2luma(textureSampleLevel(tex, samp, fxaaConsolePosPos.xy, 0.0).rgb);
     let lumaSw: f32 = rgb2luma(textureSampleLevel(tex, samp, fxaaConsolePosPos.xw, 0.0).rgb);
     var lumaNe: f32 = rgb2luma(textureSampleLevel(tex, samp, fxaaConsolePosPos.zy, 0.0).rgb);
     let lumaSe: f32 = rgb2luma(textureSampleLevel(tex, samp, fxaaConsolePosPos.zw, 0.0).rgb);
-
-    let rgbyM: vec4f = textureSampleLevel(tex, samp, texCoord.xy, 0.0);
     let lumaM: f32 = rgb2luma(rgbyM.rgb);
 
+    $$ endif
     let lumaMaxNwSw: f32 = max(lumaNw, lumaSw);
     lumaNe += 1.0/384.0; // WUT
     let lumaMinNwSw: f32 = min(lumaNw, lumaSw);
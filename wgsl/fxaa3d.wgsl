@@ -41,10 +41,32 @@ fn QUALITY(q: i32) -> f32 {
     }
 }
 
+// Whether to read the luma from a single-channel texture, written by a prepass.
+// The 3x3 neighbourhood is then read using two textureGather calls and two
+// samples, and the edge search samples the luma directly. Note that the edge
+// search then interpolates luma instead of color.
+$$ if LUMA_PREPASS is not defined
+$$ set LUMA_PREPASS = False
+$$ endif
+$$ if LUMA_PREPASS
+@group(0) @binding(2)
+var lumaTex: texture_2d<f32>;
+$$ endif
+const LUMA_PREPASS = {{ "true" if LUMA_PREPASS else "false" }};
+
 fn rgb2luma(rgb: vec3<f32>) -> f32 {
     return sqrt(dot(rgb, vec3<f32>(0.299, 0.587, 0.114)));
 }
 
+// Get the luma from a sample of lumaSrc.
+fn sample2luma(s: vec4<f32>) -> f32 {
+    $$ if LUMA_PREPASS
+    return s.r;
+    $$ else
+    return rgb2luma(s.rgb);
+    $$ endif
+}
+
 // Performs FXAA post-process anti-aliasing as described in the Nvidia FXAA white paper and the associated shader code.
 
 @fragment
@@ -53,6 +75,7 @@ fn fs_main(varyings: Varyings) -> @location(0) vec4<f32> {
     let screenTexture: texture_2d<f32> = colorTex;
     let samp: sampler = texSampler;
     let texCoord: vec2f = varyings.texCoord;
+    let lumaSrc: texture_2d<f32> = {{ "lumaTex" if LUMA_PREPASS else "colorTex" }};
 
     let resolution = vec2<f32>(textureDimensions(screenTexture));
     let inverseScreenSize = 1.0 / resolution.xy;
@@ -60,6 +83,22 @@ fn fs_main(varyings: Varyings) -> @location(0) vec4<f32> {
     let centerSample = textureSampleLevel(screenTexture, samp, texCoord, 0.0);
     let colorCenter = centerSample.rgb;
 
+    $$ if LUMA_PREPASS
+    // Gather the lumas of the 2x2 quads at the center and to the lower left. Each
+    // gather returns the texels at offsets (0, 1), (1, 1), (1, 0), (0, 0) from
+    // the quad's origin, which is the current pixel, or the lower left pixel.
+    // Gather at the corner between texels, because at the pixel center, the
+    // rounding determines which quad is selected.
+    let gatherCoord = texCoord + 0.5 * inverseScreenSize;
+    let lumaQuadCenter = textureGather(0, lumaSrc, samp, gatherCoord);
+    let lumaQuadDownLeft = textureGather(0, lumaSrc, samp, gatherCoord, vec2<i32>(-1, -1));
+    let lumaCenter = lumaQuadCenter.w;
+    let lumaDown = lumaQuadDownLeft.z;
+    let lumaUp = lumaQuadCenter.x;
+    let lumaLeft = lumaQuadDownLeft.x;
+    let lumaRight = lumaQuadCenter.z;
+
+    $$ else
     // Luma at the current fragment
     let lumaCenter = rgb2luma(colorCenter);
 
@@ -69,6 +108,7 @@ fn fs_main(varyings: Varyings) -> @location(0) vec4<f32> {
     let lumaLeft = rgb2luma(textureSampleLevel(screenTexture, samp, texCoord, 0.0, vec2<i32>(-1, 0)).rgb);
     let lumaRight = rgb2luma(textureSampleLevel(screenTexture, samp, texCoord, 0.0, vec2<i32>(1, 0)).rgb);
 
+    $$ endif
     // Find the maximum and minimum luma around the current fragment.
     let lumaMin = min(lumaCenter, min(min(lumaDown, lumaUp), min(lumaLeft, lumaRight)));
     let lumaMax = max(lumaCenter, max(max(lumaDown, lumaUp), max(lumaLeft, lumaRight)));
@@ -82,11 +122,19 @@ fn fs_main(varyings: Varyings) -> @location(0) vec4<f32> {
     }
 
     // Query the 4 remaining corners lumas.
+    $$ if LUMA_PREPASS
+    let lumaDownLeft  = lumaQuadDownLeft.w;
+    let lumaUpRight   = lumaQuadCenter.y;
+    let lumaUpLeft    = textureSampleLevel(lumaSrc, samp, texCoord, 0.0, vec2<i32>(-1, 1)).r;
+    let lumaDownRight = textureSampleLevel(lumaSrc, samp, texCoord, 0.0, vec2<i32>(1, -1)).r;
+
+    $$ else
     let lumaDownLeft  = rgb2luma(textureSampleLevel(screenTexture, samp, texCoord, 0.0, vec2<i32>(-1, -1)).rgb);
     let lumaUpRight   = rgb2luma(textureSampleLevel(screenTexture, samp, texCoord, 0.0, vec2<i32>(1, 1)).rgb);
     let lumaUpLeft    = rgb2luma(textureSampleLevel(screenTexture, samp, texCoord, 0.0, vec2<i32>(-1, 1)).rgb);
     let lumaDownRight = rgb2luma(textureSampleLevel(screenTexture, samp, texCoord, 0.0, vec2<i32>(1, -1)).rgb);
 
+    $$ endif
     // Combine the four edges lumas (using intermediary variables for future computations with the same values).
     let lumaDownUp = lumaDown + lumaUp;
     let lumaLeftRight = lumaLeft + lumaRight;
@@ -153,8 +201,8 @@ fn fs_main(varyings: Varyings) -> @location(0) vec4<f32> {
     var uv2 = currentUv + offset; // * QUALITY(0); // (quality 0 is 1.0)
 
     // Read the lumas at both current extremities of the exploration segment, and compute the delta wrt to the local average luma.
-    var lumaEnd1 = rgb2luma(textureSampleLevel(screenTexture, samp, uv1, 0.0).rgb);
-    var lumaEnd2 = rgb2luma(textureSampleLevel(screenTexture, samp, uv2, 0.0).rgb);
+    var lumaEnd1 = sample2luma(textureSampleLevel(lumaSrc, samp, uv1, 0.0));
+    var lumaEnd2 = sample2luma(textureSampleLevel(lumaSrc, samp, uv2, 0.0));
     lumaEnd1 = lumaEnd1 - lumaLocalAverage;
     lumaEnd2 = lumaEnd2 - lumaLocalAverage;
 
@@ -172,12 +220,12 @@ fn fs_main(varyings: Varyings) -> @location(0) vec4<f32> {
         for (var i: i32 = 2; i < ITERATIONS; i = i + 1) {
             // If needed, read luma in 1st direction, compute delta.
             if (!reached1) {
-                lumaEnd1 = rgb2luma(textureSampleLevel(screenTexture, samp, uv1, 0.0).rgb);
+                lumaEnd1 = sample2luma(textureSampleLevel(lumaSrc, samp, uv1, 0.0));
                 lumaEnd1 = lumaEnd1 - lumaLocalAverage;
             }
             // If needed, read luma in opposite direction, compute delta.
             if (!reached2) {
-                lumaEnd2 = rgb2luma(textureSampleLevel(screenTexture, samp, uv2, 0.0).rgb);
+                lumaEnd2 = sample2luma(textureSampleLevel(lumaSrc, samp, uv2, 0.0));
                 lumaEnd2 = lumaEnd2 - lumaLocalAverage;
             }
             // If the luma deltas at the current extremities is larger than the local gradient, we have reached the side of the edge.
@@ -0,0 +1,17 @@
+// Write the perceptual luma of each pixel into a single-channel texture.
+//
+// This is the prepass for shaders that have LUMA_PREPASS set. These can then
+// read the luma of four pixels with a single textureGather, and don't have to
+// calculate the luma for each sample they take.
+
+
+fn rgb2luma(rgb: vec3f) -> f32 {
+    return sqrt(dot(rgb, vec3f(0.299, 0.587, 0.114)));  // trick for perceived lightness, used in Bevy
+}
+
+
+@fragment
+fn fs_main(varyings: Varyings) -> @location(0) vec4<f32> {
+    let rgb = textureSampleLevel(colorTex, texSampler, varyings.texCoord, 0.0).rgb;
+    return vec4f(rgb2luma(rgb), 0.0, 0.0, 1.0);
+}
@@ -1,4 +1,4 @@
-// ssaa.wgsl  version 1.2
+// ssaa.wgsl  version 1.6
 //
 // Super-sample anti-aliasing
 //
@@ -25,6 +25,10 @@
 //
 // v1.1 (2025): Initial version.
 // v1.2 (2025): Avoid using out-of-range values for the integer sample offset. Cubic kernels with scale factor > 4 are truncated.
+// v1.3 (2026): Pre-calculated bilinear taps for all integer scale factors, generated by kernel_opt.py (included from ssaa_taps.wgsl).
+// v1.4 (2026): Separable mode, with two passes of a 1D kernel that is not truncated. Fix the kernel for odd scale factors being off by one pixel.
+// v1.5 (2026): Sample from a mip level of the source (prefiltered by another pass), for large scale factors.
+// v1.6 (2026): Taps only used when the source size is a multiple of the scale factor; odd kernel removed.
 
 
 fn filterweightBox(t: vec2f) -> f32 {
@@ -133,6 +137,24 @@ fn fs_main(varyings: Varyings) -> @location(0) vec4<f32> {
 
     $$ set originalFilter = filter
 
+    {# In separable mode, the kernel is applied in two passes, with a 1D kernel along axis 'x' and then 'y'. #}
+    $$ if axis is not defined
+    $$     set axis = none
+    $$ endif
+
+    {# With intermediate, the result goes into an (intermediate) texture as is, without gamma and premultiplied alpha. #}
+    $$ if intermediate is not defined
+    $$     set intermediate = false
+    $$ endif
+
+    {# The source can be a mip level, prefiltered by another pass, i.e. downsampled by 2**mipLevels. #}
+    {# The kernel is then applied with the remaining scale factor. #}
+    $$ if mipLevels is not defined
+    $$     set mipLevels = 0
+    $$ elif mipLevels
+    $$     set scaleFactor = scaleFactor / 2 ** mipLevels
+    $$ endif
+
     {# Generally speaking, even with a pixel ratio of 1, the input and output grid may not be aligned. #}
     {# But in our case (we assume) they are, so this basically becomes a 1-pixel copy-pass. #}
     {# We still use 'linear' and not 'nearest' because if the above assumption is not met, it's likely easier to spot due to the blurring. #}
@@ -190,15 +212,15 @@ fn fs_main(varyings: Varyings) -> @location(0) vec4<f32> {
     {#     Integer offsets in texture sample must be in the range [-8, 7] (inclusive) #}
     {#     This means that the maximum kernel size is 16x16 (i.e. 256 samples), and that the kernel is truncated for scales > 4. #}
     {#     Note that delta2 is exclusive, as in range(delta1, delta2), so we use 8 for both. #}
-    $$     set delta1 = [delta1, -8] | max
-    $$     set delta2 = [delta2,  8] | min
+    {#     The 1D kernel of the separable mode uses float offsets, so it is not truncated. #}
+    $$     if not axis
+    $$         set delta1 = [delta1, -8] | max
+    $$         set delta2 = [delta2,  8] | min
+    $$     endif
     $$  endif
 
-    {# Optimalization for scale factor being a whole uneven number #}
-    $$  if scaleFactor > 1 and scaleFactor % 1 == 0 and scaleFactor % 2 != 0
-    $$     set delta2 = delta2 - 1
-    $$     set refPos = "Near"
-    $$  endif
+    {# Note: with a whole uneven scale factor, the sample is at a pixel center only if the source size is a #}
+    {# multiple of the scale factor, so we cannot use a smaller odd kernel. That case is covered by the taps. #}
 
     {# Show info in the generated wgsl #}
     // Templating info:
@@ -208,6 +230,12 @@ fn fs_main(varyings: Varyings) -> @location(0) vec4<f32> {
     // kernelSupport: {{ kernelSupport }}
     // delta1: {{ delta1 }}
     // delta2: {{ delta2 }}
+    // axis: {{ axis }}
+    // mipLevels: {{ mipLevels }}
+
+    {# The pre-calculated taps for integer scale factors #}
+    $$ from "ssaa_taps.wgsl" import ssaa_taps
+    $$ set tapsKey = filter ~ "-" ~ (scaleFactor | float)
 
     // The sigma (scale) of the filter scales with the scaleFactor, because it
     // defines the cut-off frequency of the filter. But when we up-sample, we don't
@@ -223,76 +251,43 @@ fn fs_main(varyings: Varyings) -> @location(0) vec4<f32> {
         // Sample color directly from the texture
         color = textureSampleLevel(colorTex, texSampler, texCoord{{ refPos }}, 0.0);
 
-    $$ elif false and optScale2 and scaleFactor == 2 and filter == 'tent'
-        // Optimization: with scaleFactor 2, we can pre-calculate kernel weights *and* use bilinear sampling trickery!
-        // Created with https://gist.github.com/almarklein/a6113c202ec87987df1c954bd947e757
-        // For tent we just need 4 lookups.
-        color +=  0.249998 * textureSampleLevel(colorTex, texSampler, texCoordOrig + vec2f(-0.656246, -0.656246) * invPixelSize, 0.0);
-        color +=  0.249998 * textureSampleLevel(colorTex, texSampler, texCoordOrig + vec2f(-0.656246,  0.656246) * invPixelSize, 0.0);
-        color +=  0.249998 * textureSampleLevel(colorTex, texSampler, texCoordOrig + vec2f( 0.656246, -0.656246) * invPixelSize, 0.0);
-        color +=  0.249998 * textureSampleLevel(colorTex, texSampler, texCoordOrig + vec2f( 0.656246,  0.656246) * invPixelSize, 0.0);
-
-     $$ elif optScale2 and scaleFactor == 2 and filter == 'bspline'
-        // Optimization: with scaleFactor 2, we can pre-calculate kernel weights *and* use bilinear sampling trickery!
-        // Created with https://gist.github.com/almarklein/a6113c202ec87987df1c954bd947e757
-        // For Bspline we use all 16 lookups.
-        color +=  0.001329 * textureSampleLevel(colorTex, texSampler, texCoordOrig + vec2f(-3.000000, -3.000000) * invPixelSize, 0.0);
-        color +=  0.016961 * textureSampleLevel(colorTex, texSampler, texCoordOrig + vec2f(-2.538413, -0.840665) * invPixelSize, 0.0);
-        color +=  0.016961 * textureSampleLevel(colorTex, texSampler, texCoordOrig + vec2f(-2.538413,  0.840665) * invPixelSize, 0.0);
-        color +=  0.001329 * textureSampleLevel(colorTex, texSampler, texCoordOrig + vec2f(-3.000000,  3.000000) * invPixelSize, 0.0);
-        color +=  0.016961 * textureSampleLevel(colorTex, texSampler, texCoordOrig + vec2f(-0.840665, -2.538413) * invPixelSize, 0.0);
-        color +=  0.214872 * textureSampleLevel(colorTex, texSampler, texCoordOrig + vec2f(-0.839843, -0.839843) * invPixelSize, 0.0);
-        color +=  0.214872 * textureSampleLevel(colorTex, texSampler, texCoordOrig + vec2f(-0.839843,  0.839843) * invPixelSize, 0.0);
-        color +=  0.016961 * textureSampleLevel(colorTex, texSampler, texCoordOrig + vec2f(-0.840665,  2.538413) * invPixelSize, 0.0);
-        color +=  0.016961 * textureSampleLevel(colorTex, texSampler, texCoordOrig + vec2f( 0.840665, -2.538413) * invPixelSize, 0.0);
-        color +=  0.214872 * textureSampleLevel(colorTex, texSampler, texCoordOrig + vec2f( 0.839843, -0.839843) * invPixelSize, 0.0);
-        color +=  0.214872 * textureSampleLevel(colorTex, texSampler, texCoordOrig + vec2f( 0.839843,  0.839843) * invPixelSize, 0.0);
-        color +=  0.016961 * textureSampleLevel(colorTex, texSampler, texCoordOrig + vec2f( 0.840665,  2.538413) * invPixelSize, 0.0);
-        color +=  0.001329 * textureSampleLevel(colorTex, texSampler, texCoordOrig + vec2f( 3.000000, -3.000000) * invPixelSize, 0.0);
-        color +=  0.016961 * textureSampleLevel(colorTex, texSampler, texCoordOrig + vec2f( 2.538413, -0.840665) * invPixelSize, 0.0);
-        color +=  0.016961 * textureSampleLevel(colorTex, texSampler, texCoordOrig + vec2f( 2.538413,  0.840665) * invPixelSize, 0.0);
-        color +=  0.001329 * textureSampleLevel(colorTex, texSampler, texCoordOrig + vec2f( 3.000000,  3.000000) * invPixelSize, 0.0);
-
-    $$ elif optScale2 and scaleFactor == 2 and filter == 'mitchell'
-        // Optimization: with scaleFactor, we can pre-calculate kernel weights *and* use bilinear sampling trickery!
-        // Created with https://gist.github.com/almarklein/a6113c202ec87987df1c954bd947e757
-        // For Mitchell uses 12 lookups, which is more performant than 16 lookups while still producing an error < 0.001.
-        color += -0.009934 * textureSampleLevel(colorTex, texSampler, texCoordOrig + vec2f(-2.886093, -0.746066) * invPixelSize, 0.0);
-        color += -0.009934 * textureSampleLevel(colorTex, texSampler, texCoordOrig + vec2f(-2.886093,  0.746066) * invPixelSize, 0.0);
-        color += -0.009934 * textureSampleLevel(colorTex, texSampler, texCoordOrig + vec2f(-0.746066, -2.886093) * invPixelSize, 0.0);
-        color +=  0.269867 * textureSampleLevel(colorTex, texSampler, texCoordOrig + vec2f(-0.746677, -0.746677) * invPixelSize, 0.0);
-        color +=  0.269867 * textureSampleLevel(colorTex, texSampler, texCoordOrig + vec2f(-0.746677,  0.746677) * invPixelSize, 0.0);
-        color += -0.009934 * textureSampleLevel(colorTex, texSampler, texCoordOrig + vec2f(-0.746066,  2.886093) * invPixelSize, 0.0);
-        color += -0.009934 * textureSampleLevel(colorTex, texSampler, texCoordOrig + vec2f( 0.746066, -2.886093) * invPixelSize, 0.0);
-        color +=  0.269867 * textureSampleLevel(colorTex, texSampler, texCoordOrig + vec2f( 0.746677, -0.746677) * invPixelSize, 0.0);
-        color +=  0.269867 * textureSampleLevel(colorTex, texSampler, texCoordOrig + vec2f( 0.746677,  0.746677) * invPixelSize, 0.0);
-        color += -0.009934 * textureSampleLevel(colorTex, texSampler, texCoordOrig + vec2f( 0.746066,  2.886093) * invPixelSize, 0.0);
-        color += -0.009934 * textureSampleLevel(colorTex, texSampler, texCoordOrig + vec2f( 2.886093, -0.746066) * invPixelSize, 0.0);
-        color += -0.009934 * textureSampleLevel(colorTex, texSampler, texCoordOrig + vec2f( 2.886093,  0.746066) * invPixelSize, 0.0);
-
-     $$ elif optScale2 and scaleFactor == 2 and filter == 'catmull'
-        // Optimization: with scaleFactor, we can pre-calculate kernel weights *and* use bilinear sampling trickery!
-        // Created with https://gist.github.com/almarklein/a6113c202ec87987df1c954bd947e757
-        // For Bspline we use all 16 lookups.
-        color +=  0.002197 * textureSampleLevel(colorTex, texSampler, texCoordOrig + vec2f(-3.000000, -3.000000) * invPixelSize, 0.0);
-        color += -0.025636 * textureSampleLevel(colorTex, texSampler, texCoordOrig + vec2f(-2.750033, -0.707216) * invPixelSize, 0.0);
-        color += -0.025636 * textureSampleLevel(colorTex, texSampler, texCoordOrig + vec2f(-2.750033,  0.707216) * invPixelSize, 0.0);
-        color +=  0.002197 * textureSampleLevel(colorTex, texSampler, texCoordOrig + vec2f(-3.000000,  3.000000) * invPixelSize, 0.0);
-        color += -0.025636 * textureSampleLevel(colorTex, texSampler, texCoordOrig + vec2f(-0.707216, -2.750033) * invPixelSize, 0.0);
-        color +=  0.299072 * textureSampleLevel(colorTex, texSampler, texCoordOrig + vec2f(-0.707143, -0.707143) * invPixelSize, 0.0);
-        color +=  0.299072 * textureSampleLevel(colorTex, texSampler, texCoordOrig + vec2f(-0.707143,  0.707143) * invPixelSize, 0.0);
-        color += -0.025636 * textureSampleLevel(colorTex, texSampler, texCoordOrig + vec2f(-0.707216,  2.750033) * invPixelSize, 0.0);
-        color += -0.025636 * textureSampleLevel(colorTex, texSampler, texCoordOrig + vec2f( 0.707216, -2.750033) * invPixelSize, 0.0);
-        color +=  0.299072 * textureSampleLevel(colorTex, texSampler, texCoordOrig + vec2f( 0.707143, -0.707143) * invPixelSize, 0.0);
-        color +=  0.299072 * textureSampleLevel(colorTex, texSampler, texCoordOrig + vec2f( 0.707143,  0.707143) * invPixelSize, 0.0);
-        color += -0.025636 * textureSampleLevel(colorTex, texSampler, texCoordOrig + vec2f( 0.707216,  2.750033) * invPixelSize, 0.0);
-        color +=  0.002197 * textureSampleLevel(colorTex, texSampler, texCoordOrig + vec2f( 3.000000, -3.000000) * invPixelSize, 0.0);
-        color += -0.025636 * textureSampleLevel(colorTex, texSampler, texCoordOrig + vec2f( 2.750033, -0.707216) * invPixelSize, 0.0);
-        color += -0.025636 * textureSampleLevel(colorTex, texSampler, texCoordOrig + vec2f( 2.750033,  0.707216) * invPixelSize, 0.0);
-        color +=  0.002197 * textureSampleLevel(colorTex, texSampler, texCoordOrig + vec2f( 3.000000,  3.000000) * invPixelSize, 0.0);
+    $$ elif axis
+        // Separable mode: a 1D kernel along the {{ axis }}-axis. The other axis is at the output
+        // resolution, so we sample at the original position there.
+        $$ set step = "vec2f(1.0, 0.0)" if axis == "x" else "vec2f(0.0, 1.0)"
+        let texCoordRef = select(texCoordOrig, texCoord{{ refPos }}, {{ step }} > vec2f(0.0));
+        let tRef = (fPos{{ refPos }} - fPosOrig).{{ axis }};
+        var c: vec4f;
+        var w: f32;
+        $$ for d in range(delta1, delta2)
+            w = filterweight{{ filter.lower().capitalize() }}(vec2f(tRef + {{ d }}.0, 0.0) / sigma);
+            c = textureSampleLevel(colorTex, texSampler, texCoordRef + {{ d }}.0 * {{ step }} * invPixelSize, 0.0);
+            color += w * c;
+            weight += w;
+        $$ endfor
+        if weight == 0.0 { weight = 1.0; }
+        color /= weight;
 
     $$ else
 
+    $$ if optTaps and tapsKey in ssaa_taps
+        // Optimization: with an integer scale factor, the kernel is the same for each fragment, so we can
+        // pre-calculate kernel weights *and* use bilinear sampling trickery, to sample up to 4 pixels per lookup!
+        // The taps are generated with scripts/kernel_opt.py. With optCorners, the smallest taps are dropped.
+        // This only holds if the source size is a multiple of the scale factor; otherwise the sample points
+        // are not at the same phase for each fragment, and we use the loop. This condition is uniform.
+        let sourceSize = vec2u(textureDimensions(colorTex).xy);
+        if all(sourceSize % {{ scaleFactor | int }}u == vec2u(0u)) {
+        $$ for w, wOpt, dx, dy in ssaa_taps[tapsKey]
+        $$ set w = wOpt if optCorners else w
+        $$ if w != 0
+            color += {{ '%9.6f' | format(w) }} * textureSampleLevel(colorTex, texSampler, texCoordOrig + vec2f({{ '%9.6f' | format(dx) }}, {{ '%9.6f' | format(dy) }}) * invPixelSize, 0.0);
+        $$ endif
+        $$ endfor
+            weight = 1.0;
+        } else {
+    $$ endif
+
         // Templated loop (is more performant than a loop in wgsl)
         var c: vec4f;
         var t: vec2f;
@@ -309,12 +304,21 @@ fn fs_main(varyings: Varyings) -> @location(0) vec4<f32> {
         $$ endif
         $$ endfor
         $$ endfor
+
+    $$ if optTaps and tapsKey in ssaa_taps
+        }
+    $$ endif
         if weight == 0.0 { weight = 1.0; }
         color /= weight;
 
     $$ endif
 
 
+    $$ if intermediate
+    // The result goes into an intermediate texture (for the next pass), as is
+    return color;
+    $$ endif
+
     // Apply gamma
     $$ if gamma is not defined
     $$ set gamma = 1.0
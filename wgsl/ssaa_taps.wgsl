@@ -0,0 +1,709 @@
+{# Generated by scripts/kernel_opt.py, do not edit. #}
+{# The bilinear taps for ssaa.wgsl, per (filter, scale factor), as a list of #}
+{# (weight, weight with optCorners, dx, dy), with dx and dy in source pixels. #}
+{$ set ssaa_taps = {
+    "box-2.0": [
+        (1.000000, 1.000000, 0.000000, 0.000000),
+    ],
+    "tent-2.0": [
+        (0.250000, 0.250000, -0.750000, -0.750000),
+        (0.250000, 0.250000, 0.750000, -0.750000),
+        (0.250000, 0.250000, -0.750000, 0.750000),
+        (0.250000, 0.250000, 0.750000, 0.750000),
+    ],
+    "bspline-2.0": [
+        (0.001329, 0.001329, -2.535714, -2.535714),
+        (0.016900, 0.016900, -0.839888, -2.535714),
+        (0.016900, 0.016900, 0.839888, -2.535714),
+        (0.001329, 0.001329, 2.535714, -2.535714),
+        (0.016900, 0.016900, -2.535714, -0.839888),
+        (0.214871, 0.214871, -0.839888, -0.839888),
+        (0.214871, 0.214871, 0.839888, -0.839888),
+        (0.016900, 0.016900, 2.535714, -0.839888),
+        (0.016900, 0.016900, -2.535714, 0.839888),
+        (0.214871, 0.214871, -0.839888, 0.839888),
+        (0.214871, 0.214871, 0.839888, 0.839888),
+        (0.016900, 0.016900, 2.535714, 0.839888),
+        (0.001329, 0.001329, -2.535714, 2.535714),
+        (0.016900, 0.016900, -0.839888, 2.535714),
+        (0.016900, 0.016900, 0.839888, 2.535714),
+        (0.001329, 0.001329, 2.535714, 2.535714),
+    ],
+    "mitchell-2.0": [
+        (0.000365, 0.000000, -2.886364, -2.886364),
+        (-0.009913, -0.009928, -0.746656, -2.886364),
+        (-0.009913, -0.009928, 0.746656, -2.886364),
+        (0.000365, 0.000000, 2.886364, -2.886364),
+        (-0.009913, -0.009928, -2.886364, -0.746656),
+        (0.269462, 0.269856, -0.746656, -0.746656),
+        (0.269462, 0.269856, 0.746656, -0.746656),
+        (-0.009913, -0.009928, 2.886364, -0.746656),
+        (-0.009913, -0.009928, -2.886364, 0.746656),
+        (0.269462, 0.269856, -0.746656, 0.746656),
+        (0.269462, 0.269856, 0.746656, 0.746656),
+        (-0.009913, -0.009928, 2.886364, 0.746656),
+        (0.000365, 0.000000, -2.886364, 2.886364),
+        (-0.009913, -0.009928, -0.746656, 2.886364),
+        (-0.009913, -0.009928, 0.746656, 2.886364),
+        (0.000365, 0.000000, 2.886364, 2.886364),
+    ],
+    "catmull-2.0": [
+        (0.002197, 0.002197, -2.750000, -2.750000),
+        (-0.025635, -0.025635, -0.707143, -2.750000),
+        (-0.025635, -0.025635, 0.707143, -2.750000),
+        (0.002197, 0.002197, 2.750000, -2.750000),
+        (-0.025635, -0.025635, -2.750000, -0.707143),
+        (0.299072, 0.299072, -0.707143, -0.707143),
+        (0.299072, 0.299072, 0.707143, -0.707143),
+        (-0.025635, -0.025635, 2.750000, -0.707143),
+        (-0.025635, -0.025635, -2.750000, 0.707143),
+        (0.299072, 0.299072, -0.707143, 0.707143),
+        (0.299072, 0.299072, 0.707143, 0.707143),
+        (-0.025635, -0.025635, 2.750000, 0.707143),
+        (0.002197, 0.002197, -2.750000, 2.750000),
+        (-0.025635, -0.025635, -0.707143, 2.750000),
+        (-0.025635, -0.025635, 0.707143, 2.750000),
+        (0.002197, 0.002197, 2.750000, 2.750000),
+    ],
+    "box-3.0": [
+        (0.111111, 0.111111, -1.000000, -1.000000),
+        (0.222222, 0.222222, 0.500000, -1.000000),
+        (0.222222, 0.222222, -1.000000, 0.500000),
+        (0.444444, 0.444444, 0.500000, 0.500000),
+    ],
+    "tent-3.0": [
+        (0.111111, 0.111111, -1.333333, -1.333333),
+        (0.111111, 0.111111, 0.000000, -1.333333),
+        (0.111111, 0.111111, 1.333333, -1.333333),
+        (0.111111, 0.111111, -1.333333, 0.000000),
+        (0.111111, 0.111111, 0.000000, 0.000000),
+        (0.111111, 0.111111, 1.333333, 0.000000),
+        (0.111111, 0.111111, -1.333333, 1.333333),
+        (0.111111, 0.111111, 0.000000, 1.333333),
+        (0.111111, 0.111111, 1.333333, 1.333333),
+    ],
+    "bspline-3.0": [
+        (0.000343, 0.000000, -4.111111, -4.111111),
+        (0.003315, 0.003320, -2.310345, -4.111111),
+        (0.003544, 0.003549, -1.000000, -4.111111),
+        (0.007659, 0.007669, 0.462687, -4.111111),
+        (0.003315, 0.003320, 2.310345, -4.111111),
+        (0.000343, 0.000000, 4.111111, -4.111111),
+        (0.003315, 0.003320, -4.111111, -2.310345),
+        (0.032045, 0.032089, -2.310345, -2.310345),
+        (0.034255, 0.034303, -1.000000, -2.310345),
+        (0.074036, 0.074138, 0.462687, -2.310345),
+        (0.032045, 0.032089, 2.310345, -2.310345),
+        (0.003315, 0.003320, 4.111111, -2.310345),
+        (0.003544, 0.003549, -4.111111, -1.000000),
+        (0.034255, 0.034303, -2.310345, -1.000000),
+        (0.036618, 0.036668, -1.000000, -1.000000),
+        (0.079142, 0.079251, 0.462687, -1.000000),
+        (0.034255, 0.034303, 2.310345, -1.000000),
+        (0.003544, 0.003549, 4.111111, -1.000000),
+        (0.007659, 0.007669, -4.111111, 0.462687),
+        (0.074036, 0.074138, -2.310345, 0.462687),
+        (0.079142, 0.079251, -1.000000, 0.462687),
+        (0.171049, 0.171284, 0.462687, 0.462687),
+        (0.074036, 0.074138, 2.310345, 0.462687),
+        (0.007659, 0.007669, 4.111111, 0.462687),
+        (0.003315, 0.003320, -4.111111, 2.310345),
+        (0.032045, 0.032089, -2.310345, 2.310345),
+        (0.034255, 0.034303, -1.000000, 2.310345),
+        (0.074036, 0.074138, 0.462687, 2.310345),
+        (0.032045, 0.032089, 2.310345, 2.310345),
+        (0.003315, 0.003320, 4.111111, 2.310345),
+        (0.000343, 0.000000, -4.111111, 4.111111),
+        (0.003315, 0.003320, -2.310345, 4.111111),
+        (0.003544, 0.003549, -1.000000, 4.111111),
+        (0.007659, 0.007669, 0.462687, 4.111111),
+        (0.003315, 0.003320, 2.310345, 4.111111),
+        (0.000343, 0.000000, 4.111111, 4.111111),
+    ],
+    "mitchell-3.0": [
+        (0.000343, 0.000000, -4.407407, -4.407407),
+        (-0.002477, -0.002480, -2.138462, -4.407407),
+        (-0.004382, -0.004388, -1.000000, -4.407407),
+        (-0.009869, -0.009882, 0.444015, -4.407407),
+        (-0.002477, -0.002480, 2.138462, -4.407407),
+        (0.000343, 0.000000, 4.407407, -4.407407),
+        (-0.002477, -0.002480, -4.407407, -2.138462),
+        (0.017888, 0.017912, -2.138462, -2.138462),
+        (0.031647, 0.031691, -1.000000, -2.138462),
+        (0.071276, 0.071373, 0.444015, -2.138462),
+        (0.017888, 0.017912, 2.138462, -2.138462),
+        (-0.002477, -0.002480, 4.407407, -2.138462),
+        (-0.004382, -0.004388, -4.407407, -1.000000),
+        (0.031647, 0.031691, -2.138462, -1.000000),
+        (0.055992, 0.056069, -1.000000, -1.000000),
+        (0.126103, 0.126276, 0.444015, -1.000000),
+        (0.031647, 0.031691, 2.138462, -1.000000),
+        (-0.004382, -0.004388, 4.407407, -1.000000),
+        (-0.009869, -0.009882, -4.407407, 0.444015),
+        (0.071276, 0.071373, -2.138462, 0.444015),
+        (0.126103, 0.126276, -1.000000, 0.444015),
+        (0.284006, 0.284396, 0.444015, 0.444015),
+        (0.071276, 0.071373, 2.138462, 0.444015),
+        (-0.009869, -0.009882, 4.407407, 0.444015),
+        (-0.002477, -0.002480, -4.407407, 2.138462),
+        (0.017888, 0.017912, -2.138462, 2.138462),
+        (0.031647, 0.031691, -1.000000, 2.138462),
+        (0.071276, 0.071373, 0.444015, 2.138462),
+        (0.017888, 0.017912, 2.138462, 2.138462),
+        (-0.002477, -0.002480, 4.407407, 2.138462),
+        (0.000343, 0.000000, -4.407407, 4.407407),
+        (-0.002477, -0.002480, -2.138462, 4.407407),
+        (-0.004382, -0.004388, -1.000000, 4.407407),
+        (-0.009869, -0.009882, 0.444015, 4.407407),
+        (-0.002477, -0.002480, 2.138462, 4.407407),
+        (0.000343, 0.000000, 4.407407, 4.407407),
+    ],
+    "catmull-3.0": [
+        (0.001372, 0.000000, -4.333333, -4.333333),
+        (-0.013717, -0.013793, -1.300000, -4.333333),
+        (-0.012346, -0.012414, 0.000000, -4.333333),
+        (-0.013717, -0.013793, 1.300000, -4.333333),
+        (0.001372, 0.000000, 4.333333, -4.333333),
+        (-0.013717, -0.013793, -4.333333, -1.300000),
+        (0.137174, 0.137931, -1.300000, -1.300000),
+        (0.123457, 0.124138, 0.000000, -1.300000),
+        (0.137174, 0.137931, 1.300000, -1.300000),
+        (-0.013717, -0.013793, 4.333333, -1.300000),
+        (-0.012346, -0.012414, -4.333333, 0.000000),
+        (0.123457, 0.124138, -1.300000, 0.000000),
+        (0.111111, 0.111724, 0.000000, 0.000000),
+        (0.123457, 0.124138, 1.300000, 0.000000),
+        (-0.012346, -0.012414, 4.333333, 0.000000),
+        (-0.013717, -0.013793, -4.333333, 1.300000),
+        (0.137174, 0.137931, -1.300000, 1.300000),
+        (0.123457, 0.124138, 0.000000, 1.300000),
+        (0.137174, 0.137931, 1.300000, 1.300000),
+        (-0.013717, -0.013793, 4.333333, 1.300000),
+        (0.001372, 0.000000, -4.333333, 4.333333),
+        (-0.013717, -0.013793, -1.300000, 4.333333),
+        (-0.012346, -0.012414, 0.000000, 4.333333),
+        (-0.013717, -0.013793, 1.300000, 4.333333),
+        (0.001372, 0.000000, 4.333333, 4.333333),
+    ],
+    "box-4.0": [
+        (0.250000, 0.250000, -1.000000, -1.000000),
+        (0.250000, 0.250000, 1.000000, -1.000000),
+        (0.250000, 0.250000, -1.000000, 1.000000),
+        (0.250000, 0.250000, 1.000000, 1.000000),
+    ],
+    "tent-4.0": [
+        (0.015625, 0.015625, -2.750000, -2.750000),
+        (0.046875, 0.046875, -0.916667, -2.750000),
+        (0.046875, 0.046875, 0.916667, -2.750000),
+        (0.015625, 0.015625, 2.750000, -2.750000),
+        (0.046875, 0.046875, -2.750000, -0.916667),
+        (0.140625, 0.140625, -0.916667, -0.916667),
+        (0.140625, 0.140625, 0.916667, -0.916667),
+        (0.046875, 0.046875, 2.750000, -0.916667),
+        (0.046875, 0.046875, -2.750000, 0.916667),
+        (0.140625, 0.140625, -0.916667, 0.916667),
+        (0.140625, 0.140625, 0.916667, 0.916667),
+        (0.046875, 0.046875, 2.750000, 0.916667),
+        (0.015625, 0.015625, -2.750000, 2.750000),
+        (0.046875, 0.046875, -0.916667, 2.750000),
+        (0.046875, 0.046875, 0.916667, 2.750000),
+        (0.015625, 0.015625, 2.750000, 2.750000),
+    ],
+    "bspline-4.0": [
+        (0.000005, 0.000000, -6.535714, -6.535714),
+        (0.000087, 0.000000, -4.767094, -6.535714),
+        (0.000361, 0.000000, -2.872177, -6.535714),
+        (0.000686, 0.000000, -0.958649, -6.535714),
+        (0.000686, 0.000000, 0.958649, -6.535714),
+        (0.000361, 0.000000, 2.872177, -6.535714),
+        (0.000087, 0.000000, 4.767094, -6.535714),
+        (0.000005, 0.000000, 6.535714, -6.535714),
+        (0.000087, 0.000000, -6.535714, -4.767094),
+        (0.001451, 0.000000, -4.767094, -4.767094),
+        (0.006038, 0.006129, -2.872177, -4.767094),
+        (0.011468, 0.011641, -0.958649, -4.767094),
+        (0.011468, 0.011641, 0.958649, -4.767094),
+        (0.006038, 0.006129, 2.872177, -4.767094),
+        (0.001451, 0.000000, 4.767094, -4.767094),
+        (0.000087, 0.000000, 6.535714, -4.767094),
+        (0.000361, 0.000000, -6.535714, -2.872177),
+        (0.006038, 0.006129, -4.767094, -2.872177),
+        (0.025131, 0.025511, -2.872177, -2.872177),
+        (0.047734, 0.048456, -0.958649, -2.872177),
+        (0.047734, 0.048456, 0.958649, -2.872177),
+        (0.025131, 0.025511, 2.872177, -2.872177),
+        (0.006038, 0.006129, 4.767094, -2.872177),
+        (0.000361, 0.000000, 6.535714, -2.872177),
+        (0.000686, 0.000000, -6.535714, -0.958649),
+        (0.011468, 0.011641, -4.767094, -0.958649),
+        (0.047734, 0.048456, -2.872177, -0.958649),
+        (0.090665, 0.092036, -0.958649, -0.958649),
+        (0.090665, 0.092036, 0.958649, -0.958649),
+        (0.047734, 0.048456, 2.872177, -0.958649),
+        (0.011468, 0.011641, 4.767094, -0.958649),
+        (0.000686, 0.000000, 6.535714, -0.958649),
+        (0.000686, 0.000000, -6.535714, 0.958649),
+        (0.011468, 0.011641, -4.767094, 0.958649),
+        (0.047734, 0.048456, -2.872177, 0.958649),
+        (0.090665, 0.092036, -0.958649, 0.958649),
+        (0.090665, 0.092036, 0.958649, 0.958649),
+        (0.047734, 0.048456, 2.872177, 0.958649),
+        (0.011468, 0.011641, 4.767094, 0.958649),
+        (0.000686, 0.000000, 6.535714, 0.958649),
+        (0.000361, 0.000000, -6.535714, 2.872177),
+        (0.006038, 0.006129, -4.767094, 2.872177),
+        (0.025131, 0.025511, -2.872177, 2.872177),
+        (0.047734, 0.048456, -0.958649, 2.872177),
+        (0.047734, 0.048456, 0.958649, 2.872177),
+        (0.025131, 0.025511, 2.872177, 2.872177),
+        (0.006038, 0.006129, 4.767094, 2.872177),
+        (0.000361, 0.000000, 6.535714, 2.872177),
+        (0.000087, 0.000000, -6.535714, 4.767094),
+        (0.001451, 0.000000, -4.767094, 4.767094),
+        (0.006038, 0.006129, -2.872177, 4.767094),
+        (0.011468, 0.011641, -0.958649, 4.767094),
+        (0.011468, 0.011641, 0.958649, 4.767094),
+        (0.006038, 0.006129, 2.872177, 4.767094),
+        (0.001451, 0.000000, 4.767094, 4.767094),
+        (0.000087, 0.000000, 6.535714, 4.767094),
+        (0.000005, 0.000000, -6.535714, 6.535714),
+        (0.000087, 0.000000, -4.767094, 6.535714),
+        (0.000361, 0.000000, -2.872177, 6.535714),
+        (0.000686, 0.000000, -0.958649, 6.535714),
+        (0.000686, 0.000000, 0.958649, 6.535714),
+        (0.000361, 0.000000, 2.872177, 6.535714),
+        (0.000087, 0.000000, 4.767094, 6.535714),
+        (0.000005, 0.000000, 6.535714, 6.535714),
+    ],
+    "mitchell-4.0": [
+        (0.000059, 0.000000, -6.644366, -6.644366),
+        (0.000068, 0.000000, -5.500000, -6.644366),
+        (-0.000278, 0.000000, -3.536787, -6.644366),
+        (-0.002045, -0.002037, -1.869685, -6.644366),
+        (-0.003312, -0.003300, 0.000000, -6.644366),
+        (-0.002045, -0.002037, 1.869685, -6.644366),
+        (-0.000278, 0.000000, 3.536787, -6.644366),
+        (0.000068, 0.000000, 5.500000, -6.644366),
+        (0.000059, 0.000000, 6.644366, -6.644366),
+        (0.000068, 0.000000, -6.644366, -5.500000),
+        (0.000078, 0.000000, -5.500000, -5.500000),
+        (-0.000319, 0.000000, -3.536787, -5.500000),
+        (-0.002340, -0.002331, -1.869685, -5.500000),
+        (-0.003791, -0.003777, 0.000000, -5.500000),
+        (-0.002340, -0.002331, 1.869685, -5.500000),
+        (-0.000319, 0.000000, 3.536787, -5.500000),
+        (0.000078, 0.000000, 5.500000, -5.500000),
+        (0.000068, 0.000000, 6.644366, -5.500000),
+        (-0.000278, 0.000000, -6.644366, -3.536787),
+        (-0.000319, 0.000000, -5.500000, -3.536787),
+        (0.001306, 0.001301, -3.536787, -3.536787),
+        (0.009590, 0.009555, -1.869685, -3.536787),
+        (0.015536, 0.015479, 0.000000, -3.536787),
+        (0.009590, 0.009555, 1.869685, -3.536787),
+        (0.001306, 0.001301, 3.536787, -3.536787),
+        (-0.000319, 0.000000, 5.500000, -3.536787),
+        (-0.000278, 0.000000, 6.644366, -3.536787),
+        (-0.002045, -0.002037, -6.644366, -1.869685),
+        (-0.002340, -0.002331, -5.500000, -1.869685),
+        (0.009590, 0.009555, -3.536787, -1.869685),
+        (0.070441, 0.070183, -1.869685, -1.869685),
+        (0.114114, 0.113696, 0.000000, -1.869685),
+        (0.070441, 0.070183, 1.869685, -1.869685),
+        (0.009590, 0.009555, 3.536787, -1.869685),
+        (-0.002340, -0.002331, 5.500000, -1.869685),
+        (-0.002045, -0.002037, 6.644366, -1.869685),
+        (-0.003312, -0.003300, -6.644366, 0.000000),
+        (-0.003791, -0.003777, -5.500000, 0.000000),
+        (0.015536, 0.015479, -3.536787, 0.000000),
+        (0.114114, 0.113696, -1.869685, 0.000000),
+        (0.184865, 0.184186, 0.000000, 0.000000),
+        (0.114114, 0.113696, 1.869685, 0.000000),
+        (0.015536, 0.015479, 3.536787, 0.000000),
+        (-0.003791, -0.003777, 5.500000, 0.000000),
+        (-0.003312, -0.003300, 6.644366, 0.000000),
+        (-0.002045, -0.002037, -6.644366, 1.869685),
+        (-0.002340, -0.002331, -5.500000, 1.869685),
+        (0.009590, 0.009555, -3.536787, 1.869685),
+        (0.070441, 0.070183, -1.869685, 1.869685),
+        (0.114114, 0.113696, 0.000000, 1.869685),
+        (0.070441, 0.070183, 1.869685, 1.869685),
+        (0.009590, 0.009555, 3.536787, 1.869685),
+        (-0.002340, -0.002331, 5.500000, 1.869685),
+        (-0.002045, -0.002037, 6.644366, 1.869685),
+        (-0.000278, 0.000000, -6.644366, 3.536787),
+        (-0.000319, 0.000000, -5.500000, 3.536787),
+        (0.001306, 0.001301, -3.536787, 3.536787),
+        (0.009590, 0.009555, -1.869685, 3.536787),
+        (0.015536, 0.015479, 0.000000, 3.536787),
+        (0.009590, 0.009555, 1.869685, 3.536787),
+        (0.001306, 0.001301, 3.536787, 3.536787),
+        (-0.000319, 0.000000, 5.500000, 3.536787),
+        (-0.000278, 0.000000, 6.644366, 3.536787),
+        (0.000068, 0.000000, -6.644366, 5.500000),
+        (0.000078, 0.000000, -5.500000, 5.500000),
+        (-0.000319, 0.000000, -3.536787, 5.500000),
+        (-0.002340, -0.002331, -1.869685, 5.500000),
+        (-0.003791, -0.003777, 0.000000, 5.500000),
+        (-0.002340, -0.002331, 1.869685, 5.500000),
+        (-0.000319, 0.000000, 3.536787, 5.500000),
+        (0.000078, 0.000000, 5.500000, 5.500000),
+        (0.000068, 0.000000, 6.644366, 5.500000),
+        (0.000059, 0.000000, -6.644366, 6.644366),
+        (0.000068, 0.000000, -5.500000, 6.644366),
+        (-0.000278, 0.000000, -3.536787, 6.644366),
+        (-0.002045, -0.002037, -1.869685, 6.644366),
+        (-0.003312, -0.003300, 0.000000, 6.644366),
+        (-0.002045, -0.002037, 1.869685, 6.644366),
+        (-0.000278, 0.000000, 3.536787, 6.644366),
+        (0.000068, 0.000000, 5.500000, 6.644366),
+        (0.000059, 0.000000, 6.644366, 6.644366),
+    ],
+    "catmull-4.0": [
+        (0.000161, 0.000000, -6.634615, -6.634615),
+        (0.000384, 0.000000, -5.104839, -6.634615),
+        (-0.001525, -0.001536, -2.689024, -6.634615),
+        (-0.005368, -0.005408, -0.930139, -6.634615),
+        (-0.005368, -0.005408, 0.930139, -6.634615),
+        (-0.001525, -0.001536, 2.689024, -6.634615),
+        (0.000384, 0.000000, 5.104839, -6.634615),
+        (0.000161, 0.000000, 6.634615, -6.634615),
+        (0.000384, 0.000000, -6.634615, -5.104839),
+        (0.000916, 0.000000, -5.104839, -5.104839),
+        (-0.003636, -0.003663, -2.689024, -5.104839),
+        (-0.012801, -0.012896, -0.930139, -5.104839),
+        (-0.012801, -0.012896, 0.930139, -5.104839),
+        (-0.003636, -0.003663, 2.689024, -5.104839),
+        (0.000916, 0.000000, 5.104839, -5.104839),
+        (0.000384, 0.000000, 6.634615, -5.104839),
+        (-0.001525, -0.001536, -6.634615, -2.689024),
+        (-0.003636, -0.003663, -5.104839, -2.689024),
+        (0.014428, 0.014535, -2.689024, -2.689024),
+        (0.050792, 0.051170, -0.930139, -2.689024),
+        (0.050792, 0.051170, 0.930139, -2.689024),
+        (0.014428, 0.014535, 2.689024, -2.689024),
+        (-0.003636, -0.003663, 5.104839, -2.689024),
+        (-0.001525, -0.001536, 6.634615, -2.689024),
+        (-0.005368, -0.005408, -6.634615, -0.930139),
+        (-0.012801, -0.012896, -5.104839, -0.930139),
+        (0.050792, 0.051170, -2.689024, -0.930139),
+        (0.178803, 0.180134, -0.930139, -0.930139),
+        (0.178803, 0.180134, 0.930139, -0.930139),
+        (0.050792, 0.051170, 2.689024, -0.930139),
+        (-0.012801, -0.012896, 5.104839, -0.930139),
+        (-0.005368, -0.005408, 6.634615, -0.930139),
+        (-0.005368, -0.005408, -6.634615, 0.930139),
+        (-0.012801, -0.012896, -5.104839, 0.930139),
+        (0.050792, 0.051170, -2.689024, 0.930139),
+        (0.178803, 0.180134, -0.930139, 0.930139),
+        (0.178803, 0.180134, 0.930139, 0.930139),
+        (0.050792, 0.051170, 2.689024, 0.930139),
+        (-0.012801, -0.012896, 5.104839, 0.930139),
+        (-0.005368, -0.005408, 6.634615, 0.930139),
+        (-0.001525, -0.001536, -6.634615, 2.689024),
+        (-0.003636, -0.003663, -5.104839, 2.689024),
+        (0.014428, 0.014535, -2.689024, 2.689024),
+        (0.050792, 0.051170, -0.930139, 2.689024),
+        (0.050792, 0.051170, 0.930139, 2.689024),
+        (0.014428, 0.014535, 2.689024, 2.689024),
+        (-0.003636, -0.003663, 5.104839, 2.689024),
+        (-0.001525, -0.001536, 6.634615, 2.689024),
+        (0.000384, 0.000000, -6.634615, 5.104839),
+        (0.000916, 0.000000, -5.104839, 5.104839),
+        (-0.003636, -0.003663, -2.689024, 5.104839),
+        (-0.012801, -0.012896, -0.930139, 5.104839),
+        (-0.012801, -0.012896, 0.930139, 5.104839),
+        (-0.003636, -0.003663, 2.689024, 5.104839),
+        (0.000916, 0.000000, 5.104839, 5.104839),
+        (0.000384, 0.000000, 6.634615, 5.104839),
+        (0.000161, 0.000000, -6.634615, 6.634615),
+        (0.000384, 0.000000, -5.104839, 6.634615),
+        (-0.001525, -0.001536, -2.689024, 6.634615),
+        (-0.005368, -0.005408, -0.930139, 6.634615),
+        (-0.005368, -0.005408, 0.930139, 6.634615),
+        (-0.001525, -0.001536, 2.689024, 6.634615),
+        (0.000384, 0.000000, 5.104839, 6.634615),
+        (0.000161, 0.000000, 6.634615, 6.634615),
+    ],
+    "box-8.0": [
+        (0.062500, 0.062500, -3.000000, -3.000000),
+        (0.062500, 0.062500, -1.000000, -3.000000),
+        (0.062500, 0.062500, 1.000000, -3.000000),
+        (0.062500, 0.062500, 3.000000, -3.000000),
+        (0.062500, 0.062500, -3.000000, -1.000000),
+        (0.062500, 0.062500, -1.000000, -1.000000),
+        (0.062500, 0.062500, 1.000000, -1.000000),
+        (0.062500, 0.062500, 3.000000, -1.000000),
+        (0.062500, 0.062500, -3.000000, 1.000000),
+        (0.062500, 0.062500, -1.000000, 1.000000),
+        (0.062500, 0.062500, 1.000000, 1.000000),
+        (0.062500, 0.062500, 3.000000, 1.000000),
+        (0.062500, 0.062500, -3.000000, 3.000000),
+        (0.062500, 0.062500, -1.000000, 3.000000),
+        (0.062500, 0.062500, 1.000000, 3.000000),
+        (0.062500, 0.062500, 3.000000, 3.000000),
+    ],
+    "tent-8.0": [
+        (0.000977, 0.000000, -6.750000, -6.750000),
+        (0.002930, 0.002941, -4.916667, -6.750000),
+        (0.004883, 0.004902, -2.950000, -6.750000),
+        (0.006836, 0.006863, -0.964286, -6.750000),
+        (0.006836, 0.006863, 0.964286, -6.750000),
+        (0.004883, 0.004902, 2.950000, -6.750000),
+        (0.002930, 0.002941, 4.916667, -6.750000),
+        (0.000977, 0.000000, 6.750000, -6.750000),
+        (0.002930, 0.002941, -6.750000, -4.916667),
+        (0.008789, 0.008824, -4.916667, -4.916667),
+        (0.014648, 0.014706, -2.950000, -4.916667),
+        (0.020508, 0.020588, -0.964286, -4.916667),
+        (0.020508, 0.020588, 0.964286, -4.916667),
+        (0.014648, 0.014706, 2.950000, -4.916667),
+        (0.008789, 0.008824, 4.916667, -4.916667),
+        (0.002930, 0.002941, 6.750000, -4.916667),
+        (0.004883, 0.004902, -6.750000, -2.950000),
+        (0.014648, 0.014706, -4.916667, -2.950000),
+        (0.024414, 0.024510, -2.950000, -2.950000),
+        (0.034180, 0.034314, -0.964286, -2.950000),
+        (0.034180, 0.034314, 0.964286, -2.950000),
+        (0.024414, 0.024510, 2.950000, -2.950000),
+        (0.014648, 0.014706, 4.916667, -2.950000),
+        (0.004883, 0.004902, 6.750000, -2.950000),
+        (0.006836, 0.006863, -6.750000, -0.964286),
+        (0.020508, 0.020588, -4.916667, -0.964286),
+        (0.034180, 0.034314, -2.950000, -0.964286),
+        (0.047852, 0.048039, -0.964286, -0.964286),
+        (0.047852, 0.048039, 0.964286, -0.964286),
+        (0.034180, 0.034314, 2.950000, -0.964286),
+        (0.020508, 0.020588, 4.916667, -0.964286),
+        (0.006836, 0.006863, 6.750000, -0.964286),
+        (0.006836, 0.006863, -6.750000, 0.964286),
+        (0.020508, 0.020588, -4.916667, 0.964286),
+        (0.034180, 0.034314, -2.950000, 0.964286),
+        (0.047852, 0.048039, -0.964286, 0.964286),
+        (0.047852, 0.048039, 0.964286, 0.964286),
+        (0.034180, 0.034314, 2.950000, 0.964286),
+        (0.020508, 0.020588, 4.916667, 0.964286),
+        (0.006836, 0.006863, 6.750000, 0.964286),
+        (0.004883, 0.004902, -6.750000, 2.950000),
+        (0.014648, 0.014706, -4.916667, 2.950000),
+        (0.024414, 0.024510, -2.950000, 2.950000),
+        (0.034180, 0.034314, -0.964286, 2.950000),
+        (0.034180, 0.034314, 0.964286, 2.950000),
+        (0.024414, 0.024510, 2.950000, 2.950000),
+        (0.014648, 0.014706, 4.916667, 2.950000),
+        (0.004883, 0.004902, 6.750000, 2.950000),
+        (0.002930, 0.002941, -6.750000, 4.916667),
+        (0.008789, 0.008824, -4.916667, 4.916667),
+        (0.014648, 0.014706, -2.950000, 4.916667),
+        (0.020508, 0.020588, -0.964286, 4.916667),
+        (0.020508, 0.020588, 0.964286, 4.916667),
+        (0.014648, 0.014706, 2.950000, 4.916667),
+        (0.008789, 0.008824, 4.916667, 4.916667),
+        (0.002930, 0.002941, 6.750000, 4.916667),
+        (0.000977, 0.000000, -6.750000, 6.750000),
+        (0.002930, 0.002941, -4.916667, 6.750000),
+        (0.004883, 0.004902, -2.950000, 6.750000),
+        (0.006836, 0.006863, -0.964286, 6.750000),
+        (0.006836, 0.006863, 0.964286, 6.750000),
+        (0.004883, 0.004902, 2.950000, 6.750000),
+        (0.002930, 0.002941, 4.916667, 6.750000),
+        (0.000977, 0.000000, 6.750000, 6.750000),
+    ],
+    "bspline-8.0": [
+        (0.004180, 0.004180, -6.921012, -6.921012),
+        (0.007010, 0.007010, -4.947995, -6.921012),
+        (0.009703, 0.009703, -2.969521, -6.921012),
+        (0.011432, 0.011432, -0.989182, -6.921012),
+        (0.011432, 0.011432, 0.989182, -6.921012),
+        (0.009703, 0.009703, 2.969521, -6.921012),
+        (0.007010, 0.007010, 4.947995, -6.921012),
+        (0.004180, 0.004180, 6.921012, -6.921012),
+        (0.007010, 0.007010, -6.921012, -4.947995),
+        (0.011758, 0.011758, -4.947995, -4.947995),
+        (0.016274, 0.016274, -2.969521, -4.947995),
+        (0.019174, 0.019174, -0.989182, -4.947995),
+        (0.019174, 0.019174, 0.989182, -4.947995),
+        (0.016274, 0.016274, 2.969521, -4.947995),
+        (0.011758, 0.011758, 4.947995, -4.947995),
+        (0.007010, 0.007010, 6.921012, -4.947995),
+        (0.009703, 0.009703, -6.921012, -2.969521),
+        (0.016274, 0.016274, -4.947995, -2.969521),
+        (0.022525, 0.022525, -2.969521, -2.969521),
+        (0.026540, 0.026540, -0.989182, -2.969521),
+        (0.026540, 0.026540, 0.989182, -2.969521),
+        (0.022525, 0.022525, 2.969521, -2.969521),
+        (0.016274, 0.016274, 4.947995, -2.969521),
+        (0.009703, 0.009703, 6.921012, -2.969521),
+        (0.011432, 0.011432, -6.921012, -0.989182),
+        (0.019174, 0.019174, -4.947995, -0.989182),
+        (0.026540, 0.026540, -2.969521, -0.989182),
+        (0.031270, 0.031270, -0.989182, -0.989182),
+        (0.031270, 0.031270, 0.989182, -0.989182),
+        (0.026540, 0.026540, 2.969521, -0.989182),
+        (0.019174, 0.019174, 4.947995, -0.989182),
+        (0.011432, 0.011432, 6.921012, -0.989182),
+        (0.011432, 0.011432, -6.921012, 0.989182),
+        (0.019174, 0.019174, -4.947995, 0.989182),
+        (0.026540, 0.026540, -2.969521, 0.989182),
+        (0.031270, 0.031270, -0.989182, 0.989182),
+        (0.031270, 0.031270, 0.989182, 0.989182),
+        (0.026540, 0.026540, 2.969521, 0.989182),
+        (0.019174, 0.019174, 4.947995, 0.989182),
+        (0.011432, 0.011432, 6.921012, 0.989182),
+        (0.009703, 0.009703, -6.921012, 2.969521),
+        (0.016274, 0.016274, -4.947995, 2.969521),
+        (0.022525, 0.022525, -2.969521, 2.969521),
+        (0.026540, 0.026540, -0.989182, 2.969521),
+        (0.026540, 0.026540, 0.989182, 2.969521),
+        (0.022525, 0.022525, 2.969521, 2.969521),
+        (0.016274, 0.016274, 4.947995, 2.969521),
+        (0.009703, 0.009703, 6.921012, 2.969521),
+        (0.007010, 0.007010, -6.921012, 4.947995),
+        (0.011758, 0.011758, -4.947995, 4.947995),
+        (0.016274, 0.016274, -2.969521, 4.947995),
+        (0.019174, 0.019174, -0.989182, 4.947995),
+        (0.019174, 0.019174, 0.989182, 4.947995),
+        (0.016274, 0.016274, 2.969521, 4.947995),
+        (0.011758, 0.011758, 4.947995, 4.947995),
+        (0.007010, 0.007010, 6.921012, 4.947995),
+        (0.004180, 0.004180, -6.921012, 6.921012),
+        (0.007010, 0.007010, -4.947995, 6.921012),
+        (0.009703, 0.009703, -2.969521, 6.921012),
+        (0.011432, 0.011432, -0.989182, 6.921012),
+        (0.011432, 0.011432, 0.989182, 6.921012),
+        (0.009703, 0.009703, 2.969521, 6.921012),
+        (0.007010, 0.007010, 4.947995, 6.921012),
+        (0.004180, 0.004180, 6.921012, 6.921012),
+    ],
+    "mitchell-8.0": [
+        (0.001215, 0.000000, -6.822185, -6.822185),
+        (0.003331, 0.003347, -4.910331, -6.822185),
+        (0.005646, 0.005674, -2.952959, -6.822185),
+        (0.007233, 0.007269, -0.983868, -6.822185),
+        (0.007233, 0.007269, 0.983868, -6.822185),
+        (0.005646, 0.005674, 2.952959, -6.822185),
+        (0.003331, 0.003347, 4.910331, -6.822185),
+        (0.001215, 0.000000, 6.822185, -6.822185),
+        (0.003331, 0.003347, -6.822185, -4.910331),
+        (0.009136, 0.009181, -4.910331, -4.910331),
+        (0.015486, 0.015561, -2.952959, -4.910331),
+        (0.019839, 0.019935, -0.983868, -4.910331),
+        (0.019839, 0.019935, 0.983868, -4.910331),
+        (0.015486, 0.015561, 2.952959, -4.910331),
+        (0.009136, 0.009181, 4.910331, -4.910331),
+        (0.003331, 0.003347, 6.822185, -4.910331),
+        (0.005646, 0.005674, -6.822185, -2.952959),
+        (0.015486, 0.015561, -4.910331, -2.952959),
+        (0.026248, 0.026376, -2.952959, -2.952959),
+        (0.033626, 0.033791, -0.983868, -2.952959),
+        (0.033626, 0.033791, 0.983868, -2.952959),
+        (0.026248, 0.026376, 2.952959, -2.952959),
+        (0.015486, 0.015561, 4.910331, -2.952959),
+        (0.005646, 0.005674, 6.822185, -2.952959),
+        (0.007233, 0.007269, -6.822185, -0.983868),
+        (0.019839, 0.019935, -4.910331, -0.983868),
+        (0.033626, 0.033791, -2.952959, -0.983868),
+        (0.043078, 0.043289, -0.983868, -0.983868),
+        (0.043078, 0.043289, 0.983868, -0.983868),
+        (0.033626, 0.033791, 2.952959, -0.983868),
+        (0.019839, 0.019935, 4.910331, -0.983868),
+        (0.007233, 0.007269, 6.822185, -0.983868),
+        (0.007233, 0.007269, -6.822185, 0.983868),
+        (0.019839, 0.019935, -4.910331, 0.983868),
+        (0.033626, 0.033791, -2.952959, 0.983868),
+        (0.043078, 0.043289, -0.983868, 0.983868),
+        (0.043078, 0.043289, 0.983868, 0.983868),
+        (0.033626, 0.033791, 2.952959, 0.983868),
+        (0.019839, 0.019935, 4.910331, 0.983868),
+        (0.007233, 0.007269, 6.822185, 0.983868),
+        (0.005646, 0.005674, -6.822185, 2.952959),
+        (0.015486, 0.015561, -4.910331, 2.952959),
+        (0.026248, 0.026376, -2.952959, 2.952959),
+        (0.033626, 0.033791, -0.983868, 2.952959),
+        (0.033626, 0.033791, 0.983868, 2.952959),
+        (0.026248, 0.026376, 2.952959, 2.952959),
+        (0.015486, 0.015561, 4.910331, 2.952959),
+        (0.005646, 0.005674, 6.822185, 2.952959),
+        (0.003331, 0.003347, -6.822185, 4.910331),
+        (0.009136, 0.009181, -4.910331, 4.910331),
+        (0.015486, 0.015561, -2.952959, 4.910331),
+        (0.019839, 0.019935, -0.983868, 4.910331),
+        (0.019839, 0.019935, 0.983868, 4.910331),
+        (0.015486, 0.015561, 2.952959, 4.910331),
+        (0.009136, 0.009181, 4.910331, 4.910331),
+        (0.003331, 0.003347, 6.822185, 4.910331),
+        (0.001215, 0.000000, -6.822185, 6.822185),
+        (0.003331, 0.003347, -4.910331, 6.822185),
+        (0.005646, 0.005674, -2.952959, 6.822185),
+        (0.007233, 0.007269, -0.983868, 6.822185),
+        (0.007233, 0.007269, 0.983868, 6.822185),
+        (0.005646, 0.005674, 2.952959, 6.822185),
+        (0.003331, 0.003347, 4.910331, 6.822185),
+        (0.001215, 0.000000, 6.822185, 6.822185),
+    ],
+    "catmull-8.0": [
+        (0.000495, 0.000000, -6.700633, -6.700633),
+        (0.002005, 0.000000, -4.891162, -6.700633),
+        (0.003716, 0.003784, -2.946663, -6.700633),
+        (0.004905, 0.004995, -0.982065, -6.700633),
+        (0.004905, 0.004995, 0.982065, -6.700633),
+        (0.003716, 0.003784, 2.946663, -6.700633),
+        (0.002005, 0.000000, 4.891162, -6.700633),
+        (0.000495, 0.000000, 6.700633, -6.700633),
+        (0.002005, 0.000000, -6.700633, -4.891162),
+        (0.008126, 0.008275, -4.891162, -4.891162),
+        (0.015060, 0.015336, -2.946663, -4.891162),
+        (0.019882, 0.020247, -0.982065, -4.891162),
+        (0.019882, 0.020247, 0.982065, -4.891162),
+        (0.015060, 0.015336, 2.946663, -4.891162),
+        (0.008126, 0.008275, 4.891162, -4.891162),
+        (0.002005, 0.000000, 6.700633, -4.891162),
+        (0.003716, 0.003784, -6.700633, -2.946663),
+        (0.015060, 0.015336, -4.891162, -2.946663),
+        (0.027909, 0.028421, -2.946663, -2.946663),
+        (0.036846, 0.037522, -0.982065, -2.946663),
+        (0.036846, 0.037522, 0.982065, -2.946663),
+        (0.027909, 0.028421, 2.946663, -2.946663),
+        (0.015060, 0.015336, 4.891162, -2.946663),
+        (0.003716, 0.003784, 6.700633, -2.946663),
+        (0.004905, 0.004995, -6.700633, -0.982065),
+        (0.019882, 0.020247, -4.891162, -0.982065),
+        (0.036846, 0.037522, -2.946663, -0.982065),
+        (0.048643, 0.049536, -0.982065, -0.982065),
+        (0.048643, 0.049536, 0.982065, -0.982065),
+        (0.036846, 0.037522, 2.946663, -0.982065),
+        (0.019882, 0.020247, 4.891162, -0.982065),
+        (0.004905, 0.004995, 6.700633, -0.982065),
+        (0.004905, 0.004995, -6.700633, 0.982065),
+        (0.019882, 0.020247, -4.891162, 0.982065),
+        (0.036846, 0.037522, -2.946663, 0.982065),
+        (0.048643, 0.049536, -0.982065, 0.982065),
+        (0.048643, 0.049536, 0.982065, 0.982065),
+        (0.036846, 0.037522, 2.946663, 0.982065),
+        (0.019882, 0.020247, 4.891162, 0.982065),
+        (0.004905, 0.004995, 6.700633, 0.982065),
+        (0.003716, 0.003784, -6.700633, 2.946663),
+        (0.015060, 0.015336, -4.891162, 2.946663),
+        (0.027909, 0.028421, -2.946663, 2.946663),
+        (0.036846, 0.037522, -0.982065, 2.946663),
+        (0.036846, 0.037522, 0.982065, 2.946663),
+        (0.027909, 0.028421, 2.946663, 2.946663),
+        (0.015060, 0.015336, 4.891162, 2.946663),
+        (0.003716, 0.003784, 6.700633, 2.946663),
+        (0.002005, 0.000000, -6.700633, 4.891162),
+        (0.008126, 0.008275, -4.891162, 4.891162),
+        (0.015060, 0.015336, -2.946663, 4.891162),
+        (0.019882, 0.020247, -0.982065, 4.891162),
+        (0.019882, 0.020247, 0.982065, 4.891162),
+        (0.015060, 0.015336, 2.946663, 4.891162),
+        (0.008126, 0.008275, 4.891162, 4.891162),
+        (0.002005, 0.000000, 6.700633, 4.891162),
+        (0.000495, 0.000000, -6.700633, 6.700633),
+        (0.002005, 0.000000, -4.891162, 6.700633),
+        (0.003716, 0.003784, -2.946663, 6.700633),
+        (0.004905, 0.004995, -0.982065, 6.700633),
+        (0.004905, 0.004995, 0.982065, 6.700633),
+        (0.003716, 0.003784, 2.946663, 6.700633),
+        (0.002005, 0.000000, 4.891162, 6.700633),
+        (0.000495, 0.000000, 6.700633, 6.700633),
+    ],
+} $}